@@ -12,6 +12,12 @@ from py_api.triage import router as triage_router
 from py_api.chat import router as chat_router
 from py_api.consent import router as consent_router
 from py_api.memory import router as memory_router
+from py_api.metrics import router as metrics_router
+from python_core.logger import get_logger
+from python_core.event_writer import get_event_writer
+from python_core.llm_client import get_llm_pool, warm_llm_client
+from python_core.job_queue import get_job_queue
+from python_core.models import set_checkout_observer
 
 app = FastAPI(title="Pluto Health API", docs_url="/api/docs", openapi_url="/api/openapi.json")
 
@@ -34,7 +40,33 @@ app.include_router(triage_router, prefix="/api/triage", tags=["triage"])
 app.include_router(chat_router, prefix="/api/chat", tags=["chat"])
 app.include_router(consent_router, prefix="/api/consent", tags=["consent"])
 app.include_router(memory_router, prefix="/api/memory", tags=["memory"])
+app.include_router(metrics_router, prefix="/api/metrics", tags=["metrics"])
+
+@app.on_event("startup")
+async def warm_clients():
+    # Open Groq connections before the first request needs them
+    await warm_llm_client()
+    # Resume background jobs a previous process left unfinished
+    get_job_queue().start()
+    # DB pool checkout waits go to the latency histograms
+    set_checkout_observer(lambda wait_ms: get_logger().record_latency("db", "checkout", wait_ms))
+    # Build the DB engine and replay orphaned TriageEvent spill files now,
+    # not on the first triage request
+    get_event_writer().start()
+
+@app.on_event("shutdown")
+async def flush_logs():
+    # Drain the background log writer before the instance goes away
+    get_logger().close()
+    get_event_writer().close()
+    get_job_queue().close()
+    await get_llm_pool().close()
 
 @app.get("/api/health")
 def health():
-    return {"status": "healthy", "env": "vercel"}
+    breaker = get_llm_pool().breaker.get_stats()
+    return {
+        "status": "degraded" if breaker["state"] == "open" else "healthy",
+        "env": "vercel",
+        "llm_circuit": breaker,
+    }
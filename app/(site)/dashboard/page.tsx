@@ -149,7 +149,7 @@ export default async function DashboardPage() {
                                             </div>
                                             <p className="text-sm text-foreground/90 font-medium line-clamp-1">"{event.symptoms}"</p>
                                             <p className="text-xs text-muted-foreground line-clamp-2">
-                                                {(event.aiResult as any)?.summary || (event.aiResult as any)?.message || "No summary available."}
+                                                {(event.aiResult as any)?.summary || (event.aiResult as any)?.clinical_summary || (event.aiResult as any)?.message || "No summary available."}
                                             </p>
                                         </div>
                                         <div className="flex flex-col sm:flex-row sm:items-center gap-3 mt-3 sm:mt-0 sm:border-l sm:border-border/40 sm:pl-4 min-w-[120px]">
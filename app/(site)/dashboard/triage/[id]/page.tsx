@@ -44,7 +44,7 @@ export default function TriageDetailPage() {
         }
 
         if (status === "authenticated" && id) {
-            fetch(`/api/triage/${id}`)
+            fetch(`/api/triage/events/${id}`)
                 .then(res => {
                     if (!res.ok) throw new Error("Failed to fetch triage event")
                     return res.json()
@@ -78,7 +78,7 @@ export default function TriageDetailPage() {
         )
     }
 
-    const result = event.aiResult as AnalysisResult
+    const result = (event.result ?? event.aiResult) as AnalysisResult
     const symptoms = event.symptoms
 
     return (
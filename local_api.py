@@ -24,10 +24,45 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.on_event("startup")
+async def warm_clients():
+    # Open Groq connections before the first request needs them
+    from python_core.llm_client import warm_llm_client
+    from python_core.job_queue import get_job_queue
+    from python_core.event_writer import get_event_writer
+    from python_core.logger import get_logger
+    from python_core.models import set_checkout_observer
+    await warm_llm_client()
+    # Resume background jobs a previous process left unfinished
+    get_job_queue().start()
+    # DB pool checkout waits go to the latency histograms
+    set_checkout_observer(lambda wait_ms: get_logger().record_latency("db", "checkout", wait_ms))
+    # Build the DB engine and replay orphaned TriageEvent spill files now,
+    # not on the first triage request
+    get_event_writer().start()
+
+@app.on_event("shutdown")
+async def flush_logs():
+    # Drain the background log writer so no entries are lost on reload/exit
+    from python_core.logger import get_logger
+    from python_core.event_writer import get_event_writer
+    from python_core.llm_client import get_llm_pool
+    from python_core.job_queue import get_job_queue
+    get_logger().close()
+    get_event_writer().close()
+    get_job_queue().close()
+    await get_llm_pool().close()
+
 @app.get("/health")
 @app.get("/")
 async def health():
-    return {"status": "healthy", "version": "local-dev"}
+    from python_core.llm_client import get_llm_pool
+    breaker = get_llm_pool().breaker.get_stats()
+    return {
+        "status": "degraded" if breaker["state"] == "open" else "healthy",
+        "version": "local-dev",
+        "llm_circuit": breaker,
+    }
 
 # Import routers
 try:
@@ -35,11 +70,13 @@ try:
     from py_api.chat import router as chat_router
     from py_api.consent import router as consent_router
     from py_api.memory import router as memory_router
+    from py_api.metrics import router as metrics_router
     
     app.include_router(triage_router, prefix="/triage", tags=["triage"])
     app.include_router(chat_router, prefix="/chat", tags=["chat"])
     app.include_router(consent_router, prefix="/consent", tags=["consent"])
     app.include_router(memory_router, prefix="/memory", tags=["memory"])
+    app.include_router(metrics_router, prefix="/metrics", tags=["metrics"])
     
     print("✅ All routers loaded")
 except Exception as e:
@@ -1,32 +1,121 @@
-from typing import Optional, List, Dict
+from typing import Optional, List, Dict, Any
 import os
 import json
-import openai
+import time
+import asyncio
 import traceback
 from fastapi import APIRouter, Request, HTTPException, Depends
-from sqlmodel import Session
+from fastapi.responses import StreamingResponse
 
 # Local imports
 import sys
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from python_core.models import User, engine, MedicalFact
-from python_core.auth import get_current_user_optional, get_db_session
+from python_core.models import User, MedicalFact
+from python_core.auth import get_current_user_optional, get_db_session, LazySession
 from python_core.clinical_reasoning_engine import get_reasoning_engine, UrgencyLevel
+from python_core.logger import get_logger
+from python_core.llm_client import chat_completion, stream_chat_completion
+from python_core.chat_context import get_chat_context_builder
+from python_core.sse import sse_event
 
 router = APIRouter()
 
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 
+# Tokens buffered between Groq and a slow client before we stop reading upstream
+STREAM_BUFFER = int(os.getenv("PLUTO_CHAT_STREAM_BUFFER", "64"))
+
+_END = object()
+
+
+def engine_only_reply(result) -> str:
+    """Reply built from the engine result alone, used when the LLM is unavailable"""
+    reply = result.clinical_summary
+    if result.follow_up_questions and result.urgency_level != UrgencyLevel.EMERGENCY:
+        reply += " " + result.follow_up_questions[0]
+    return reply
+
+
+def wants_stream(request: Request, body: Dict[str, Any]) -> bool:
+    return bool(body.get("stream")) or "text/event-stream" in request.headers.get("accept", "")
+
+
+async def stream_chat(request: Request, llm_messages: List[Dict[str, str]],
+                      updated_analysis: Dict[str, Any], fallback_text: str,
+                      user_id: Optional[str], start_time: float,
+                      prompt_stats: Optional[Dict[str, Any]] = None):
+    """
+    SSE body: `analysis` (the engine update, sent before any LLM work),
+    `token` events as text arrives, then `done` with the full response_text
+    (or `error`). If the LLM fails before the first token, the engine-only
+    reply is sent as a single token and `done` carries degraded: true.
+
+    Tokens pass through a bounded queue. While the client keeps up, each
+    event carries whatever arrived since the last one. When it falls behind
+    the queue fills and we stop reading from Groq. If the client disconnects
+    the upstream stream is closed, freeing its LLM concurrency slot.
+    """
+    logger = get_logger()
+    yield sse_event("analysis", updated_analysis)
+
+    queue: asyncio.Queue = asyncio.Queue(maxsize=STREAM_BUFFER)
+
+    async def produce():
+        try:
+            async for delta in stream_chat_completion("chat", messages=llm_messages, temperature=0.6):
+                await queue.put(delta)
+            await queue.put(_END)
+        except Exception as e:
+            await queue.put(e)
+
+    producer = asyncio.create_task(produce())
+    parts: List[str] = []
+    status = 499  # Client closed the connection, unless we finish first
+    try:
+        while True:
+            batch = [await queue.get()]
+            while isinstance(batch[-1], str) and not queue.empty():
+                batch.append(queue.get_nowait())
+            if await request.is_disconnected():
+                break
+
+            tokens = [item for item in batch if isinstance(item, str)]
+            if tokens:
+                text = "".join(tokens)
+                parts.append(text)
+                yield sse_event("token", {"text": text})
+
+            if batch[-1] is _END:
+                status = 200
+                yield sse_event("done", {"response_text": "".join(parts)})
+                break
+            if isinstance(batch[-1], Exception):
+                print(f"Chat Stream Error: {batch[-1]}")
+                if not parts:
+                    status = 200
+                    yield sse_event("token", {"text": fallback_text})
+                    yield sse_event("done", {"response_text": fallback_text, "degraded": True})
+                    break
+                status = 500
+                yield sse_event("error", {"detail": str(batch[-1])})
+                break
+    finally:
+        producer.cancel()
+        await asyncio.gather(producer, return_exceptions=True)
+        logger.log_performance("/api/chat", (time.time() - start_time) * 1000, status, user_id, prompt_stats)
+
 @router.post("")
 @router.post("/")
 async def chat_endpoint(
     request: Request,
     user: Optional[User] = Depends(get_current_user_optional),
-    db: Session = Depends(get_db_session)
+    db: LazySession = Depends(get_db_session)
 ):
     if not GROQ_API_KEY:
         raise HTTPException(status_code=500, detail="GROQ_API_KEY not configured")
 
+    logger = get_logger()
+    start_time = time.time()
     try:
         body = await request.json()
         messages = body.get("messages", [])
@@ -43,55 +132,60 @@ async def chat_endpoint(
         # 2. Re-run Clinical Reasoning Engine with new information
         engine = get_reasoning_engine()
         result = engine.reason(last_user_msg, history=history_text)
+        logger.record_stage_timings(result.stage_timings_ms)
         
         # 3. Generate LLM Response with Clinical Context
-        # We inject the REAL clinical findings into the system prompt so the LLM is aligned
-        clinical_context = f"""
-        Current Assessment:
-        - Urgency: {result.urgency_level.value}
-        - Found Protocols: {', '.join(result.matched_protocols)}
-        - Present Red Flags: {', '.join([rf.split('🔴 ')[1] for rf in result.what_we_know if '🔴' in rf])}
-        - Missing Info: {', '.join([uk.split('❓ ')[1] for uk in result.what_we_dont_know if '❓' in uk])}
-        """
-        
-        system_msg = {
-            "role": "system",
-            "content": f"""You are Dr. Pluto, a helpful and reassuring medical AI. 
-            
-            CLINICAL CONTEXT (Invisible to user, for your guidance):
-            {clinical_context}
-            
-            Key Rules:
-            1. Use simple, non-technical language.
-            2. If Urgency is EMERGENCY, be direct but calm: advise ER immediately.
-            3. If Missing Info is listed, ask ONE of the missing items naturally.
-            4. Keep responses short (2-3 sentences).
-            """
+        # We inject the REAL clinical findings into the system prompt so the LLM is aligned,
+        # most important first, and keep the whole prompt within the token budget
+        llm_messages, prompt_stats = get_chat_context_builder().build(result, messages)
+
+        # The frontend uses 'updated_analysis' to refresh the dashboard
+        updated_analysis = {
+            "triage_level": result.urgency_level.value,
+            "urgency_summary": result.urgency_rationale,
+            "differential_diagnosis": result.differential_diagnosis,
+            "suggested_focus": result.follow_up_questions, # Mapping follow-ups to suggestion area
+            "key_findings": result.what_we_know,
+            "clinical_notes": result.clinical_summary
         }
-        
-        client = openai.OpenAI(api_key=GROQ_API_KEY, base_url="https://api.groq.com/openai/v1")
-        completion = client.chat.completions.create(
-            model="llama-3.3-70b-versatile",
-            messages=[system_msg] + messages[-6:], # Keep context window manageable
-            temperature=0.6
-        )
-        
-        response_text = completion.choices[0].message.content
+
+        # 4a. Streaming mode: analysis first, then tokens as they arrive
+        if wants_stream(request, body):
+            return StreamingResponse(
+                stream_chat(request, llm_messages, updated_analysis, engine_only_reply(result),
+                            user.id if user else None, start_time, prompt_stats),
+                media_type="text/event-stream",
+                headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+            )
+
+        degraded = False
+        try:
+            completion = await chat_completion(
+                "chat",
+                messages=llm_messages,
+                temperature=0.6
+            )
+            response_text = completion.choices[0].message.content
+            if getattr(completion, "usage", None) is not None:
+                prompt_stats["reported_prompt_tokens"] = completion.usage.prompt_tokens
+        except Exception as e:
+            # Groq down, slow or circuit open: answer from the engine instead of a 500
+            print(f"Chat LLM unavailable, using engine reply: {e}")
+            response_text = engine_only_reply(result)
+            degraded = True
+        logger.log_performance("/api/chat", (time.time() - start_time) * 1000, 200, user.id if user else None,
+                               prompt_stats)
         
         # 4. Return response + Structured Clinical Update
-        # The frontend uses 'updated_analysis' to refresh the dashboard
-        return {
+        response = {
             "response_text": response_text,
-            "updated_analysis": {
-                "triage_level": result.urgency_level.value,
-                "urgency_summary": result.urgency_rationale,
-                "differential_diagnosis": result.differential_diagnosis,
-                "suggested_focus": result.follow_up_questions, # Mapping follow-ups to suggestion area
-                "key_findings": result.what_we_know,
-                "clinical_notes": result.clinical_summary
-            }
+            "updated_analysis": updated_analysis
         }
+        if degraded:
+            response["degraded"] = True
+        return response
         
     except Exception as e:
         traceback.print_exc()
+        logger.log_performance("/api/chat", (time.time() - start_time) * 1000, 500, user.id if user else None)
         raise HTTPException(status_code=500, detail=str(e))
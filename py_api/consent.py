@@ -1,13 +1,14 @@
 from typing import Optional
 import os
 from fastapi import APIRouter, Request, HTTPException, Depends
-from sqlmodel import Session, select
+from sqlmodel import select, update
 
 # Local imports
 import sys
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from python_core.models import User, engine
-from python_core.auth import get_current_user, get_db_session, get_current_user_optional
+from python_core.models import User
+from python_core.auth import get_current_user, get_db_session, get_current_user_optional, LazySession
+from python_core.user_cache import get_user_cache
 
 router = APIRouter()
 
@@ -16,14 +17,15 @@ router = APIRouter()
 async def save_consent(
     request: Request,
     user: Optional[User] = Depends(get_current_user_optional),
-    db: Session = Depends(get_db_session)
+    db: LazySession = Depends(get_db_session)
 ):
     try:
         # If user is logged in, save consent to DB
         if user:
-            user.has_consented = True
-            db.add(user)
-            db.commit()
+            # UPDATE by id - auth may hand us a detached, cached User
+            await db.exec(update(User).where(User.id == user.id).values(has_consented=True))
+            await db.commit()
+            get_user_cache().invalidate(user.id)
             return {"success": True, "message": "Consent recorded for user"}
         
         # If anonymous, just acknowledge (frontend handles session state)
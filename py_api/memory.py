@@ -1,26 +1,120 @@
 import os
 import json
+import base64
+import hashlib
+from datetime import datetime
 from typing import Optional
-from fastapi import APIRouter, Request, HTTPException, Depends
-from sqlmodel import Session, select
+from fastapi import APIRouter, Request, Response, HTTPException, Depends
+from sqlalchemy import tuple_
+from sqlmodel import select
 
 # Local imports
 import sys
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from python_core.models import User, MedicalFact, engine
-from python_core.auth import get_current_user, get_db_session
+from python_core.models import User, MedicalFact
+from python_core.auth import get_current_user, get_db_session, LazySession
+from python_core.fact_store import normalize_fact
 
 router = APIRouter()
 
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 200
+
+# Fields a client may project; id and createdAt are always returned (cursor)
+FACT_FIELDS = ("id", "type", "value", "meta", "confidence", "source", "createdAt", "lastSeen", "seenCount")
+
+
+def encode_cursor(created_at: datetime, fact_id: str) -> str:
+    raw = f"{created_at.isoformat()}|{fact_id}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("utf-8")
+        created_at, fact_id = raw.split("|", 1)
+        return datetime.fromisoformat(created_at), fact_id
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Weak comparison of `etag` against an If-None-Match list of entity tags"""
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if (tag[2:] if tag.startswith("W/") else tag) == opaque:
+            return True
+    return False
+
+
 @router.get("")
 @router.get("/")
 async def get_memory(
+    request: Request,
+    response: Response,
+    limit: int = DEFAULT_LIMIT,
+    cursor: Optional[str] = None,
+    type: Optional[str] = None,
+    fields: Optional[str] = None,
     user: User = Depends(get_current_user),
-    db: Session = Depends(get_db_session)
+    db: LazySession = Depends(get_db_session)
 ):
+    """
+    Newest-first page of the user's medical facts.
+
+    Keyset-paginated on (createdAt, id): pass the returned next_cursor to get
+    the following page. `type` filters by one or more comma-separated types,
+    `fields` limits the returned columns. Responses carry an ETag hashed from
+    the page itself, so any change to a returned field is seen and unchanged
+    polls get a 304 with no body.
+    """
+    limit = max(1, min(limit, MAX_LIMIT))
+
+    columns = list(FACT_FIELDS)
+    if fields:
+        requested = {f.strip() for f in fields.split(",") if f.strip()}
+        unknown = requested - set(FACT_FIELDS)
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+        columns = [f for f in FACT_FIELDS if f in requested or f in ("id", "createdAt")]
+
+    filters = [MedicalFact.userId == user.id]
+    if type:
+        # Canonical names plus the raw spelling, for rows written before dedup
+        raw_types = [t.strip() for t in type.split(",") if t.strip()]
+        types = sorted(set(raw_types) | {normalize_fact(t, "")[0] for t in raw_types})
+        filters.append(MedicalFact.type.in_(types))
+
     try:
-        statement = select(MedicalFact).where(MedicalFact.userId == user.id)
-        facts = db.exec(statement).all()
-        return {"facts": facts}
+        # One page, only the requested columns, walking the composite index
+        statement = select(*[getattr(MedicalFact, c) for c in columns]).where(*filters)
+        if cursor:
+            created_at, fact_id = decode_cursor(cursor)
+            statement = statement.where(
+                tuple_(MedicalFact.createdAt, MedicalFact.id) < tuple_(created_at, fact_id)
+            )
+        statement = statement.order_by(MedicalFact.createdAt.desc(), MedicalFact.id.desc()).limit(limit + 1)
+
+        rows = (await db.exec(statement)).all()
+        facts = [dict(zip(columns, row)) for row in rows[:limit]]
+        next_cursor = None
+        if len(rows) > limit:
+            last = facts[-1]
+            next_cursor = encode_cursor(last["createdAt"], last["id"])
+
+        etag = 'W/"' + hashlib.sha1(json.dumps(
+            [user.id, facts, next_cursor], sort_keys=True, default=str
+        ).encode("utf-8")).hexdigest() + '"'
+        response.headers["ETag"] = etag
+        response.headers["Cache-Control"] = "private, no-cache"
+        if etag_matches(request.headers.get("if-none-match", ""), etag):
+            return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "private, no-cache"})
+
+        return {"facts": facts, "next_cursor": next_cursor}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
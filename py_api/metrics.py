@@ -0,0 +1,73 @@
+import os
+from typing import Optional
+from fastapi import APIRouter, Request, HTTPException
+from fastapi.responses import PlainTextResponse
+
+# Local imports
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from python_core.logger import get_logger
+from python_core.prometheus import render_metrics, CONTENT_TYPE
+from python_core.shared_metrics import get_metrics_store
+from python_core.models import get_pool_stats
+from python_core.response_cache import get_response_cache
+from python_core.fanout import get_fanout_stats
+from python_core.llm_client import get_llm_pool
+
+router = APIRouter()
+
+# Optional bearer token for scrapers. If unset reads are open and resets disabled.
+METRICS_TOKEN = os.getenv("PLUTO_METRICS_TOKEN")
+
+
+def check_metrics_token(request: Request, required: bool = False) -> None:
+    if not METRICS_TOKEN:
+        if required:
+            raise HTTPException(status_code=403, detail="Set PLUTO_METRICS_TOKEN to enable this endpoint")
+        return
+    if request.headers.get("authorization", "") != f"Bearer {METRICS_TOKEN}":
+        raise HTTPException(status_code=401, detail="Invalid metrics token")
+
+
+@router.get("")
+@router.get("/")
+async def get_metrics(request: Request, format: Optional[str] = None):
+    """
+    Metrics for scraping. Prometheus text format by default; JSON (counters
+    plus latency percentiles) with ?format=json or Accept: application/json.
+    Never touches the DB; with PLUTO_METRICS_DIR set it reads (and prunes)
+    the workers' small metric files. Read-only: windows are reset with
+    POST /api/metrics/reset-window.
+    """
+    check_metrics_token(request)
+    if "reset_window" in request.query_params:
+        raise HTTPException(status_code=400, detail="Use POST /api/metrics/reset-window to reset the window")
+    logger = get_logger()
+
+    wants_json = format == "json" or (
+        format is None and "application/json" in request.headers.get("accept", "")
+    )
+    if not wants_json:
+        return PlainTextResponse(render_metrics(), media_type=CONTENT_TYPE)
+
+    snapshot = get_metrics_store().snapshot()
+    metrics = logger.get_metrics(snapshot)
+    metrics.pop("last_error", None)  # May contain user identifiers
+    latency = logger.get_latency_stats(snapshot)
+
+    return {**metrics, "latency": latency, "db_pool": get_pool_stats(),
+            "llm_cache": get_response_cache().get_stats(snapshot),
+            "triage_steps": get_fanout_stats(snapshot),
+            "llm_circuit": get_llm_pool().breaker.get_stats()}
+
+
+@router.post("/reset-window")
+async def reset_latency_window(request: Request):
+    """
+    Close this worker's latency window and start a new one. Requires
+    PLUTO_METRICS_TOKEN even where reads are open; windows are per-process.
+    """
+    check_metrics_token(request, required=True)
+    logger = get_logger()
+    logger.latency.reset_window()
+    return {"window_started": logger.latency.window_started}
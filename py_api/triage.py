@@ -1,50 +1,100 @@
 from typing import Optional, List, Any
 import os
+import asyncio
 import json
-import openai
-import uuid
+import time
 import traceback
 from datetime import datetime
-from fastapi import APIRouter, Request, HTTPException, Depends
-from sqlmodel import Session
+from fastapi import APIRouter, Request, HTTPException, Depends, BackgroundTasks
+from fastapi.responses import StreamingResponse
+from sqlmodel import select
 
 # Local imports
 import sys
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from python_core.models import User, TriageEvent, engine, MedicalFact
+from python_core.models import User, TriageEvent, MedicalFact, get_shared_engine
 from python_core.clinical_reasoning_engine import get_reasoning_engine, UrgencyLevel
 from python_core.sanitizer import sanitize_and_analyze
-from python_core.auth import get_current_user_optional, get_db_session
+from python_core.auth import get_current_user, get_current_user_optional, get_db_session, LazySession
 from python_core.rate_limiter import get_rate_limiter
-from python_core.logger import get_logger
+from python_core.logger import get_logger, LogLevel
+from python_core.llm_client import chat_completion, DEFAULT_MODEL
+from python_core.response_cache import get_response_cache, cache_key
+from python_core.event_writer import get_event_writer
+from python_core.fact_store import upsert_facts, write_facts
+from python_core.job_queue import get_job_queue, register_job
+from python_core.ids import new_id
+from python_core.deferred_results import get_deferred_results
+from python_core.fanout import fan_out
+from python_core.sse import sse_event
+from python_core.triage_codec import encode_result, decode_result, logic_snapshot, engine_version
 
 router = APIRouter()
 
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 BUILD_ID = "v4.0.0-reasoning-engine"
+# Bump when the enhance_with_llm prompt changes so cached summaries are not reused
+SUMMARY_PROMPT_VERSION = "triage_summary.v1"
+# Deadline for everything after reason(), counted from the start of the request
+TRIAGE_BUDGET_MS = float(os.getenv("PLUTO_TRIAGE_BUDGET_MS", "3000"))
 
+async def extract_facts(text: str) -> List[dict]:
+    """Ask the LLM for permanent medical facts in the text. Raises on failure."""
+    completion = await chat_completion(
+        "fact_extraction",
+        messages=[
+            {"role": "system", "content": "Extract permanent medical facts (Conditions, Meds, Allergies) in JSON: {'facts': [{'type':'...','value':'...'}]}"},
+            {"role": "user", "content": text}
+        ],
+        response_format={"type": "json_object"},
+        temperature=0
+    )
+    res = json.loads(completion.choices[0].message.content)
+    return res.get("facts", [])
 
-async def extract_and_save_facts(user_id: str, text: str, db: Session):
+
+@register_job("extract_facts", max_attempts=5)
+async def extract_facts_job(payload: dict):
+    """Background job: failures propagate so the queue retries them."""
+    facts = await extract_facts(payload["text"])
+    engine = get_shared_engine()
+    if engine is None:
+        raise RuntimeError("DATABASE_URL is not configured")
+    await asyncio.to_thread(write_facts, engine, payload["user_id"], facts, "Triage Extraction")
+
+
+async def extract_and_save_facts(user_id: str, text: str):
     """Memory extraction logic."""
     if not GROQ_API_KEY:
         return
+    # Acknowledged once it's on disk - the response doesn't use the facts
+    if await get_job_queue().enqueue("extract_facts", {"user_id": user_id, "text": text}):
+        return
+    # Own session: this runs concurrently with the other post-reasoning steps
+    db = LazySession()
     try:
-        client = openai.OpenAI(api_key=GROQ_API_KEY, base_url="https://api.groq.com/openai/v1")
-        completion = client.chat.completions.create(
-            model="llama-3.3-70b-versatile",
-            messages=[
-                {"role": "system", "content": "Extract permanent medical facts (Conditions, Meds, Allergies) in JSON: {'facts': [{'type':'...','value':'...'}]}"},
-                {"role": "user", "content": text}
-            ],
-            response_format={"type": "json_object"},
-            temperature=0
-        )
-        res = json.loads(completion.choices[0].message.content)
-        for fact in res.get("facts", []):
-            db.add(MedicalFact(id=f"fact_{uuid.uuid4().hex[:6]}", userId=user_id, type=fact['type'], value=fact['value'], source="Triage Extraction"))
-        db.commit()
+        facts = await extract_facts(text)
+        await upsert_facts(db, user_id, facts, source="Triage Extraction")
     except Exception as e:
         print(f"Memory Sync Error: {e}")
+    finally:
+        await db.close()
+
+
+async def save_triage_event(event: TriageEvent):
+    """
+    Write-behind when available (returns as soon as the row is journaled),
+    otherwise a direct INSERT on its own session. Raises if the row could
+    not be stored.
+    """
+    if await get_event_writer().submit(event):
+        return
+    db = LazySession()
+    try:
+        db.add(event)
+        await db.commit()
+    finally:
+        await db.close()
 
 
 @router.get("")
@@ -53,14 +103,55 @@ async def ping_triage():
     return {"status": "alive", "service": "triage-v4", "build": BUILD_ID, "methods": ["GET", "POST"]}
 
 
+@router.get("/events/{event_id}")
+async def get_triage_event(
+    event_id: str,
+    user: User = Depends(get_current_user),
+    db: LazySession = Depends(get_db_session)
+):
+    """A stored triage event with its compact aiResult expanded to the full result."""
+    statement = select(TriageEvent).where(TriageEvent.id == event_id, TriageEvent.userId == user.id)
+    event = (await db.exec(statement)).first()
+    if not event:
+        raise HTTPException(status_code=404, detail="Triage event not found")
+    return {
+        "id": event.id,
+        "symptoms": event.symptoms,
+        "createdAt": event.createdAt,
+        "engineVersion": event.engineVersion,
+        "actionRecommended": event.actionRecommended,
+        "urgency": event.urgency,
+        "result": decode_result(event.aiResult, event.logicSnapshot),
+    }
+
+
+@router.get("/summary/{summary_id}")
+async def get_triage_summary(
+    summary_id: str,
+    wait: float = 0,
+    user: Optional[User] = Depends(get_current_user_optional)
+):
+    """
+    friendly_message for a triage posted with defer_summary. Pass wait=N
+    (seconds, max 10) to long-poll until it's ready. status is "pending",
+    "ready" or "failed" (friendly_message is then the clinical summary).
+    """
+    entry = await get_deferred_results().wait(
+        summary_id, user.id if user else None, timeout=max(0.0, min(wait, 10.0))
+    )
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Summary not found or expired")
+    return {"status": entry["status"], "friendly_message": entry["value"]}
+
+
 @router.post("")
 @router.post("/")
 async def post_triage(
     request: Request, 
+    background_tasks: BackgroundTasks,
     user: Optional[User] = Depends(get_current_user_optional),
-    db: Session = Depends(get_db_session)
+    db: LazySession = Depends(get_db_session)
 ):
-    import time
     rate_limiter = get_rate_limiter()
     logger = get_logger()
     start_time = time.time()
@@ -71,6 +162,7 @@ async def post_triage(
         rate_limiter.check_limit(identifier, is_authenticated=bool(user))
     except HTTPException as e:
         logger.log_error("rate_limit", f"Rate limit hit: {identifier}")
+        logger.log_performance("/api/triage", (time.time() - start_time) * 1000, 429, user.id if user else None)
         raise e
     
     try:
@@ -87,87 +179,181 @@ async def post_triage(
         # 3. Clinical Reasoning Engine - always run for full differential/follow-up
         reasoning_engine = get_reasoning_engine()
         result = reasoning_engine.reason(analysis.safeInput, history)
+        logger.record_stage_timings(result.stage_timings_ms)
+        engine_urgency, engine_rationale = result.urgency_level, result.urgency_rationale
         
         # Override urgency to EMERGENCY if crisis detected
         if is_crisis:
             result.urgency_level = UrgencyLevel.EMERGENCY
             result.urgency_rationale = "CRITICAL: Crisis keywords detected. " + result.urgency_rationale
         
-        # 4. Optional: AI Enhancement for Clinical Summary
-        ai_enhanced = None
-        if GROQ_API_KEY and result.urgency_level not in [UrgencyLevel.EMERGENCY]:
-            try:
-                ai_enhanced = await enhance_with_llm(
-                    result.chief_complaint,
-                    result.what_we_know,
-                    result.what_we_dont_know,
-                    result.urgency_level.value
-                )
-            except Exception as e:
-                print(f"LLM Enhancement failed (non-critical): {e}")
-        
-        # 5. Save Event
+        # 4. Post-reasoning steps run concurrently under one latency budget:
+        # LLM summary (inline mode only), event save and fact extraction
+        wants_summary = bool(GROQ_API_KEY) and result.urgency_level not in [UrgencyLevel.EMERGENCY]
+        mode = triage_mode(request, data)
+        steps = {"summary": summarize(result) if wants_summary and mode == "inline" else None}
         if user:
             event = TriageEvent(
-                id=f"evt_{uuid.uuid4().hex[:8]}",
+                id=new_id("evt"),
                 userId=user.id,
                 symptoms=input_text,
-                aiResult=result.to_dict(),
+                # Compact encoding - full view via GET /api/triage/events/{id}
+                aiResult=encode_result(result, engine_urgency, engine_rationale),
+                logicSnapshot=logic_snapshot(),
                 actionRecommended=result.urgency_level.value,
                 urgency="High" if result.urgency_level in [UrgencyLevel.EMERGENCY, UrgencyLevel.URGENT] else "Low",
-                engineVersion=BUILD_ID
+                engineVersion=engine_version()
             )
-            db.add(event)
-            db.commit()
-            await extract_and_save_facts(user.id, input_text, db)
+            steps["save_event"] = save_triage_event(event)
+            steps["facts"] = extract_and_save_facts(user.id, input_text)
+        else:
+            steps["save_event"] = steps["facts"] = None
 
-        # 6. Build Response
-        duration_ms = int((time.time() - start_time) * 1000)
-        
-        return {
-            # Legacy fields for backward compatibility
+        budget_s = TRIAGE_BUDGET_MS / 1000 - (time.time() - start_time)
+        outcomes = await fan_out(steps, budget_s)
+        if user and not outcomes["save_event"].ok:
+            # Best effort like facts: the triage is computed, don't fail it over the history row
+            logger.log_error("event_save", f"TriageEvent {event.id} not stored ({outcomes['save_event'].outcome})",
+                             {"user_id": user.id}, level=LogLevel.WARNING)
+        ai_enhanced = outcomes["summary"].value if outcomes["summary"].ok else None
+
+        # 5. Build Response
+        elapsed_ms = (time.time() - start_time) * 1000
+        duration_ms = int(elapsed_ms)
+        logger.log_performance("/api/triage", elapsed_ms, 200, user.id if user else None)
+        logger.record_latency("urgency", result.urgency_level.value, elapsed_ms)
+        response = build_triage_response(result, ai_enhanced or result.clinical_summary, duration_ms)
+        logger.log_triage(user.id if user else None, input_text, {
             "triage_level": result.urgency_level.value,
-            "severity": {
-                "level": result.urgency_level.value.upper().replace("_", " "),
-                "color": get_severity_color(result.urgency_level)
-            },
-            "friendly_message": ai_enhanced or result.clinical_summary,
-            "summary": result.clinical_summary,
-            
-            # New structured fields
-            "chief_complaint": result.chief_complaint,
-            "matched_protocols": result.matched_protocols,
-            "urgency_rationale": result.urgency_rationale,
-            
-            # Transparency fields
-            "what_we_know": result.what_we_know,
-            "what_we_dont_know": result.what_we_dont_know,
-            "anti_hallucination_notes": result.anti_hallucination_notes,
-            
-            # Clinical guidance
-            "follow_up_questions": result.follow_up_questions,
-            "differential_diagnosis": result.differential_diagnosis,
-            "criteria_matrix": {k: v.to_dict() for k, v in result.criteria_matrix.items()},
-            
-            # Legacy fields (keeping for frontend compatibility)
-            "when_to_worry": [rf for item in result.what_we_know if "🔴" in item for rf in [item.split(":")[0].replace("🔴 ", "")]],
-            "home_care_tips": get_home_care_tips(result.urgency_level),
-            
-            # Metadata
-            "confidence": {
-                "level": "High" if result.what_we_know else "Limited",
-                "value": 0.9 if result.what_we_know else 0.5
-            },
-            "engine_version": BUILD_ID,
-            "processing_time_ms": duration_ms
-        }
+            "llm_called": wants_summary,
+            "version": engine_version(),
+        }, elapsed_ms)
+
+        # Two-phase modes: engine result now, LLM summary when it's ready
+        if mode == "stream":
+            return StreamingResponse(
+                stream_triage(response, result if wants_summary else None),
+                media_type="text/event-stream",
+                headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+            )
+        if mode == "deferred":
+            response["friendly_message_pending"] = False
+            summary_id = None
+            if wants_summary:
+                summary_id = await get_deferred_results().create(
+                    user.id if user else None, result.clinical_summary, prefix="sum"
+                )
+            if summary_id:
+                background_tasks.add_task(complete_summary, summary_id, result)
+                response["friendly_message_pending"] = True
+                response["summary_id"] = summary_id
+                response["summary_url"] = f"{request.url.path.rstrip('/')}/summary/{summary_id}"
+            elif wants_summary:
+                # No store to hand the summary through - fall back to waiting for it
+                response["friendly_message"] = await summarize_or_fallback(result)
+        return response
 
     except Exception as e:
         print(f"Triage Error: {e}")
         traceback.print_exc()
+        logger.log_error("triage", str(e), {"user_id": user.id if user else None})
+        logger.log_performance("/api/triage", (time.time() - start_time) * 1000, 500, user.id if user else None)
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def triage_mode(request: Request, data: dict) -> str:
+    """inline (default), stream (SSE) or deferred (JSON now, summary via /summary/{id})"""
+    if data.get("stream") or "text/event-stream" in request.headers.get("accept", ""):
+        return "stream"
+    if data.get("defer_summary"):
+        return "deferred"
+    return "inline"
+
+
+async def summarize(result) -> Optional[str]:
+    return await enhance_with_llm(
+        result.chief_complaint,
+        result.what_we_know,
+        result.what_we_dont_know,
+        result.urgency_level.value
+    )
+
+
+async def summarize_or_fallback(result) -> str:
+    try:
+        return await summarize(result) or result.clinical_summary
+    except Exception as e:
+        print(f"LLM Enhancement failed (non-critical): {e}")
+        return result.clinical_summary
+
+
+async def complete_summary(summary_id: str, result):
+    """Background task for deferred mode: fill the slot the client is polling"""
+    try:
+        summary = await summarize(result)
+    except Exception as e:
+        print(f"LLM Enhancement failed (non-critical): {e}")
+        summary = None
+    await get_deferred_results().complete(summary_id, summary)
+
+
+async def stream_triage(response: dict, result):
+    """
+    SSE body: `result` (the full engine response, friendly_message set to the
+    clinical summary), then `summary` with the LLM friendly_message, then
+    `done`. `result` is None when no LLM summary is coming.
+    """
+    response["friendly_message_pending"] = result is not None
+    yield sse_event("result", response)
+    if result is not None:
+        friendly = await summarize_or_fallback(result)
+        yield sse_event("summary", {
+            "friendly_message": friendly,
+            "enhanced": friendly != result.clinical_summary,
+        })
+    yield sse_event("done", {})
+
+
+def build_triage_response(result, friendly_message: str, duration_ms: int) -> dict:
+    return {
+        # Legacy fields for backward compatibility
+        "triage_level": result.urgency_level.value,
+        "severity": {
+            "level": result.urgency_level.value.upper().replace("_", " "),
+            "color": get_severity_color(result.urgency_level)
+        },
+        "friendly_message": friendly_message,
+        "summary": result.clinical_summary,
+        
+        # New structured fields
+        "chief_complaint": result.chief_complaint,
+        "matched_protocols": result.matched_protocols,
+        "urgency_rationale": result.urgency_rationale,
+        
+        # Transparency fields
+        "what_we_know": result.what_we_know,
+        "what_we_dont_know": result.what_we_dont_know,
+        "anti_hallucination_notes": result.anti_hallucination_notes,
+        
+        # Clinical guidance
+        "follow_up_questions": result.follow_up_questions,
+        "differential_diagnosis": result.differential_diagnosis,
+        "criteria_matrix": {k: v.to_dict() for k, v in result.criteria_matrix.items()},
+        
+        # Legacy fields (keeping for frontend compatibility)
+        "when_to_worry": [rf for item in result.what_we_know if "🔴" in item for rf in [item.split(":")[0].replace("🔴 ", "")]],
+        "home_care_tips": get_home_care_tips(result.urgency_level),
+        
+        # Metadata
+        "confidence": {
+            "level": "High" if result.what_we_know else "Limited",
+            "value": 0.9 if result.what_we_know else 0.5
+        },
+        "engine_version": BUILD_ID,
+        "processing_time_ms": duration_ms
+    }
+
+
 def get_severity_color(level: UrgencyLevel) -> str:
     """Map urgency level to display color."""
     colors = {
@@ -206,11 +392,21 @@ async def enhance_with_llm(
     """
     Use LLM to generate a more natural, empathetic clinical summary.
     This is optional enhancement - the system works without it.
+    Identical clinical contexts are served from the shared response cache.
     """
     if not GROQ_API_KEY:
         return None
-    
-    client = openai.OpenAI(api_key=GROQ_API_KEY, base_url="https://api.groq.com/openai/v1")
+
+    cache = get_response_cache()
+    key = cache_key("triage_summary", DEFAULT_MODEL, SUMMARY_PROMPT_VERSION, {
+        "complaint": complaint,
+        "urgency": urgency,
+        "what_we_know": what_we_know,
+        "what_we_dont_know": what_we_dont_know,
+    })
+    cached = await cache.get(key, "triage_summary")
+    if cached is not None:
+        return cached
     
     system_prompt = """You are Dr. Pluto, a warm and reassuring clinical triage assistant.
     
@@ -232,8 +428,9 @@ What We Don't Know: {json.dumps(what_we_dont_know)}
 Generate a brief, empathetic summary for the patient."""
 
     try:
-        completion = client.chat.completions.create(
-            model="llama-3.3-70b-versatile",
+        start = time.perf_counter()
+        completion = await chat_completion(
+            "triage_summary",
             messages=[
                 {"role": "system", "content": system_prompt},
                 {"role": "user", "content": user_msg}
@@ -241,6 +438,8 @@ Generate a brief, empathetic summary for the patient."""
             temperature=0.3,
             max_tokens=150
         )
-        return completion.choices[0].message.content.strip()
+        summary = completion.choices[0].message.content.strip()
+        await cache.put(key, "triage_summary", summary, (time.perf_counter() - start) * 1000)
+        return summary
     except Exception:
         return None
@@ -1,48 +1,109 @@
 import os
+import hashlib
+import threading
+import time
+from collections import OrderedDict
 from jose import jwt, JWTError
 import traceback
 from datetime import datetime, timezone
 from fastapi import Header, HTTPException, Depends, Request
-from sqlmodel import Session as SQLSession, select
-from typing import Optional
-from .models import User, engine
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from typing import Optional, Tuple
+from .models import User, get_shared_async_engine
+from .shared_metrics import get_metrics_store
+from .user_cache import get_user_cache
 
 # Hardened Configuration
 AUTH_SECRET = os.getenv("AUTH_SECRET")
 JWT_ALGORITHM = "HS256"
 JWT_LEEWAY = 30  # 30 seconds for clock skew
+JWT_CACHE_TTL_CAP = 900  # Hard bound on how long a verified token is trusted without re-checking
 
-def get_db_session():
-    if engine is None:
-        raise HTTPException(
-            status_code=500, 
-            detail="DATABASE_URL environment variable is missing or malformed."
-        )
-    with SQLSession(engine) as session:
-        yield session
+# Priority order for session cookies (NextAuth v5)
+SESSION_COOKIE_KEYS = [
+    "authjs.session-token",
+    "__Secure-authjs.session-token",
+    "next-auth.session-token",
+    "__Secure-next-auth.session-token"
+]
 
-async def get_current_user_optional(
-    request: Request,
-    db: SQLSession = Depends(get_db_session)
-) -> Optional[User]:
+
+class VerifiedTokenCache:
     """
-    Optional JWT verification - returns User if authenticated, None if anonymous.
-    Used for endpoints that work both authenticated and anonymous.
+    Bounded LRU of already-verified session tokens -> (user_id, valid_until)
+
+    Keyed by a SHA-256 of the token so raw tokens are never held in memory.
+    An entry is honoured only until the token's exp + JWT_LEEWAY (the same
+    cutoff jwt.decode applies) and at most max_ttl seconds after it was
+    verified (never more than JWT_CACHE_TTL_CAP). NextAuth JWT sessions have
+    no server-side revocation list, so a signature check alone would accept
+    a logged-out token until exp anyway; what the cache adds is that a token
+    is re-verified at least every max_ttl. Tokens whose user no longer exists
+    are revoked by the auth dependencies as soon as the lookup fails.
     """
-    if not AUTH_SECRET:
-        return None  # Allow anonymous if no secret configured
 
-    # 1. Extract Token from Cookies
+    def __init__(self, max_size: int = 10000, max_ttl: float = 300):
+        self.max_size = max_size
+        self.max_ttl = min(max_ttl, JWT_CACHE_TTL_CAP)
+        self._entries: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._store = get_metrics_store()
+
+    @staticmethod
+    def _key(token: str) -> str:
+        return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+    def get(self, token: str) -> Optional[str]:
+        key = self._key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.time() > entry[1]:
+                del self._entries[key]
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+        self._store.inc("auth.jwt_cache_hits" if entry else "auth.jwt_cache_misses")
+        return entry[0] if entry else None
+
+    def put(self, token: str, user_id: str, exp: Optional[float]) -> None:
+        now = time.time()
+        valid_until = now + self.max_ttl
+        if exp is not None:
+            valid_until = min(valid_until, float(exp) + JWT_LEEWAY)
+        if valid_until <= now:
+            return
+
+        key = self._key(token)
+        with self._lock:
+            self._entries[key] = (user_id, valid_until)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def revoke(self, token: str) -> None:
+        """Drop a token (e.g. on logout) so the next request re-verifies it"""
+        with self._lock:
+            self._entries.pop(self._key(token), None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+_token_cache = VerifiedTokenCache(
+    max_size=int(os.getenv("PLUTO_JWT_CACHE_SIZE", "10000")),
+    max_ttl=float(os.getenv("PLUTO_JWT_CACHE_MAX_TTL", "300"))
+)
+
+def get_token_cache() -> VerifiedTokenCache:
+    """Get global verified-token cache"""
+    return _token_cache
+
+
+def extract_session_token(request: Request) -> Tuple[Optional[str], dict]:
+    """Return (session token or None, parsed cookies) from the Cookie header"""
     cookie_header = request.headers.get("cookie", "")
-    token = None
-    
-    # Priority order for session cookies (NextAuth v5)
-    cookie_keys = [
-        "authjs.session-token",
-        "__Secure-authjs.session-token",
-        "next-auth.session-token",
-        "__Secure-next-auth.session-token"
-    ]
     
     # Parse cookies safely
     cookies = {}
@@ -52,38 +113,129 @@ async def get_current_user_optional(
             key, value = cookie.split('=', 1)
             cookies[key.strip()] = value.strip()
     
-    for key in cookie_keys:
+    for key in SESSION_COOKIE_KEYS:
         if key in cookies:
-            token = cookies[key]
-            break
+            return cookies[key], cookies
+    return None, cookies
+
+
+def verify_session_token(token: str) -> Optional[str]:
+    """
+    Verify a session JWT and return its user id (None if the payload has none).
+    Tokens verified before are served from the cache without re-checking the
+    signature. Raises JWTError for invalid or expired tokens.
+    """
+    cached_user_id = _token_cache.get(token)
+    if cached_user_id is not None:
+        return cached_user_id
+    
+    payload = jwt.decode(
+        token, 
+        AUTH_SECRET, 
+        algorithms=[JWT_ALGORITHM],
+        options={
+            "verify_exp": True,
+            "verify_iat": True,
+            "verify_aud": False,
+            "leeway": JWT_LEEWAY
+        }
+    )
+    
+    user_id = payload.get("sub") or payload.get("id")
+    if user_id:
+        _token_cache.put(token, user_id, payload.get("exp"))
+    return user_id
+
+class LazySession:
+    """
+    Stand-in for a SQLModel AsyncSession that is only created on first use.
+
+    Anonymous requests (and authenticated ones served from the user cache)
+    never touch it, so they open no session, check out no pooled connection
+    and keep working when DATABASE_URL is missing or the database is down.
+    Queries must be awaited: `(await db.exec(stmt)).first()`, `await db.commit()`.
+    """
+
+    def __init__(self, bind=None):
+        self._bind = bind  # None = the shared async engine, created on first use
+        self._session: Optional[AsyncSession] = None
+
+    @property
+    def opened(self) -> bool:
+        return self._session is not None
+
+    def _get(self) -> AsyncSession:
+        if self._session is None:
+            bind = self._bind if self._bind is not None else get_shared_async_engine()
+            if bind is None:
+                raise HTTPException(
+                    status_code=500, 
+                    detail="DATABASE_URL environment variable is missing or malformed."
+                )
+            # Objects stay readable after commit without another round trip
+            self._session = AsyncSession(bind, expire_on_commit=False)
+            get_metrics_store().inc("db.sessions_opened")
+        return self._session
+
+    def __getattr__(self, name):
+        # Only called for attributes not defined here (exec, add, commit, ...)
+        return getattr(self._get(), name)
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+async def get_db_session():
+    session = LazySession()
+    get_metrics_store().inc("db.sessions_requested")
+    try:
+        yield session
+    finally:
+        await session.close()
+
+async def load_user(db: LazySession, user_id: str) -> Optional[User]:
+    """Fetch the user for a verified token, served from the TTL cache when fresh"""
+    cache = get_user_cache()
+    user = cache.get(user_id)
+    if user is not None:
+        return user
+
+    statement = select(User).where(User.id == user_id)
+    user = (await db.exec(statement)).first()
+    if user is not None:
+        cache.put(user)
+    return user
+
+async def get_current_user_optional(
+    request: Request,
+    db: LazySession = Depends(get_db_session)
+) -> Optional[User]:
+    """
+    Optional JWT verification - returns User if authenticated, None if anonymous.
+    Used for endpoints that work both authenticated and anonymous.
+    """
+    if not AUTH_SECRET:
+        return None  # Allow anonymous if no secret configured
+
+    # 1. Extract Token from Cookies
+    token, _ = extract_session_token(request)
 
     if not token:
         # No token found - allow anonymous access
         return None
 
-    # 2. Verify JWT if token exists
+    # 2. Verify JWT if token exists (cached after first verification)
     try:
-        payload = jwt.decode(
-            token, 
-            AUTH_SECRET, 
-            algorithms=[JWT_ALGORITHM],
-            options={
-                "verify_exp": True,
-                "verify_iat": True,
-                "verify_aud": False,
-                "leeway": JWT_LEEWAY
-            }
-        )
-        
-        user_id = payload.get("sub") or payload.get("id")
+        user_id = verify_session_token(token)
         if not user_id:
             return None  # Invalid token, allow anonymous
 
-        # 3. Retrieve User from Database
-        statement = select(User).where(User.id == user_id)
-        user = db.exec(statement).first()
-        
-        return user  # May be None if user deleted
+        # 3. Retrieve User (cached for a short TTL)
+        user = await load_user(db, user_id)
+        if user is None:
+            _token_cache.revoke(token)  # User deleted: stop trusting the token
+        return user
 
     except JWTError:
         # Token invalid - allow anonymous rather than failing
@@ -94,7 +246,7 @@ async def get_current_user_optional(
 
 async def get_current_user(
     request: Request,
-    db: SQLSession = Depends(get_db_session)
+    db: LazySession = Depends(get_db_session)
 ) -> User:
     """
     Strict JWT verification - raises 401 if not authenticated.
@@ -104,28 +256,7 @@ async def get_current_user(
         raise HTTPException(status_code=500, detail="AUTH_SECRET not configured on server.")
 
     # Extract Token
-    cookie_header = request.headers.get("cookie", "")
-    token = None
-    
-    cookie_keys = [
-        "authjs.session-token",
-        "__Secure-authjs.session-token",
-        "next-auth.session-token",
-        "__Secure-next-auth.session-token"
-    ]
-    
-    cookies = {}
-    for cookie in cookie_header.split(';'):
-        cookie = cookie.strip()
-        if '=' in cookie:
-            key, value = cookie.split('=', 1)
-            cookies[key.strip()] = value.strip()
-    
-    for key in cookie_keys:
-        if key in cookies:
-            token = cookies[key]
-            print(f"DEBUG_AUTH: Found session token in cookie: {key}")
-            break
+    token, cookies = extract_session_token(request)
 
     if not token:
         raise HTTPException(
@@ -137,21 +268,9 @@ async def get_current_user(
             }
         )
 
-    # Verify JWT
+    # Verify JWT (cached after first verification)
     try:
-        payload = jwt.decode(
-            token, 
-            AUTH_SECRET, 
-            algorithms=[JWT_ALGORITHM],
-            options={
-                "verify_exp": True,
-                "verify_iat": True,
-                "verify_aud": False,
-                "leeway": JWT_LEEWAY
-            }
-        )
-        
-        user_id = payload.get("sub") or payload.get("id")
+        user_id = verify_session_token(token)
         if not user_id:
             raise HTTPException(
                 status_code=401, 
@@ -161,10 +280,10 @@ async def get_current_user(
                 }
             )
 
-        statement = select(User).where(User.id == user_id)
-        user = db.exec(statement).first()
+        user = await load_user(db, user_id)
 
         if not user:
+            _token_cache.revoke(token)  # User deleted: stop trusting the token
             raise HTTPException(
                 status_code=401, 
                 detail={"code": "USER_NOT_FOUND", "message": "User not found in database."}
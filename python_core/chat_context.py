@@ -0,0 +1,187 @@
+"""
+Token-budgeted prompt building for /api/chat
+Most important clinical fields go first, recent turns are kept verbatim and
+older turns are replaced by the engine's structured findings
+"""
+import os
+import re
+from typing import Dict, Any, List, Optional, Tuple
+
+from .clinical_reasoning_engine import ReasoningResult
+from .shared_metrics import get_metrics_store
+
+# Words, numbers and single symbols. BPE vocabularies (Llama/tiktoken) give
+# most short English words one token and split long or rare ones, so this
+# deliberately errs on the high side rather than under-filling the budget.
+_PIECE_RE = re.compile(r"\w+|[^\w\s]")
+MESSAGE_OVERHEAD = 4  # Role and separator tokens the chat template adds per message
+MIN_TURN_TOKENS = 24  # Below this a cut-down earlier turn says too little to be worth sending
+
+_FLAG_PREFIX_RE = re.compile(r"^[^\w(]+\s*")
+
+RULES = """Key Rules:
+1. Use simple, non-technical language.
+2. If Urgency is EMERGENCY, be direct but calm: advise ER immediately.
+3. If Missing Info is listed, ask ONE of the missing items naturally.
+4. Keep responses short (2-3 sentences)."""
+
+
+def _piece_tokens(piece: str) -> int:
+    if piece.isascii():
+        return 1 if len(piece) <= 6 else (len(piece) + 3) // 4
+    return 2 * len(piece)  # Emoji and non-Latin text are usually several tokens
+
+
+def count_tokens(text: str) -> int:
+    """Local estimate of the LLM token count of `text` (no network, no tokenizer files)"""
+    return sum(_piece_tokens(piece) for piece in _PIECE_RE.findall(text or ""))
+
+
+def count_message_tokens(messages: List[Dict[str, str]]) -> int:
+    return sum(count_tokens(m.get("content", "")) + MESSAGE_OVERHEAD for m in messages)
+
+
+def truncate_tokens(text: str, max_tokens: int) -> Tuple[str, bool]:
+    """Keep the head of `text` within `max_tokens`; returns (text, was_truncated)"""
+    used = 0
+    for match in _PIECE_RE.finditer(text or ""):
+        used += _piece_tokens(match.group())
+        if used > max_tokens - 2:  # Room for the ellipsis
+            return text[:match.start()].rstrip() + " …", True
+    return text, False
+
+
+def _plain(item: str) -> str:
+    """'🔴 Chest pain: Present (evidence)' -> 'Chest pain: Present (evidence)'"""
+    return _FLAG_PREFIX_RE.sub("", item)
+
+
+def _capped(items: List[str], limit: int) -> str:
+    if len(items) <= limit:
+        return ", ".join(items)
+    return ", ".join(items[:limit]) + f" (+{len(items) - limit} more)"
+
+
+def clinical_context(result: ReasoningResult, items: int, summarize_history: bool) -> str:
+    """
+    Context lines in priority order: urgency, red flags, missing info, then
+    (when older turns are not sent) what earlier turns established, then the
+    matched protocols. Every list is capped at `items` entries.
+    """
+    red_flags = [_plain(k).split(":")[0] for k in result.what_we_know if k.startswith("🔴")]
+    missing = [_plain(u).split(":")[0] for u in result.what_we_dont_know if u.startswith("❓")]
+    lines = [f"- Urgency: {result.urgency_level.value}"]
+    if red_flags:
+        lines.append(f"- Present Red Flags: {_capped(red_flags, items)}")
+    if missing:
+        lines.append(f"- Missing Info: {_capped(missing, items)}")
+    if summarize_history:
+        known = [_plain(k) for k in result.what_we_know]
+        lines.append(f"- Earlier in this conversation: chief complaint {result.chief_complaint}"
+                     + (f"; established {_capped(known, items)}" if known else ""))
+    if result.matched_protocols:
+        lines.append(f"- Found Protocols: {_capped(result.matched_protocols, items)}")
+    return "\n".join(lines)
+
+
+def system_prompt(result: ReasoningResult, items: int, summarize_history: bool) -> Dict[str, str]:
+    return {
+        "role": "system",
+        "content": "You are Dr. Pluto, a helpful and reassuring medical AI.\n\n"
+                   "CLINICAL CONTEXT (Invisible to user, for your guidance):\n"
+                   f"{clinical_context(result, items, summarize_history)}\n\n{RULES}",
+    }
+
+
+class ChatContextBuilder:
+    """
+    Builds the message list sent to the LLM for one chat turn within
+    `budget` estimated prompt tokens.
+
+    The system prompt comes first, with its lists shortened until it uses at
+    most half the budget. The latest user message is always sent (cut to fit
+    if needed). Earlier turns are then added newest first, each capped at
+    `message_tokens` (or whatever budget is left), up to `max_turns`
+    messages in total, until the budget runs out. Turns left out are not lost: the engine has
+    already reasoned over the full history, so its what_we_know findings
+    stand in for them in the system prompt.
+    """
+
+    def __init__(self, budget: int = 1500, max_turns: int = 6, message_tokens: int = 300,
+                 context_items: int = 6):
+        self.budget = budget
+        self.max_turns = max_turns
+        self.message_tokens = message_tokens
+        self.context_items = context_items
+
+    @classmethod
+    def from_env(cls) -> "ChatContextBuilder":
+        """Build from PLUTO_CHAT_* variables"""
+        return cls(
+            budget=int(os.getenv("PLUTO_CHAT_TOKEN_BUDGET", "1500")),
+            max_turns=int(os.getenv("PLUTO_CHAT_MAX_TURNS", "6")),
+            message_tokens=int(os.getenv("PLUTO_CHAT_MESSAGE_TOKENS", "300")),
+            context_items=int(os.getenv("PLUTO_CHAT_CONTEXT_ITEMS", "6")),
+        )
+
+    def _system(self, result: ReasoningResult, summarize_history: bool) -> Dict[str, str]:
+        items = self.context_items
+        system = system_prompt(result, items, summarize_history)
+        while items > 1 and count_message_tokens([system]) > self.budget // 2:
+            items -= 1
+            system = system_prompt(result, items, summarize_history)
+        return system
+
+    def build(self, result: ReasoningResult,
+              messages: List[Dict[str, Any]]) -> Tuple[List[Dict[str, str]], Dict[str, Any]]:
+        """(llm_messages, stats) for the conversation `messages` (latest user turn last)"""
+        turns = [{"role": m["role"], "content": str(m.get("content") or "")}
+                 for m in messages if m.get("role") in ("user", "assistant")]
+        latest, older = (turns[-1], turns[:-1]) if turns else ({"role": "user", "content": ""}, [])
+        truncated = 0
+
+        system = self._system(result, summarize_history=bool(older))
+        remaining = self.budget - count_message_tokens([system])
+        latest_content, cut = truncate_tokens(latest["content"], max(remaining - MESSAGE_OVERHEAD, MIN_TURN_TOKENS))
+        truncated += int(cut)
+        kept = [{"role": latest["role"], "content": latest_content}]
+        remaining -= count_message_tokens(kept)
+
+        for turn in reversed(older[-(self.max_turns - 1):] if self.max_turns > 1 else []):
+            limit = min(self.message_tokens, remaining - MESSAGE_OVERHEAD)
+            if limit < MIN_TURN_TOKENS:
+                break
+            content, cut = truncate_tokens(turn["content"], limit)
+            kept.insert(0, {"role": turn["role"], "content": content})
+            remaining -= count_tokens(content) + MESSAGE_OVERHEAD
+            truncated += int(cut)
+
+        summarized = len(older) - (len(kept) - 1)
+        if older and not summarized:
+            system = self._system(result, summarize_history=False)
+        llm_messages = [system] + kept
+
+        stats = {
+            "prompt_tokens": count_message_tokens(llm_messages),
+            "uncompacted_tokens": count_message_tokens([system_prompt(result, 10 ** 6, False)] + turns[-self.max_turns:]),
+            "turns_sent": len(kept),
+            "turns_summarized": summarized,
+            "turns_truncated": truncated,
+        }
+        store = get_metrics_store()
+        store.inc("chat.prompts")
+        store.inc("chat.prompt_tokens", stats["prompt_tokens"])
+        store.inc("chat.prompt_tokens_saved", max(0, stats["uncompacted_tokens"] - stats["prompt_tokens"]))
+        store.inc("chat.turns_summarized", summarized)
+        return llm_messages, stats
+
+
+# Global instance
+_chat_context_builder: Optional[ChatContextBuilder] = None
+
+def get_chat_context_builder() -> ChatContextBuilder:
+    """Get global chat context builder"""
+    global _chat_context_builder
+    if _chat_context_builder is None:
+        _chat_context_builder = ChatContextBuilder.from_env()
+    return _chat_context_builder
@@ -0,0 +1,185 @@
+"""
+Circuit breaker for calls to an external dependency (Groq)
+Fails fast while the dependency is erroring or too slow, then probes for recovery
+"""
+import os
+import threading
+import time
+from collections import deque
+from typing import Dict, Any, Deque, Tuple
+
+from .shared_metrics import get_metrics_store
+
+CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling the dependency while the breaker is open"""
+
+    def __init__(self, message: str, retry_in: float = 0.0):
+        super().__init__(message)
+        self.retry_in = retry_in  # Seconds until the breaker lets a probe through
+
+
+class CircuitBreaker:
+    """
+    Rolling-window breaker over call outcomes
+
+    Closed: calls go through and each outcome (failed, slow, ok) is kept for
+    `window` seconds. Once the window holds at least `min_calls` outcomes and
+    either the failure rate reaches `failure_rate` or the share of calls
+    slower than `slow_call_ms` reaches `slow_rate`, the breaker opens.
+
+    Open: allow() returns False (callers fail fast) for `cooldown` seconds.
+
+    Half-open: up to `probes` calls are let through. One success closes the
+    breaker with a fresh window, one failure (or slow call) reopens it.
+
+    Thread-safe - the server loop and the job queue loop share one breaker.
+    """
+
+    def __init__(self, name: str = "llm", window: float = 60.0, min_calls: int = 10,
+                 failure_rate: float = 0.5, slow_call_ms: float = 8000.0, slow_rate: float = 0.8,
+                 cooldown: float = 30.0, probes: int = 1, enabled: bool = True):
+        self.name = name
+        self.window = window
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.slow_call_ms = slow_call_ms
+        self.slow_rate = slow_rate
+        self.cooldown = cooldown
+        self.probes = probes
+        self.enabled = enabled
+
+        self._lock = threading.Lock()
+        self._outcomes: Deque[Tuple[float, bool, bool]] = deque()  # (at, failed, slow)
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probes_in_flight = 0
+        self.opened_count = 0
+        self.rejected_count = 0
+
+    @classmethod
+    def from_env(cls, name: str = "llm") -> "CircuitBreaker":
+        """Build from PLUTO_LLM_BREAKER_* variables"""
+        return cls(
+            name=name,
+            window=float(os.getenv("PLUTO_LLM_BREAKER_WINDOW", "60")),
+            min_calls=int(os.getenv("PLUTO_LLM_BREAKER_MIN_CALLS", "10")),
+            failure_rate=float(os.getenv("PLUTO_LLM_BREAKER_FAILURE_RATE", "0.5")),
+            slow_call_ms=float(os.getenv("PLUTO_LLM_BREAKER_SLOW_MS", "8000")),
+            slow_rate=float(os.getenv("PLUTO_LLM_BREAKER_SLOW_RATE", "0.8")),
+            cooldown=float(os.getenv("PLUTO_LLM_BREAKER_COOLDOWN", "30")),
+            probes=int(os.getenv("PLUTO_LLM_BREAKER_PROBES", "1")),
+            enabled=os.getenv("PLUTO_LLM_BREAKER", "1") != "0",
+        )
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state(time.monotonic())
+
+    def _current_state(self, now: float) -> str:
+        if self._state == OPEN and now - self._opened_at >= self.cooldown:
+            self._state = HALF_OPEN
+            self._probes_in_flight = 0
+        return self._state
+
+    def allow(self) -> bool:
+        """
+        May a call go out now? Every True must be followed by exactly one
+        record_success / record_failure / record_abandoned.
+        """
+        if not self.enabled:
+            return True
+        with self._lock:
+            state = self._current_state(time.monotonic())
+            if state == CLOSED:
+                return True
+            if state == HALF_OPEN and self._probes_in_flight < self.probes:
+                self._probes_in_flight += 1
+                return True
+            self.rejected_count += 1
+        get_metrics_store().inc(f"breaker.rejected|{self.name}")
+        return False
+
+    def retry_in(self) -> float:
+        """Seconds until an open breaker goes half-open (0 when not open)"""
+        with self._lock:
+            now = time.monotonic()
+            if self._current_state(now) != OPEN:
+                return 0.0
+            return max(0.0, self.cooldown - (now - self._opened_at))
+
+    def record_success(self, latency_ms: float) -> None:
+        self._record(failed=False, slow=latency_ms >= self.slow_call_ms)
+
+    def record_failure(self) -> None:
+        self._record(failed=True, slow=False)
+
+    def record_abandoned(self, elapsed_ms: float, deadline_hit: bool = False) -> None:
+        """
+        Caller gave up. Cut off at the caller's deadline (e.g. the triage
+        budget, usually well below slow_call_ms) it was too slow to be of use
+        and counts as a slow call; otherwise (client went away) it only
+        counts if it was already slow.
+        """
+        if deadline_hit or elapsed_ms >= self.slow_call_ms:
+            self._record(failed=False, slow=True)
+        elif self.enabled:
+            with self._lock:
+                if self._state == HALF_OPEN:
+                    self._probes_in_flight = max(0, self._probes_in_flight - 1)
+
+    def _record(self, failed: bool, slow: bool) -> None:
+        if not self.enabled:
+            return
+        now = time.monotonic()
+        with self._lock:
+            state = self._current_state(now)
+            if state == HALF_OPEN:
+                self._probes_in_flight = max(0, self._probes_in_flight - 1)
+                if failed or slow:
+                    self._open(now)
+                else:
+                    self._state = CLOSED
+                    self._outcomes.clear()
+                return
+            if state == OPEN:
+                return  # A call that started before the breaker opened
+
+            self._outcomes.append((now, failed, slow))
+            while self._outcomes and now - self._outcomes[0][0] > self.window:
+                self._outcomes.popleft()
+            total = len(self._outcomes)
+            if total < self.min_calls:
+                return
+            failures = sum(1 for _, f, _ in self._outcomes if f)
+            slow_calls = sum(1 for _, _, s in self._outcomes if s)
+            if failures / total >= self.failure_rate or slow_calls / total >= self.slow_rate:
+                self._open(now)
+
+    def _open(self, now: float) -> None:
+        self._state = OPEN
+        self._opened_at = now
+        self._outcomes.clear()
+        self.opened_count += 1
+        get_metrics_store().inc(f"breaker.opened|{self.name}")
+        print(f"Circuit Breaker: {self.name} opened for {self.cooldown:.0f}s")
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            now = time.monotonic()
+            state = self._current_state(now)
+            total = len(self._outcomes)
+            return {
+                "state": state,
+                "enabled": self.enabled,
+                "window_calls": total,
+                "window_failures": sum(1 for _, f, _ in self._outcomes if f),
+                "window_slow": sum(1 for _, _, s in self._outcomes if s),
+                "opened": self.opened_count,
+                "rejected": self.rejected_count,
+                "retry_in_s": round(max(0.0, self.cooldown - (now - self._opened_at)), 1) if state == OPEN else None,
+            }
@@ -11,12 +11,16 @@ Architecture:
 Author: Pluto Health Team
 """
 
+import hashlib
 import json
 import os
+import time
 from typing import Dict, List, Optional, Any, Literal
 from dataclasses import dataclass, field
 from enum import Enum
 
+from .shared_metrics import get_metrics_store
+
 # Load protocols on import
 PROTOCOLS_PATH = os.path.join(os.path.dirname(__file__), "clinical_protocols.json")
 
@@ -31,6 +35,18 @@ def load_protocols() -> Dict:
 
 PROTOCOLS = load_protocols()
 
+ENGINE_VERSION = "4.0.0"
+
+
+def protocol_hash(protocols: Dict) -> str:
+    """Short content hash identifying a protocol set (stored with triage events)."""
+    canonical = json.dumps(protocols, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:16]
+
+
+PROTOCOL_VERSION = PROTOCOLS.get("meta", {}).get("version", "unknown")
+PROTOCOL_HASH = protocol_hash(PROTOCOLS)
+
 
 class UrgencyLevel(str, Enum):
     """Clinical urgency levels in ascending order of severity."""
@@ -106,6 +122,8 @@ class ReasoningResult:
     what_we_know: List[str]
     what_we_dont_know: List[str]
     anti_hallucination_notes: List[str]
+    stage_timings_ms: Dict[str, float] = field(default_factory=dict)  # Not part of to_dict()
+    is_safety_override: bool = False  # Not part of to_dict()
     
     def to_dict(self) -> Dict:
         return {
@@ -132,9 +150,19 @@ class ClinicalReasoningEngine:
     Stage 3: Generate differential with anti-hallucination safeguards
     """
     
-    def __init__(self):
-        self.protocols = PROTOCOLS.get("triage_protocols", [])
+    def __init__(self, protocols: Optional[Dict] = None):
+        # protocols: an archived protocol set, used to rebuild old triage events
+        self.protocols = (protocols if protocols is not None else PROTOCOLS).get("triage_protocols", [])
         self.protocol_map = {p["id"]: p for p in self.protocols}
+        self._store = get_metrics_store()
+    
+    def get_stats(self, snapshot: Optional[Dict[str, float]] = None) -> Dict[str, int]:
+        """Call counters (merged across workers when metrics are shared)."""
+        snapshot = snapshot if snapshot is not None else self._store.snapshot()
+        return {
+            name: int(snapshot.get(f"engine.{name}", 0))
+            for name in ("calls", "unknown_complaints", "safety_overrides")
+        }
     
     # =========================================================================
     # STAGE 1: CHIEF COMPLAINT CLASSIFICATION
@@ -666,39 +694,84 @@ class ClinicalReasoningEngine:
         Returns:
             ReasoningResult with structured clinical assessment
         """
+        self._store.inc("engine.calls")
         history = history or []
         combined_input = " ".join(history + [user_input])
+        timings: Dict[str, float] = {}
+        started = stage_start = time.perf_counter()
+        
+        def end_stage(name: str) -> None:
+            nonlocal stage_start
+            now = time.perf_counter()
+            timings[name] = (now - stage_start) * 1000
+            stage_start = now
+            timings["total"] = (now - started) * 1000
         
         # Stage 1: Classify - ALWAYS do this first to get differentials
         protocol_ids = self.classify_chief_complaint(combined_input)
+        end_stage("classify")
         
         # Handle unknown complaints
         if "unknown" in protocol_ids:
-            return ReasoningResult(
-                chief_complaint=user_input[:100],
-                matched_protocols=[],
-                criteria_matrix={},
-                urgency_level=UrgencyLevel.MONITOR_FOLLOWUP,
-                urgency_rationale="Unable to match to known clinical pattern",
-                differential_diagnosis=[],
-                follow_up_questions=[
-                    "Can you describe your main symptom in more detail?",
-                    "Where exactly do you feel the discomfort?",
-                    "When did this start?"
-                ],
-                clinical_summary="I need more information to understand your symptoms better.",
-                what_we_know=[],
-                what_we_dont_know=["Chief complaint unclear"],
-                anti_hallucination_notes=[
-                    "Cannot make clinical determination without clear symptom identification"
-                ]
-            )
+            self._store.inc("engine.unknown_complaints")
+            return self.unknown_result(user_input[:100], timings)
         
         # Stage 2: Build and populate criteria matrix
         criteria_matrix = self.build_criteria_matrix(protocol_ids)
         criteria_matrix = self.extract_evidence_from_input(combined_input, criteria_matrix)
+        end_stage("criteria")
+        
+        # Safety overrides first (they win over the criteria), then normal urgency
+        urgency, rationale = self._check_safety_overrides(combined_input)
+        is_override = urgency is not None
+        if is_override:
+            self._store.inc("engine.safety_overrides")
+        else:
+            urgency, rationale = self.compute_urgency_level(criteria_matrix, combined_input)
+        end_stage("urgency")
         
-        # Get differentials and follow-up questions BEFORE checking overrides
+        # Stage 3: Differentials, follow-ups and summary
+        result = self.assemble_result(protocol_ids, criteria_matrix, urgency, rationale, is_override, timings)
+        end_stage("differential")
+        return result
+    
+    def unknown_result(self, chief_complaint: str, timings: Optional[Dict[str, float]] = None) -> ReasoningResult:
+        """Result for input that matched no protocol."""
+        return ReasoningResult(
+            chief_complaint=chief_complaint,
+            matched_protocols=[],
+            criteria_matrix={},
+            urgency_level=UrgencyLevel.MONITOR_FOLLOWUP,
+            urgency_rationale="Unable to match to known clinical pattern",
+            differential_diagnosis=[],
+            follow_up_questions=[
+                "Can you describe your main symptom in more detail?",
+                "Where exactly do you feel the discomfort?",
+                "When did this start?"
+            ],
+            clinical_summary="I need more information to understand your symptoms better.",
+            what_we_know=[],
+            what_we_dont_know=["Chief complaint unclear"],
+            anti_hallucination_notes=[
+                "Cannot make clinical determination without clear symptom identification"
+            ],
+            stage_timings_ms=timings if timings is not None else {}
+        )
+    
+    def assemble_result(
+        self,
+        protocol_ids: List[str],
+        criteria_matrix: Dict[str, CriteriaMatrix],
+        urgency: UrgencyLevel,
+        rationale: str,
+        is_override: bool,
+        timings: Optional[Dict[str, float]] = None
+    ) -> ReasoningResult:
+        """
+        Build the full result from the matched protocols, the populated
+        criteria matrix and the urgency decision. Everything else is derived,
+        which is what lets stored triage events be rebuilt (triage_codec.py).
+        """
         differentials = self.get_differential_diagnosis(protocol_ids, criteria_matrix)
         follow_ups = self.generate_follow_up_questions(criteria_matrix)
         
@@ -719,33 +792,30 @@ class ClinicalReasoningEngine:
             for urf in matrix.get_unresolved_red_flags():
                 what_we_dont_know.append(f"❓ {urf.name}: Unknown")
         
-        # NOW check safety overrides - but WITH all the clinical context
-        override_level, override_rationale = self._check_safety_overrides(combined_input)
-        if override_level is not None:
+        if is_override:
             # Safety override triggered - return with override urgency BUT with differentials
             return ReasoningResult(
                 chief_complaint=chief_complaint,
                 matched_protocols=protocol_ids,
                 criteria_matrix=criteria_matrix,
-                urgency_level=override_level,
-                urgency_rationale=override_rationale,
-                differential_diagnosis=differentials,  # Now populated!
+                urgency_level=urgency,
+                urgency_rationale=rationale,
+                differential_diagnosis=differentials,
                 follow_up_questions=[
                     "Please go to an emergency room or urgent care immediately.",
                     "If symptoms worsen, call emergency services (911)."
-                ] if override_level == UrgencyLevel.EMERGENCY else follow_ups,
-                clinical_summary=override_rationale,
+                ] if urgency == UrgencyLevel.EMERGENCY else follow_ups,
+                clinical_summary=rationale,
                 what_we_know=what_we_know,
                 what_we_dont_know=what_we_dont_know,
                 anti_hallucination_notes=[
                     "This urgency level was determined by a SAFETY OVERRIDE rule.",
                     "High-risk populations and patterns require immediate escalation."
-                ]
+                ],
+                stage_timings_ms=timings if timings is not None else {},
+                is_safety_override=True
             )
         
-        # Stage 3: Compute urgency (for normal flow)
-        urgency, rationale = self.compute_urgency_level(criteria_matrix, combined_input)
-        
         # Anti-hallucination notes
         anti_hallucination = []
         if what_we_dont_know:
@@ -757,11 +827,6 @@ class ClinicalReasoningEngine:
                 "Defaulting to URGENT due to insufficient information - cannot rule out serious cause"
             )
         
-        # Get chief complaint name
-        chief_complaint = protocol_ids[0] if protocol_ids else "unknown"
-        if chief_complaint in self.protocol_map:
-            chief_complaint = self.protocol_map[chief_complaint]["symptom"]
-        
         # Clinical summary
         summary = self._generate_summary(chief_complaint, urgency, what_we_know, follow_ups)
         
@@ -776,7 +841,8 @@ class ClinicalReasoningEngine:
             clinical_summary=summary,
             what_we_know=what_we_know,
             what_we_dont_know=what_we_dont_know,
-            anti_hallucination_notes=anti_hallucination
+            anti_hallucination_notes=anti_hallucination,
+            stage_timings_ms=timings if timings is not None else {}
         )
     
     def _generate_summary(
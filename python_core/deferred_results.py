@@ -0,0 +1,160 @@
+"""
+Short-lived results that finish after their response was sent (e.g. the LLM
+triage summary in two-phase mode), readable from any worker on the host
+"""
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Any, Optional, Set, Tuple
+
+from .ids import new_id
+from .local_store import connect_local_db
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS deferred_results (
+    id TEXT PRIMARY KEY,
+    owner TEXT,
+    status TEXT NOT NULL,
+    value TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+"""
+
+PENDING, READY, FAILED = "pending", "ready", "failed"
+
+
+class DeferredResults:
+    """
+    Pending -> ready/failed slots in a local SQLite file
+
+    A slot is created with a fallback value while the request is still
+    running, completed later by whichever task produces the real value, and
+    expires after `ttl` seconds. Ids are ULIDs (80 random bits), and a slot
+    created for a signed-in user is only readable by that user.
+
+    All SQLite access runs in a thread, off the event loop. Long-poll
+    waiters in this process are woken by complete() through an
+    asyncio.Event; the file is re-read every `poll_interval` seconds only
+    to catch slots completed by another worker.
+    """
+
+    def __init__(self, path: Optional[Path] = Path("logs/deferred_results.db"), ttl: float = 300.0,
+                 poll_interval: float = 1.0):
+        self.path = Path(path) if path is not None else None
+        self.ttl = ttl
+        self.poll_interval = poll_interval
+        self._waiters: Dict[str, Set[Tuple[asyncio.AbstractEventLoop, asyncio.Event]]] = {}
+        self._waiters_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+
+    @classmethod
+    def from_env(cls) -> "DeferredResults":
+        default_path = "/tmp/pluto-deferred-results.db" if os.getenv("VERCEL") else "logs/deferred_results.db"
+        return cls(
+            path=Path(os.getenv("PLUTO_DEFERRED_DB", default_path)),
+            ttl=float(os.getenv("PLUTO_DEFERRED_TTL", "300")),
+            poll_interval=float(os.getenv("PLUTO_DEFERRED_POLL_MS", "1000")) / 1000,
+        )
+
+    def _execute(self, sql: str, params: tuple = ()) -> list:
+        with self._lock:
+            if self._conn is None or self._pid != os.getpid():
+                self._conn = connect_local_db(self.path, _SCHEMA)
+                self._pid = os.getpid()
+            return self._conn.execute(sql, params).fetchall()
+
+    async def create(self, owner: Optional[str], fallback: str, prefix: str = "res") -> Optional[str]:
+        """New pending slot; None if the store is unavailable"""
+        return await asyncio.to_thread(self._create, owner, fallback, prefix)
+
+    async def complete(self, result_id: str, value: Optional[str]) -> None:
+        """Store the produced value, or mark failed (fallback kept) when value is None"""
+        await asyncio.to_thread(self._complete, result_id, value)
+        with self._waiters_lock:
+            waiters = list(self._waiters.get(result_id, ()))
+        for loop, event in waiters:
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                pass  # That waiter's loop is gone
+
+    async def get(self, result_id: str, owner: Optional[str]) -> Optional[Dict[str, Any]]:
+        """{'status', 'value'} or None if unknown, expired or owned by someone else"""
+        return await asyncio.to_thread(self._get, result_id, owner)
+
+    async def wait(self, result_id: str, owner: Optional[str], timeout: float) -> Optional[Dict[str, Any]]:
+        """Long-poll: return once the slot leaves pending or `timeout` passes"""
+        deadline = time.monotonic() + timeout
+        waiter = (asyncio.get_running_loop(), asyncio.Event())
+        with self._waiters_lock:
+            self._waiters.setdefault(result_id, set()).add(waiter)
+        try:
+            while True:
+                entry = await self.get(result_id, owner)
+                remaining = deadline - time.monotonic()
+                if entry is None or entry["status"] != PENDING or remaining <= 0:
+                    return entry
+                try:
+                    await asyncio.wait_for(waiter[1].wait(), min(self.poll_interval, remaining))
+                except asyncio.TimeoutError:
+                    pass  # Re-read: another worker may have completed it
+        finally:
+            with self._waiters_lock:
+                waiters = self._waiters.get(result_id)
+                if waiters is not None:
+                    waiters.discard(waiter)
+                    if not waiters:
+                        del self._waiters[result_id]
+
+    def _create(self, owner: Optional[str], fallback: str, prefix: str) -> Optional[str]:
+        result_id = new_id(prefix)
+        now = time.time()
+        try:
+            self._execute("DELETE FROM deferred_results WHERE expires_at <= ?", (now,))
+            self._execute(
+                "INSERT INTO deferred_results (id, owner, status, value, expires_at) VALUES (?, ?, ?, ?, ?)",
+                (result_id, owner, PENDING, fallback, now + self.ttl),
+            )
+        except (OSError, sqlite3.Error) as e:
+            print(f"Deferred Results Error: {e}")
+            return None
+        return result_id
+
+    def _complete(self, result_id: str, value: Optional[str]) -> None:
+        try:
+            if value is None:
+                self._execute("UPDATE deferred_results SET status = ? WHERE id = ?", (FAILED, result_id))
+            else:
+                self._execute("UPDATE deferred_results SET status = ?, value = ? WHERE id = ?",
+                              (READY, value, result_id))
+        except (OSError, sqlite3.Error) as e:
+            print(f"Deferred Results Error: {e}")
+
+    def _get(self, result_id: str, owner: Optional[str]) -> Optional[Dict[str, Any]]:
+        try:
+            rows = self._execute(
+                "SELECT owner, status, value FROM deferred_results WHERE id = ? AND expires_at > ?",
+                (result_id, time.time()),
+            )
+        except (OSError, sqlite3.Error) as e:
+            print(f"Deferred Results Error: {e}")
+            return None
+        if not rows or (rows[0][0] is not None and rows[0][0] != owner):
+            return None
+        return {"status": rows[0][1], "value": rows[0][2]}
+
+
+# Global instance
+_deferred_results: Optional[DeferredResults] = None
+
+def get_deferred_results() -> DeferredResults:
+    """Get global deferred result store"""
+    global _deferred_results
+    if _deferred_results is None:
+        _deferred_results = DeferredResults.from_env()
+    return _deferred_results
@@ -0,0 +1,494 @@
+"""
+Write-behind persistence for TriageEvent rows
+Takes the per-triage INSERT + COMMIT off the request path and batches it
+"""
+import asyncio
+import atexit
+import json
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+
+from sqlalchemy import exc as sa_exc
+from sqlalchemy.dialects import postgresql, sqlite
+
+from .models import TriageEvent, get_shared_engine
+from .shared_metrics import get_metrics_store
+
+# Errors worth retrying: the database or network is unavailable, not the data
+TRANSIENT_ERRORS = (sa_exc.OperationalError, sa_exc.InterfaceError,
+                    sa_exc.DisconnectionError, sa_exc.TimeoutError)
+
+_NEW = object()   # A row was appended to the spill file
+_WAKE = object()  # Flush or close requested
+
+# Compact the spill file once this many acknowledged bytes sit at its head
+# (and they are at least half of it) - keeps acks O(1) amortized
+COMPACT_BYTES = 4 * 1024 * 1024
+
+
+def _encode(event: TriageEvent) -> str:
+    row = event.model_dump()
+    if isinstance(row.get("createdAt"), datetime):
+        row["createdAt"] = row["createdAt"].isoformat()
+    return json.dumps(row)
+
+
+def _decode(line: str) -> Dict[str, Any]:
+    row = json.loads(line)
+    if row.get("createdAt"):
+        row["createdAt"] = datetime.fromisoformat(row["createdAt"])
+    return row
+
+
+class TriageEventWriter:
+    """
+    Journals TriageEvents to a spill file and inserts them from one background thread
+
+    submit() appends the row to a per-process spill file (kept open, on a
+    worker thread so the event loop never blocks on disk) before returning,
+    so once the client has its response the row survives a worker crash, DB
+    outages and restarts (orphaned spill files from dead workers are replayed
+    by start(), which the app calls at startup). The append is not fsynced: a host crash or power loss can
+    still lose rows the OS had not yet written out. Without a spill file
+    (directory unwritable) rows are held in memory only and a crash loses them.
+
+    The worker reads the file from a persisted read offset, so acknowledging
+    a batch is one small offset write; the file is truncated once fully
+    written and compacted when the acknowledged head grows past COMPACT_BYTES.
+    Batches are written as one multi-row INSERT ... ON CONFLICT DO NOTHING,
+    which keeps replays idempotent. Transient DB errors are retried with
+    exponential backoff; a batch failing for any other reason is retried row by
+    row so one bad row (e.g. a since-deleted user) can't block the rest.
+    """
+
+    def __init__(self, spill_dir: Optional[Path] = Path("logs"), batch_size: int = 100,
+                 flush_interval: float = 1.0, max_queue: int = 10000,
+                 max_backoff: float = 30.0, enabled: bool = True):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+        self.max_backoff = max_backoff
+        self.enabled = enabled
+        self.spill_dir = Path(spill_dir) if spill_dir is not None else None
+
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_queue)
+        self._spill_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._flush_waiters: List[threading.Event] = []
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self._spill_path: Optional[Path] = None
+        self._spill_file = None  # Append handle, reopened after compaction
+        self._offset = 0  # Bytes at the head of the spill file already in the database
+        self._memory_pending: List[str] = []  # Used when there is no spill file
+        self._closed = False
+        self._atexit_registered = False
+        self._store = get_metrics_store()
+
+    @classmethod
+    def from_env(cls) -> "TriageEventWriter":
+        """
+        Build from PLUTO_EVENT_* variables. Off by default on Vercel, where
+        background threads are frozen between invocations.
+        """
+        default_enabled = "0" if os.getenv("VERCEL") else "1"
+        return cls(
+            spill_dir=Path(os.getenv("PLUTO_EVENT_SPILL_DIR", "logs")),
+            batch_size=int(os.getenv("PLUTO_EVENT_BATCH_SIZE", "100")),
+            flush_interval=float(os.getenv("PLUTO_EVENT_FLUSH_INTERVAL", "1.0")),
+            max_queue=int(os.getenv("PLUTO_EVENT_QUEUE_SIZE", "10000")),
+            enabled=os.getenv("PLUTO_EVENT_WRITE_BEHIND", default_enabled) != "0",
+        )
+
+    # =========================================================================
+    # PRODUCER SIDE (request path)
+    # =========================================================================
+
+    def start(self) -> bool:
+        """Create the engine, open the spill file and adopt orphans - call at app startup"""
+        if not self.enabled or self._closed or get_shared_engine() is None:
+            return False
+        return self._ensure_started()
+
+    async def submit(self, event: TriageEvent) -> bool:
+        """
+        Journal an event for insertion (one unsynced file append, off the loop).
+
+        Returns:
+            False if write-behind is unavailable - the caller must write the
+            event itself
+        """
+        if not self.enabled or self._closed:
+            return False
+        return await asyncio.to_thread(self._submit, _encode(event))
+
+    def _submit(self, line: str) -> bool:
+        if not self.start():
+            return False
+        if not self._append_spill([line]):
+            self._store.inc("event_writer.fallbacks")
+            return False
+        try:
+            self._queue.put_nowait(_NEW)
+        except queue.Full:
+            pass  # The row is journaled; the next flush tick picks it up
+        self._store.inc("event_writer.enqueued")
+        return True
+
+    def _ensure_started(self) -> bool:
+        """Start (or restart after fork) the background worker thread"""
+        pid = os.getpid()
+        if self._thread is not None and self._pid == pid and self._thread.is_alive():
+            return True
+
+        with self._start_lock:
+            if self._thread is not None and self._pid == pid and self._thread.is_alive():
+                return True
+
+            if self._pid != pid:
+                self._queue = queue.Queue(maxsize=self.max_queue)
+                self._flush_waiters = []
+                self._memory_pending = []
+                with self._spill_lock:
+                    if self._spill_file is not None:
+                        self._spill_file.close()  # The parent's handle
+                    self._spill_path = self._open_spill(pid)
+                    self._spill_file = self._open_handle()
+
+            try:
+                self._thread = threading.Thread(
+                    target=self._run, name="pluto-event-writer", daemon=True
+                )
+                self._thread.start()
+            except RuntimeError:
+                return False
+
+            self._pid = pid
+            if not self._atexit_registered:
+                atexit.register(self.close)
+                self._atexit_registered = True
+        return True
+
+    # =========================================================================
+    # SPILL FILE
+    # =========================================================================
+
+    def _open_spill(self, pid: int) -> Optional[Path]:
+        """Pick this process's spill file and adopt files left by dead workers"""
+        if self.spill_dir is None:
+            return None
+        try:
+            self.spill_dir.mkdir(parents=True, exist_ok=True)
+            path = self.spill_dir / f"triage_events.{pid}.spill"
+            self._offset = _read_offset(path)  # Non-zero only for a recycled pid
+            with open(path, 'a'):
+                pass
+        except OSError as e:
+            print(f"Event Writer Error: spill file unavailable in {self.spill_dir} ({e}) - buffering in memory")
+            return None
+
+        for orphan in self.spill_dir.glob("triage_events.*.spill"):
+            if orphan == path or _pid_alive(orphan):
+                continue
+            try:
+                self._adopt(orphan, path)
+            except FileNotFoundError:
+                continue  # Another worker adopted it first
+            except OSError as e:
+                print(f"Event Writer Error: could not adopt {orphan} ({e}) - will retry on next start")
+        return path
+
+    @staticmethod
+    def _adopt(orphan: Path, path: Path) -> None:
+        """
+        Move a dead worker's unwritten rows into our spill file. Two workers
+        adopting the same orphan both copy it; the duplicate rows are harmless
+        (ON CONFLICT DO NOTHING) and whoever unlinks second just moves on.
+        """
+        offset = _read_offset(orphan)
+        with open(orphan, 'rb') as src:
+            src.seek(offset)
+            content = src.read()
+        # A crash mid-append can leave a torn last line - drop it
+        content = content[:content.rfind(b'\n') + 1]
+        if content:
+            with open(path, 'ab') as dst:
+                dst.write(content)
+        orphan.unlink(missing_ok=True)
+        _offset_path(orphan).unlink(missing_ok=True)
+
+    def _open_handle(self):
+        """Append handle for the spill file (caller holds the spill lock)"""
+        if self._spill_path is None:
+            return None
+        try:
+            return open(self._spill_path, 'ab')
+        except OSError as e:
+            print(f"Event Writer Error ({self._spill_path}): {e}")
+            return None
+
+    def _append_spill(self, lines: List[str]) -> bool:
+        with self._spill_lock:
+            if self._spill_path is None:
+                if len(self._memory_pending) >= self.max_queue:
+                    return False
+                self._memory_pending.extend(lines)
+                return True
+            try:
+                if self._spill_file is None or self._spill_file.closed:
+                    self._spill_file = open(self._spill_path, 'ab')
+                self._spill_file.write(''.join(line + '\n' for line in lines).encode('utf-8'))
+                self._spill_file.flush()  # Into the OS page cache; survives a process crash
+                return True
+            except OSError as e:
+                print(f"Event Writer Error ({self._spill_path}): {e}")
+                return False
+
+    def _read_spill(self, limit: int) -> Tuple[List[str], int]:
+        """First `limit` unacknowledged rows and the byte offset just past them"""
+        with self._spill_lock:
+            if self._spill_path is None:
+                lines = self._memory_pending[:limit]
+                return lines, len(lines)
+            lines: List[str] = []
+            offset = self._offset
+            try:
+                with open(self._spill_path, 'rb') as f:
+                    f.seek(offset)
+                    for raw in f:
+                        if not raw.endswith(b'\n'):
+                            break  # Torn write at the tail
+                        offset += len(raw)
+                        if raw.strip():
+                            lines.append(raw.decode('utf-8').rstrip('\n'))
+                        if len(lines) >= limit:
+                            break
+            except FileNotFoundError:
+                pass
+            return lines, offset
+
+    def _ack_spill(self, offset: int) -> None:
+        """Mark everything before byte `offset` (rows) as safely in the database"""
+        with self._spill_lock:
+            if self._spill_path is None:
+                del self._memory_pending[:offset]
+                return
+            try:
+                size = self._spill_path.stat().st_size
+                if offset >= size:
+                    # Fully written: start the file over (appends hold this lock too)
+                    os.truncate(self._spill_path, 0)
+                    offset = 0
+                elif offset >= COMPACT_BYTES and offset * 2 >= size:
+                    with open(self._spill_path, 'rb') as f:
+                        f.seek(offset)
+                        rest = f.read()
+                    tmp_path = self._spill_path.with_suffix(".tmp")
+                    with open(tmp_path, 'wb') as f:
+                        f.write(rest)
+                    os.replace(tmp_path, self._spill_path)
+                    offset = 0
+                    if self._spill_file is not None:
+                        self._spill_file.close()  # Still points at the replaced file
+                    self._spill_file = self._open_handle()
+                _write_offset(self._spill_path, offset)
+                self._offset = offset
+            except OSError as e:
+                # Rows stay in the file and are replayed; ON CONFLICT makes that harmless
+                print(f"Event Writer Error ({self._spill_path}): {e}")
+
+    def _spill_size(self) -> int:
+        with self._spill_lock:
+            if self._spill_path is None:
+                return sum(len(line) + 1 for line in self._memory_pending)
+            try:
+                return max(0, self._spill_path.stat().st_size - self._offset)
+            except OSError:
+                return 0
+
+    # =========================================================================
+    # CONTROL
+    # =========================================================================
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Block until everything submitted so far has been attempted"""
+        if self._thread is None or not self._thread.is_alive() or self._pid != os.getpid():
+            return True
+        done = threading.Event()
+        with self._start_lock:
+            self._flush_waiters.append(done)
+        try:
+            self._queue.put_nowait(_WAKE)
+        except queue.Full:
+            pass
+        return done.wait(timeout)
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Try to write everything pending; leftovers stay in the spill file"""
+        if self._closed:
+            return
+        self._closed = True
+        thread = self._thread
+        if thread is not None and thread.is_alive() and self._pid == os.getpid():
+            try:
+                self._queue.put_nowait(_WAKE)
+            except queue.Full:
+                pass
+            thread.join(timeout)
+        with self._spill_lock:
+            if self._spill_file is not None:
+                self._spill_file.close()
+                self._spill_file = None
+
+    def get_stats(self, snapshot: Optional[Dict[str, float]] = None) -> Dict[str, Any]:
+        """Counters plus queue and spill backlog (backlog fields are per-process)"""
+        snapshot = snapshot if snapshot is not None else self._store.snapshot()
+        return {
+            **{name: int(snapshot.get(f"event_writer.{name}", 0))
+               for name in ("enqueued", "inserted", "batches", "retries", "rejected", "fallbacks")},
+            "queue_depth": self._queue.qsize(),
+            "spill_backlog_bytes": self._spill_size(),
+            "enabled": self.enabled and not self._closed,
+        }
+
+    # =========================================================================
+    # WORKER SIDE
+    # =========================================================================
+
+    def _run(self) -> None:
+        deadline = time.monotonic() + self.flush_interval
+        backoff = 0.0
+        retry_at = 0.0
+        pending = 0
+
+        while True:
+            try:
+                item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                item = None
+            if item is _NEW:
+                pending += 1
+
+            waiters = None
+            if self._flush_waiters or self._closed:
+                with self._start_lock:
+                    waiters, self._flush_waiters = self._flush_waiters, []
+                self._drain()
+
+            now = time.monotonic()
+            if pending >= self.batch_size or now >= deadline or waiters is not None:
+                pending = 0
+                deadline = now + self.flush_interval
+
+                if now >= retry_at or waiters is not None:
+                    if self._write_backlog():
+                        backoff = 0.0
+                        retry_at = 0.0
+                    else:
+                        backoff = min(self.max_backoff, max(0.5, backoff * 2))
+                        retry_at = time.monotonic() + backoff
+
+            for waiter in waiters or ():
+                waiter.set()
+
+            if self._closed and self._queue.empty():
+                return
+
+    def _drain(self) -> None:
+        """Discard queued signals - the spill file is the source of truth"""
+        while True:
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                return
+
+    def _write_backlog(self) -> bool:
+        """Insert spilled rows batch by batch. False on a transient DB error."""
+        while True:
+            lines, offset = self._read_spill(self.batch_size)
+            if not lines:
+                return True
+            rows = []
+            for line in lines:
+                try:
+                    rows.append(_decode(line))
+                except ValueError:
+                    self._store.inc("event_writer.rejected")
+            try:
+                self._insert(rows)
+            except TRANSIENT_ERRORS as e:
+                self._store.inc("event_writer.retries")
+                print(f"Event Writer Error: database unavailable, will retry ({e.__class__.__name__})")
+                return False
+            except Exception:
+                # Isolate the bad row(s) so the rest of the batch still lands
+                for row in rows:
+                    try:
+                        self._insert([row])
+                    except TRANSIENT_ERRORS:
+                        self._store.inc("event_writer.retries")
+                        return False
+                    except Exception as e:
+                        self._store.inc("event_writer.rejected")
+                        print(f"Event Writer Error: rejected TriageEvent {row.get('id')}: {e}")
+            self._ack_spill(offset)
+
+    def _insert(self, rows: List[Dict[str, Any]]) -> None:
+        if not rows:
+            return
+        engine = get_shared_engine()
+        table = TriageEvent.__table__
+        if engine.dialect.name == "postgresql":
+            stmt = postgresql.insert(table).on_conflict_do_nothing(index_elements=["id"])
+        elif engine.dialect.name == "sqlite":
+            stmt = sqlite.insert(table).on_conflict_do_nothing(index_elements=["id"])
+        else:
+            stmt = table.insert()
+        with engine.begin() as conn:
+            conn.execute(stmt, rows)  # Rendered as multi-row VALUES batches
+        self._store.inc("event_writer.inserted", len(rows))
+        self._store.inc("event_writer.batches")
+
+
+def _offset_path(spill_path: Path) -> Path:
+    return spill_path.with_suffix(".offset")
+
+
+def _read_offset(spill_path: Path) -> int:
+    try:
+        return int(_offset_path(spill_path).read_text() or 0)
+    except (OSError, ValueError):
+        return 0
+
+
+def _write_offset(spill_path: Path, offset: int) -> None:
+    tmp_path = _offset_path(spill_path).with_suffix(".offset.tmp")
+    tmp_path.write_text(str(offset))
+    os.replace(tmp_path, _offset_path(spill_path))
+
+
+def _pid_alive(spill_path: Path) -> bool:
+    try:
+        pid = int(spill_path.name.split(".")[1])
+        os.kill(pid, 0)
+        return True
+    except (ValueError, IndexError, ProcessLookupError):
+        return False
+    except PermissionError:
+        return True  # Exists, owned by someone else
+
+
+# Global instance
+_event_writer: Optional[TriageEventWriter] = None
+
+def get_event_writer() -> TriageEventWriter:
+    """Get global TriageEvent writer"""
+    global _event_writer
+    if _event_writer is None:
+        _event_writer = TriageEventWriter.from_env()
+    return _event_writer
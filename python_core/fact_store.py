@@ -0,0 +1,106 @@
+"""
+Deduplicated MedicalFact persistence
+Re-reported facts bump lastSeen/seenCount instead of adding rows
+"""
+import hashlib
+import re
+import unicodedata
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple
+
+from sqlalchemy.dialects import postgresql, sqlite
+
+from .models import MedicalFact
+from .ids import new_id
+
+# LLM extraction labels vary ("Meds", "Medications", "Allergies") - fold them
+FACT_TYPE_ALIASES = {
+    "condition": "Condition", "conditions": "Condition", "diagnosis": "Condition",
+    "med": "Medication", "meds": "Medication", "medication": "Medication", "medications": "Medication",
+    "allergy": "Allergy", "allergies": "Allergy",
+}
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_fact(fact_type: str, value: str) -> Tuple[str, str]:
+    """Canonical (type, value) used for deduplication"""
+    key = _WHITESPACE.sub(" ", str(fact_type)).strip().lower()
+    canonical_type = FACT_TYPE_ALIASES.get(key, key.title())
+
+    text = unicodedata.normalize("NFKC", str(value)).casefold()
+    text = _WHITESPACE.sub(" ", text).strip().rstrip(".,;:!")
+    return canonical_type, text
+
+
+def fact_hash(user_id: str, fact_type: str, value: str) -> str:
+    """Stable hash over (userId, normalized type, normalized value)"""
+    canonical_type, text = normalize_fact(fact_type, value)
+    return hashlib.sha256(f"{user_id}\x1f{canonical_type}\x1f{text}".encode("utf-8")).hexdigest()
+
+
+def build_fact_rows(user_id: str, facts: List[Dict[str, Any]], source: str,
+                    now: Optional[datetime] = None) -> List[Dict[str, Any]]:
+    """
+    Turn extracted {'type', 'value'} dicts into MedicalFact rows, one per
+    distinct hash (an upsert can't touch the same row twice in one statement)
+    """
+    now = now or datetime.utcnow()
+    rows: Dict[str, Dict[str, Any]] = {}
+    for fact in facts:
+        if not isinstance(fact, dict) or not fact.get("type") or not fact.get("value"):
+            continue
+        digest = fact_hash(user_id, fact["type"], fact["value"])
+        if digest in rows:
+            continue
+        rows[digest] = {
+            "id": new_id("fact"),
+            "userId": user_id,
+            "type": normalize_fact(fact["type"], fact["value"])[0],
+            "value": _WHITESPACE.sub(" ", str(fact["value"])).strip(),
+            "meta": fact.get("meta") or {},
+            "confidence": "Reported",
+            "source": source,
+            "createdAt": now,
+            "factHash": digest,
+            "lastSeen": now,
+            "seenCount": 1,
+        }
+    return list(rows.values())
+
+
+def build_fact_upsert(dialect_name: str, rows: List[Dict[str, Any]]):
+    """
+    Single multi-row INSERT ... ON CONFLICT (userId, factHash) DO UPDATE that
+    refreshes lastSeen and increments seenCount on re-confirmation
+    """
+    dialect = postgresql if dialect_name == "postgresql" else sqlite
+    table = MedicalFact.__table__
+    stmt = dialect.insert(table).values(rows)
+    return stmt.on_conflict_do_update(
+        index_elements=[table.c.userId, table.c.factHash],
+        set_={
+            "lastSeen": stmt.excluded.lastSeen,
+            "seenCount": table.c.seenCount + 1,
+        },
+    )
+
+
+async def upsert_facts(db, user_id: str, facts: List[Dict[str, Any]], source: str) -> int:
+    """Persist extracted facts in one statement. Returns distinct facts written."""
+    rows = build_fact_rows(user_id, facts, source)
+    if not rows:
+        return 0
+    await db.exec(build_fact_upsert(db.bind.dialect.name, rows))
+    await db.commit()
+    return len(rows)
+
+
+def write_facts(engine, user_id: str, facts: List[Dict[str, Any]], source: str) -> int:
+    """Blocking variant of upsert_facts for background workers (sync engine)"""
+    rows = build_fact_rows(user_id, facts, source)
+    if not rows:
+        return 0
+    with engine.begin() as conn:
+        conn.execute(build_fact_upsert(engine.dialect.name, rows))
+    return len(rows)
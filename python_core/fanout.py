@@ -0,0 +1,136 @@
+"""
+Run independent request steps concurrently under one latency budget
+Wall-clock cost is the slowest step (capped by the budget), not the sum
+"""
+import asyncio
+import time
+from contextvars import ContextVar
+from typing import Dict, Any, Awaitable, Iterable, Optional, Set
+
+from .logger import get_logger
+from .shared_metrics import get_metrics_store
+
+OK, FAILED, TIMEOUT, DETACHED, SKIPPED = "ok", "failed", "timeout", "detached", "skipped"
+OUTCOMES = (OK, FAILED, TIMEOUT, DETACHED, SKIPPED)
+
+# Detached steps outlive their request; keep references so they aren't GC'd
+_detached: Set[asyncio.Task] = set()
+
+# Monotonic deadline of the step running in the current task (unset outside fan_out)
+_deadline: ContextVar[Optional[float]] = ContextVar("fanout_deadline", default=None)
+
+
+def current_deadline() -> Optional[float]:
+    """time.monotonic() at which the enclosing fan_out step will be cancelled, if any"""
+    return _deadline.get()
+
+
+def _finish_detached(task: asyncio.Task) -> None:
+    _detached.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        print(f"Detached Step Error: {task.exception()}")
+
+
+class StepResult:
+    def __init__(self, outcome: str, value: Any = None):
+        self.outcome = outcome
+        self.value = value
+
+    @property
+    def ok(self) -> bool:
+        return self.outcome == OK
+
+
+async def fan_out(steps: Dict[str, Optional[Awaitable]], budget_s: float,
+                  detach: Iterable[str] = (), required: Iterable[str] = (),
+                  family: str = "triage_step") -> Dict[str, StepResult]:
+    """
+    Start every step at once and wait at most `budget_s` for all of them.
+
+    A None step is recorded as skipped. Steps still running at the deadline
+    are cancelled (timeout), except:
+    - those named in `required`, which are waited for past the budget; if
+      one fails its exception is raised once the other steps are settled.
+      Use that for writes that must not be lost.
+    - those named in `detach`, which keep running in the background with
+      nobody waiting on them - only for work whose failure is acceptable
+      and only where background tasks outlive the response (not serverless).
+    Outcomes are counted as `{family}.{outcome}|{name}` and completed steps'
+    durations recorded under the `family` latency family. Each step can read
+    its deadline with current_deadline().
+    """
+    store = get_metrics_store()
+    logger = get_logger()
+    detach = set(detach)
+    required = set(required)
+    results: Dict[str, StepResult] = {}
+    tasks: Dict[asyncio.Task, str] = {}
+    start = time.perf_counter()
+    deadline = time.monotonic() + max(0.0, budget_s)
+
+    def timed(name: str, awaitable: Awaitable):
+        async def run():
+            _deadline.set(deadline)  # Each task runs in its own context copy
+            value = await awaitable
+            # Only completed steps: cancelled or failed ones would skew the histogram
+            logger.record_latency(family, name, (time.perf_counter() - start) * 1000)
+            return value
+        return run()
+
+    for name, awaitable in steps.items():
+        if awaitable is None:
+            results[name] = StepResult(SKIPPED)
+        else:
+            tasks[asyncio.ensure_future(timed(name, awaitable))] = name
+
+    required_error: Optional[BaseException] = None
+    if tasks:
+        done, pending = await asyncio.wait(tasks, timeout=max(0.0, budget_s))
+
+        cancelled = []
+        late = set()
+        for task in pending:
+            name = tasks[task]
+            if name in required:
+                late.add(task)
+            elif name in detach:
+                _detached.add(task)
+                task.add_done_callback(_finish_detached)
+                results[name] = StepResult(DETACHED)
+            else:
+                task.cancel()
+                cancelled.append(task)
+                results[name] = StepResult(TIMEOUT)
+        if cancelled:
+            await asyncio.gather(*cancelled, return_exceptions=True)
+        if late:
+            await asyncio.wait(late)
+            done |= late
+
+        for task in done:
+            name = tasks[task]
+            if task.exception() is not None:
+                print(f"Step Error ({name}): {task.exception()}")
+                results[name] = StepResult(FAILED)
+                if name in required and required_error is None:
+                    required_error = task.exception()
+            else:
+                results[name] = StepResult(OK, task.result())
+
+    for name, result in results.items():
+        store.inc(f"{family}.{result.outcome}|{name}")
+    if required_error is not None:
+        raise required_error
+    return results
+
+
+def get_fanout_stats(snapshot: Dict[str, float], family: str = "triage_step") -> Dict[str, Dict[str, int]]:
+    """Outcome counts by step name"""
+    stats: Dict[str, Dict[str, int]] = {}
+    prefix = f"{family}."
+    for key, value in snapshot.items():
+        if key.startswith(prefix) and "|" in key:
+            outcome, name = key[len(prefix):].split("|", 1)
+            if outcome in OUTCOMES:
+                stats.setdefault(name, {o: 0 for o in OUTCOMES})[outcome] = int(value)
+    return stats
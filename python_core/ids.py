@@ -0,0 +1,68 @@
+"""
+Time-ordered IDs for rows created by the Python API
+ULID layout: 48-bit millisecond timestamp + 80 random bits, Crockford base32
+"""
+import os
+import threading
+import time
+
+# Crockford base32 - sorts the same as the numbers it encodes
+_ALPHABET = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+_RANDOM_BITS = 80
+_RANDOM_MAX = (1 << _RANDOM_BITS) - 1
+
+
+class MonotonicIdGenerator:
+    """
+    ULID generator that is strictly increasing within a process: ids created
+    in the same millisecond (or after the clock steps back) reuse the last
+    timestamp and increment the random part, so they still sort in creation
+    order. New ids land at the right edge of the primary-key index.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._last_ms = 0
+        self._last_random = 0
+        self._pid = os.getpid()
+
+    def new_ulid(self) -> str:
+        with self._lock:
+            if self._pid != os.getpid():
+                # Forked child: don't continue the parent's sequence
+                self._pid = os.getpid()
+                self._last_ms = 0
+
+            now_ms = int(time.time() * 1000)
+            if now_ms > self._last_ms:
+                self._last_ms = now_ms
+                self._last_random = int.from_bytes(os.urandom(10), "big")
+            else:
+                self._last_random += 1
+                if self._last_random > _RANDOM_MAX:
+                    # 2^80 ids in one millisecond - borrow the next one
+                    self._last_ms += 1
+                    self._last_random = int.from_bytes(os.urandom(10), "big")
+            value = (self._last_ms << _RANDOM_BITS) | self._last_random
+
+        chars = []
+        for _ in range(26):
+            chars.append(_ALPHABET[value & 31])
+            value >>= 5
+        return "".join(reversed(chars))
+
+
+def ulid_timestamp_ms(ulid: str) -> int:
+    """Creation time (ms since epoch) encoded in a ULID"""
+    value = 0
+    for char in ulid[:10]:
+        value = value * 32 + _ALPHABET.index(char)
+    return value
+
+
+# Global instance
+_generator = MonotonicIdGenerator()
+
+def new_id(prefix: str) -> str:
+    """Time-sortable id, e.g. new_id("evt") -> "evt_01J9Z3K6P8M2W7Q4R5T6Y8V0XA" """
+    return f"{prefix}_{_generator.new_ulid()}"
@@ -0,0 +1,409 @@
+"""
+Durable in-process job queue for post-request work (e.g. memory fact extraction)
+Jobs are journaled to a local SQLite file and run on a background event loop
+"""
+import asyncio
+import atexit
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Any, Awaitable, Callable, List, Optional, Set
+
+from .circuit_breaker import CircuitOpenError
+from .ids import new_id
+from .local_store import connect_local_db
+from .shared_metrics import get_metrics_store
+
+JobHandler = Callable[[Dict[str, Any]], Awaitable[None]]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    run_at REAL NOT NULL,
+    lease_until REAL,
+    last_error TEXT,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_status_run_at_idx ON jobs (status, run_at);
+"""
+
+JOB_COUNTERS = ("enqueued", "succeeded", "retried", "deferred", "dead", "expired")
+
+# Job kinds and their handlers, registered at import time by the routers
+_handlers: Dict[str, "JobSpec"] = {}
+
+
+class JobSpec:
+    def __init__(self, kind: str, handler: JobHandler, max_attempts: int):
+        self.kind = kind
+        self.handler = handler
+        self.max_attempts = max_attempts
+
+
+def register_job(kind: str, max_attempts: int = 5):
+    """Decorator: run `handler(payload)` for jobs of this kind"""
+    def decorator(handler: JobHandler) -> JobHandler:
+        _handlers[kind] = JobSpec(kind, handler, max_attempts)
+        return handler
+    return decorator
+
+
+class JobQueue:
+    """
+    SQLite-backed job queue with a background worker thread
+
+    enqueue() writes the job to disk (off the caller's event loop) and
+    returns; a worker thread running its own event loop claims due jobs, at
+    most `concurrency` at a time. A claimed job holds a lease - if the
+    process dies mid-job the lease expires and any worker sharing the file
+    picks it up again. Failed jobs are retried with exponential backoff and
+    jitter. A job that fails because the LLM circuit is open is deferred
+    until the breaker may let calls through again, without using up an
+    attempt, so an outage longer than the backoff schedule doesn't
+    dead-letter everything queued during it.
+
+    Payloads can hold symptom text, so they are deleted with the job on
+    success and blanked when it is dead-lettered after the kind's
+    max_attempts (the row keeps kind, attempts and last_error for
+    inspection). Rows of any status older than `retention` seconds are
+    purged.
+    """
+
+    def __init__(self, path: Optional[Path] = Path("logs/jobs.db"), concurrency: int = 4,
+                 lease_seconds: float = 120.0, poll_interval: float = 1.0,
+                 base_backoff: float = 2.0, max_backoff: float = 300.0, retention: float = 7 * 86400.0,
+                 purge_interval: float = 300.0, enabled: bool = True):
+        self.path = Path(path) if path is not None else None
+        self.concurrency = concurrency
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.retention = retention
+        self.purge_interval = purge_interval
+        self.enabled = enabled
+
+        self._db_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._thread: Optional[threading.Thread] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._ready: Optional[asyncio.Event] = None
+        self._running: Set[str] = set()
+        self._pid: Optional[int] = None
+        self._closed = False
+        self._atexit_registered = False
+        self._store = get_metrics_store()
+
+    @classmethod
+    def from_env(cls) -> "JobQueue":
+        """
+        Build from PLUTO_JOB_* variables. Off by default on Vercel, where
+        background threads are frozen between invocations.
+        """
+        default_enabled = "0" if os.getenv("VERCEL") else "1"
+        return cls(
+            path=Path(os.getenv("PLUTO_JOB_DB", "logs/jobs.db")),
+            concurrency=int(os.getenv("PLUTO_JOB_CONCURRENCY", "4")),
+            lease_seconds=float(os.getenv("PLUTO_JOB_LEASE_SECONDS", "120")),
+            poll_interval=float(os.getenv("PLUTO_JOB_POLL_INTERVAL", "1.0")),
+            base_backoff=float(os.getenv("PLUTO_JOB_BACKOFF", "2.0")),
+            max_backoff=float(os.getenv("PLUTO_JOB_MAX_BACKOFF", "300")),
+            retention=float(os.getenv("PLUTO_JOB_RETENTION", str(7 * 86400))),
+            enabled=os.getenv("PLUTO_JOB_QUEUE", default_enabled) != "0",
+        )
+
+    # =========================================================================
+    # STORE
+    # =========================================================================
+
+    def _connect(self) -> Optional[sqlite3.Connection]:
+        if self._conn is not None and self._pid == os.getpid():
+            return self._conn
+        try:
+            conn = connect_local_db(self.path, _SCHEMA, timeout=5.0)
+        except (OSError, sqlite3.Error) as e:
+            print(f"Job Queue Error: store unavailable at {self.path} ({e})")
+            return None
+        self._conn = conn
+        return conn
+
+    def _execute(self, sql: str, params: tuple = ()) -> List[tuple]:
+        with self._db_lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    # =========================================================================
+    # PRODUCER SIDE (request path)
+    # =========================================================================
+
+    async def enqueue(self, kind: str, payload: Dict[str, Any]) -> Optional[str]:
+        """
+        Persist a job for background execution. The INSERT (which may wait on
+        another worker's write lock) runs in a thread, not on the caller's loop.
+
+        Returns:
+            The job id, or None if the queue is unavailable - the caller must
+            do the work itself
+        """
+        if not self.enabled or self._closed or self.path is None or kind not in _handlers:
+            return None
+        return await asyncio.to_thread(self._enqueue, kind, payload)
+
+    def _enqueue(self, kind: str, payload: Dict[str, Any]) -> Optional[str]:
+        if not self._ensure_started():
+            return None
+
+        job_id = new_id("job")
+        now = time.time()
+        try:
+            self._execute(
+                "INSERT INTO jobs (id, kind, payload, run_at, created_at) VALUES (?, ?, ?, ?, ?)",
+                (job_id, kind, json.dumps(payload), now, now),
+            )
+        except sqlite3.Error as e:
+            print(f"Job Queue Error: could not enqueue {kind} ({e})")
+            return None
+        self._store.inc(f"jobs.enqueued|{kind}")
+        self._wake()
+        return job_id
+
+    def _wake(self) -> None:
+        loop, wakeup = self._loop, self._wakeup
+        if loop is not None and wakeup is not None:
+            try:
+                loop.call_soon_threadsafe(wakeup.set)
+            except RuntimeError:
+                pass  # Loop already closed
+
+    def start(self) -> bool:
+        """Start workers now (e.g. at app startup) so jobs left by a crash resume"""
+        if not self.enabled or self._closed or self.path is None:
+            return False
+        return self._ensure_started()
+
+    def _ensure_started(self) -> bool:
+        """Start (or restart after fork) the background worker thread"""
+        pid = os.getpid()
+        if self._thread is not None and self._pid == pid and self._thread.is_alive():
+            return True
+
+        with self._start_lock:
+            if self._thread is not None and self._pid == pid and self._thread.is_alive():
+                return True
+
+            if self._pid != pid:
+                self._conn = None
+                self._running = set()
+            self._pid = pid
+            if self._connect() is None:
+                return False
+
+            started = threading.Event()
+            try:
+                self._thread = threading.Thread(
+                    target=self._run, args=(started,), name="pluto-job-queue", daemon=True
+                )
+                self._thread.start()
+            except RuntimeError:
+                return False
+            started.wait(5.0)
+
+            if not self._atexit_registered:
+                atexit.register(self.close)
+                self._atexit_registered = True
+        return True
+
+    # =========================================================================
+    # CONTROL
+    # =========================================================================
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Stop the workers; jobs still running go back to pending"""
+        if self._closed:
+            return
+        self._closed = True
+        thread = self._thread
+        if thread is not None and thread.is_alive() and self._pid == os.getpid():
+            self._wake()
+            thread.join(timeout)
+
+    def get_stats(self, snapshot: Optional[Dict[str, float]] = None) -> Dict[str, Any]:
+        """Counters by kind plus table depth by status (depth once this process has opened the store)"""
+        snapshot = snapshot if snapshot is not None else self._store.snapshot()
+        kinds: Dict[str, Dict[str, int]] = {}
+        for key, value in snapshot.items():
+            if key.startswith("jobs."):
+                field, kind = key[len("jobs."):].split("|", 1)
+                kinds.setdefault(kind, {name: 0 for name in JOB_COUNTERS})[field] = int(value)
+
+        depth = {"pending": 0, "running": 0, "dead": 0}
+        if self._conn is not None and self._pid == os.getpid():
+            try:
+                for status, count in self._execute("SELECT status, COUNT(*) FROM jobs GROUP BY status"):
+                    depth[status] = count
+            except sqlite3.Error:
+                pass
+        return {"kinds": kinds, "depth": depth, "enabled": self.enabled and not self._closed}
+
+    # =========================================================================
+    # WORKER SIDE
+    # =========================================================================
+
+    def _run(self, started: threading.Event) -> None:
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        self._loop = loop
+        self._wakeup = asyncio.Event()
+        self._ready = asyncio.Event()
+        started.set()
+        try:
+            loop.run_until_complete(self._main())
+        finally:
+            self._loop = None
+            loop.close()
+
+    async def _main(self) -> None:
+        workers = [asyncio.ensure_future(self._worker()) for _ in range(self.concurrency)]
+        purge_at = 0.0
+        while not self._closed:
+            if time.monotonic() >= purge_at:
+                await asyncio.to_thread(self._purge)
+                purge_at = time.monotonic() + self.purge_interval
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            # Poll tick or new job: wake every idle worker to try a claim
+            self._ready.set()
+            self._ready.clear()
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        self._release_running()
+
+    def _purge(self) -> None:
+        """Delete jobs (and their payloads) older than the retention period"""
+        try:
+            rows = self._execute(
+                "DELETE FROM jobs WHERE created_at < ? AND status != 'running' RETURNING kind, status",
+                (time.time() - self.retention,),
+            )
+        except sqlite3.Error as e:
+            print(f"Job Queue Error: purge failed ({e})")
+            return
+        for kind, status in rows:
+            if status == "pending":
+                self._store.inc(f"jobs.expired|{kind}")
+
+    async def _worker(self) -> None:
+        # Store calls run in threads so one job's sqlite wait doesn't stall the others
+        while True:
+            job = await asyncio.to_thread(self._claim)
+            if job is None:
+                await self._ready.wait()
+                continue
+            try:
+                await self._execute_job(*job)
+            except sqlite3.Error as e:
+                # Lease expiry will hand the job out again
+                print(f"Job Queue Error: could not record outcome of job {job[0]} ({e})")
+
+    def _claim(self) -> Optional[tuple]:
+        now = time.time()
+        try:
+            rows = self._execute(
+                "UPDATE jobs SET status = 'running', attempts = attempts + 1, lease_until = ? "
+                "WHERE id = (SELECT id FROM jobs WHERE (status = 'pending' AND run_at <= ?) "
+                "OR (status = 'running' AND lease_until < ?) ORDER BY run_at LIMIT 1) "
+                "RETURNING id, kind, payload, attempts",
+                (now + self.lease_seconds, now, now),
+            )
+        except sqlite3.Error as e:
+            print(f"Job Queue Error: claim failed ({e})")
+            return None
+        if not rows:
+            return None
+        self._running.add(rows[0][0])
+        return rows[0]
+
+    async def _execute_job(self, job_id: str, kind: str, payload: str, attempts: int) -> None:
+        spec = _handlers.get(kind)
+        try:
+            if spec is None:
+                raise LookupError(f"no handler registered for job kind '{kind}'")
+            await spec.handler(json.loads(payload))
+        except asyncio.CancelledError:
+            raise  # Shutting down - _release_running puts it back
+        except CircuitOpenError as e:
+            self._running.discard(job_id)
+            await asyncio.to_thread(self._defer, job_id, kind, e)
+            return
+        except Exception as e:
+            self._running.discard(job_id)
+            await asyncio.to_thread(self._fail, job_id, kind, attempts, spec.max_attempts if spec else 1, e)
+            return
+        self._running.discard(job_id)
+        await asyncio.to_thread(self._execute, "DELETE FROM jobs WHERE id = ?", (job_id,))
+        self._store.inc(f"jobs.succeeded|{kind}")
+
+    def _defer(self, job_id: str, kind: str, error: CircuitOpenError) -> None:
+        """Dependency known to be down: retry after its breaker cooldown, attempt not charged"""
+        delay = max(self.poll_interval, error.retry_in) * random.uniform(1.0, 1.5)
+        self._execute(
+            "UPDATE jobs SET status = 'pending', attempts = MAX(attempts - 1, 0), lease_until = NULL, "
+            "run_at = ?, last_error = ? WHERE id = ?",
+            (time.time() + delay, f"{error.__class__.__name__}: {error}"[:1000], job_id),
+        )
+        self._store.inc(f"jobs.deferred|{kind}")
+
+    def _fail(self, job_id: str, kind: str, attempts: int, max_attempts: int, error: Exception) -> None:
+        message = f"{error.__class__.__name__}: {error}"[:1000]
+        if attempts >= max_attempts:
+            self._execute(
+                "UPDATE jobs SET status = 'dead', payload = 'null', lease_until = NULL, last_error = ? WHERE id = ?",
+                (message, job_id),
+            )
+            self._store.inc(f"jobs.dead|{kind}")
+            print(f"Job Queue Error: {kind} job {job_id} dead-lettered after {attempts} attempts: {message}")
+            return
+        delay = min(self.max_backoff, self.base_backoff * (2 ** (attempts - 1)))
+        delay *= random.uniform(0.5, 1.0)  # Jitter so a burst of failures doesn't retry in lockstep
+        self._execute(
+            "UPDATE jobs SET status = 'pending', lease_until = NULL, run_at = ?, last_error = ? WHERE id = ?",
+            (time.time() + delay, message, job_id),
+        )
+        self._store.inc(f"jobs.retried|{kind}")
+
+    def _release_running(self) -> None:
+        """Hand interrupted jobs back without charging them an attempt"""
+        for job_id in list(self._running):
+            try:
+                self._execute(
+                    "UPDATE jobs SET status = 'pending', attempts = MAX(attempts - 1, 0), "
+                    "lease_until = NULL WHERE id = ? AND status = 'running'",
+                    (job_id,),
+                )
+            except sqlite3.Error:
+                pass
+        self._running = set()
+
+
+# Global instance
+_job_queue: Optional[JobQueue] = None
+
+def get_job_queue() -> JobQueue:
+    """Get global background job queue"""
+    global _job_queue
+    if _job_queue is None:
+        _job_queue = JobQueue.from_env()
+    return _job_queue
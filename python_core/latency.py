@@ -0,0 +1,172 @@
+"""
+Fixed-memory latency histograms for Pluto Health monitoring
+Log-bucketed (HDR-style) so p50/p95/p99 stay accurate to a few percent
+"""
+import math
+import os
+import time
+from typing import Dict, Any, Optional, Tuple
+
+from .shared_metrics import get_metrics_store
+
+# Bucket layout: SUB_BUCKETS buckets per power of two between MIN_MS and MAX_MS.
+# 8 sub-buckets gives ~9% worst-case relative error on reported percentiles.
+MIN_MS = 0.1
+MAX_MS = 120_000.0
+SUB_BUCKETS = 8
+NUM_BUCKETS = int(math.ceil(math.log2(MAX_MS / MIN_MS) * SUB_BUCKETS)) + 1
+
+PERCENTILES = (0.5, 0.95, 0.99)
+
+
+def bucket_index(value_ms: float) -> int:
+    """Map a latency to its bucket (values below MIN_MS land in bucket 0)"""
+    if value_ms <= MIN_MS:
+        return 0
+    index = int(math.log2(value_ms / MIN_MS) * SUB_BUCKETS) + 1
+    return min(index, NUM_BUCKETS - 1)
+
+
+def bucket_upper_bound(index: int) -> float:
+    """Inclusive upper bound (ms) of a bucket"""
+    return MIN_MS * 2 ** (index / SUB_BUCKETS)
+
+
+class LatencyHistogram:
+    """Latency histogram with a fixed number of log-spaced buckets"""
+
+    __slots__ = ("counts", "count", "total_ms", "max_ms")
+
+    def __init__(self):
+        self.counts = [0] * NUM_BUCKETS
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def record(self, value_ms: float) -> None:
+        self.counts[bucket_index(value_ms)] += 1
+        self.count += 1
+        self.total_ms += value_ms
+        if value_ms > self.max_ms:
+            self.max_ms = value_ms
+
+    def percentile(self, q: float) -> float:
+        """Upper bound of the bucket containing the q-th quantile (0 < q <= 1)"""
+        if self.count == 0:
+            return 0.0
+        rank = max(1, int(math.ceil(q * self.count)))
+        seen = 0
+        for index, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank:
+                return min(bucket_upper_bound(index), self.max_ms)
+        return self.max_ms
+
+    def reset(self) -> None:
+        self.counts = [0] * NUM_BUCKETS
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "avg_ms": round(self.total_ms / self.count, 3) if self.count else 0,
+            "p50_ms": round(self.percentile(0.5), 3),
+            "p95_ms": round(self.percentile(0.95), 3),
+            "p99_ms": round(self.percentile(0.99), 3),
+            "max_ms": round(self.max_ms, 3),
+        }
+
+
+def histograms_from_snapshot(snapshot: Dict[str, float]) -> Dict[Tuple[str, str], LatencyHistogram]:
+    """Rebuild lifetime histograms from a (possibly multi-worker) metrics snapshot"""
+    histograms: Dict[Tuple[str, str], LatencyHistogram] = {}
+    for key, value in snapshot.items():
+        if not key.startswith("latency|"):
+            continue
+        family, rest = key[len("latency|"):].split("|", 1)
+        name, field = rest.rsplit("|", 1)
+
+        hist = histograms.get((family, name))
+        if hist is None:
+            hist = histograms[(family, name)] = LatencyHistogram()
+
+        if field == "count":
+            hist.count = int(value)
+        elif field == "sum":
+            hist.total_ms = value
+        elif field == "max":
+            hist.max_ms = value
+        elif field.startswith("b"):
+            hist.counts[int(field[1:])] = int(value)
+    return histograms
+
+
+class LatencyRegistry:
+    """
+    Histograms keyed by (family, name), e.g. ("endpoint", "/api/triage"),
+    ("urgency", "emergency") or ("stage", "classify").
+
+    Lifetime histograms live in the metrics store, so with PLUTO_METRICS_DIR
+    set they are merged across all workers on read. Each process also keeps
+    a rolling window that is rotated every window_seconds (or on demand via
+    reset_window); the last completed window is kept so dashboards always
+    have a full window to show. Windows are per-process.
+    """
+
+    def __init__(self, window_seconds: float = 300, store=None):
+        self.window_seconds = window_seconds
+        self.window_started = time.time()
+        self._store = store or get_metrics_store()
+        self._window: Dict[Tuple[str, str], LatencyHistogram] = {}
+        self._previous: Dict[Tuple[str, str], LatencyHistogram] = {}
+        self._previous_started = None
+
+    @classmethod
+    def from_env(cls) -> "LatencyRegistry":
+        return cls(window_seconds=float(os.getenv("PLUTO_METRICS_WINDOW_SECONDS", "300")))
+
+    def record(self, family: str, name: str, value_ms: float) -> None:
+        """Record one observation (no locks, no I/O)"""
+        if time.time() - self.window_started >= self.window_seconds:
+            self.reset_window()
+
+        base = f"latency|{family}|{name}"
+        self._store.inc(f"{base}|b{bucket_index(value_ms)}")
+        self._store.inc(f"{base}|count")
+        self._store.inc(f"{base}|sum", value_ms)
+        self._store.max(f"{base}|max", value_ms)
+
+        key = (family, name)
+        hist = self._window.get(key)
+        if hist is None:
+            hist = self._window.setdefault(key, LatencyHistogram())
+        hist.record(value_ms)
+
+    def reset_window(self) -> None:
+        """Close the current window and start a new one"""
+        self._previous, self._window = self._window, {}
+        self._previous_started = self.window_started
+        self.window_started = time.time()
+
+    def series(self, snapshot: Optional[Dict[str, float]] = None) -> Dict[Tuple[str, str], LatencyHistogram]:
+        """Lifetime histograms (used by exporters)"""
+        return histograms_from_snapshot(snapshot if snapshot is not None else self._store.snapshot())
+
+    @staticmethod
+    def _group(histograms: Dict[Tuple[str, str], LatencyHistogram]) -> Dict[str, Dict[str, Any]]:
+        grouped: Dict[str, Dict[str, Any]] = {}
+        for (family, name), hist in list(histograms.items()):
+            grouped.setdefault(family, {})[name] = hist.snapshot()
+        return grouped
+
+    def snapshot(self, store_snapshot: Optional[Dict[str, float]] = None) -> Dict[str, Any]:
+        return {
+            "window_seconds": self.window_seconds,
+            "window_started": self.window_started,
+            "window": self._group(self._window),
+            "previous_window_started": self._previous_started,
+            "previous_window": self._group(self._previous),
+            "lifetime": self._group(self.series(store_snapshot)),
+        }
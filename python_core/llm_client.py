@@ -0,0 +1,344 @@
+"""
+Shared Groq (OpenAI-compatible) client helpers for Pluto Health
+Single place to make LLM calls so they are counted and timed consistently
+"""
+import asyncio
+import os
+import threading
+import time
+import weakref
+from collections import deque
+from typing import Dict, Any, AsyncIterator, Deque, Optional, Tuple
+
+import httpx
+import openai
+
+from .circuit_breaker import CircuitBreaker, CircuitOpenError, CLOSED
+from .fanout import current_deadline
+from .logger import get_logger
+from .shared_metrics import get_metrics_store
+
+GROQ_API_KEY = os.getenv("GROQ_API_KEY")
+GROQ_BASE_URL = os.getenv("GROQ_BASE_URL", "https://api.groq.com/openai/v1")
+DEFAULT_MODEL = "llama-3.3-70b-versatile"
+
+# Per-purpose request timeouts (seconds); PLUTO_LLM_TIMEOUT applies to the rest
+PURPOSE_TIMEOUTS = {
+    "triage_summary": 8.0,
+    "fact_extraction": 15.0,
+    "chat": 20.0,
+}
+
+# A call cancelled this close to its fan_out deadline was cut off by it
+DEADLINE_SLACK_S = 0.05
+
+
+class LLMClientPool:
+    """
+    One AsyncOpenAI client per worker, backed by a keep-alive httpx pool so
+    calls reuse warm TLS connections instead of dialing Groq every time.
+    A semaphore bounds in-flight calls; callers beyond it wait their turn.
+
+    Sockets can't move between event loops, so each loop that makes calls
+    (the server loop, the background job loop, test clients) gets its own
+    client and semaphore. Forked workers start with none.
+
+    Every call passes through one circuit breaker (CircuitOpenError while
+    open). With PLUTO_LLM_HEDGE=1 a non-streaming call still running after
+    its purpose's p95 gets a duplicate request; the first answer wins.
+    Hedges are capped at PLUTO_LLM_HEDGE_MAX_RATIO of the calls made in the
+    last PLUTO_LLM_HEDGE_WINDOW seconds and need a free concurrency slot.
+    """
+
+    def __init__(self):
+        self.max_concurrency = int(os.getenv("PLUTO_LLM_MAX_CONCURRENCY", "16"))
+        self.pool_size = int(os.getenv("PLUTO_LLM_POOL_SIZE", str(self.max_concurrency)))
+        self.default_timeout = float(os.getenv("PLUTO_LLM_TIMEOUT", "20"))
+        self.connect_timeout = float(os.getenv("PLUTO_LLM_CONNECT_TIMEOUT", "5"))
+        self.max_retries = int(os.getenv("PLUTO_LLM_MAX_RETRIES", "1"))
+        self.keepalive_expiry = float(os.getenv("PLUTO_LLM_KEEPALIVE", "60"))
+        self._clients: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+        self._pid = os.getpid()
+
+        self.breaker = CircuitBreaker.from_env("llm")
+        # Hedging: duplicate a call still running after the purpose's p95
+        self.hedge_enabled = os.getenv("PLUTO_LLM_HEDGE", "0") == "1"
+        self.hedge_default_ms = float(os.getenv("PLUTO_LLM_HEDGE_DELAY_MS", "1500"))
+        self.hedge_min_ms = float(os.getenv("PLUTO_LLM_HEDGE_MIN_MS", "200"))
+        self.hedge_max_ratio = float(os.getenv("PLUTO_LLM_HEDGE_MAX_RATIO", "0.1"))
+        self.hedge_window = float(os.getenv("PLUTO_LLM_HEDGE_WINDOW", "60"))
+        # Shared by every loop's calls, so guarded like the breaker's window
+        self._hedge_lock = threading.Lock()
+        self._latencies: Dict[str, Deque[float]] = {}
+        self._hedgeable_calls: Deque[float] = deque()  # Start times inside the window
+        self._hedges: Deque[float] = deque()
+
+    def _bind(self) -> Tuple[openai.AsyncOpenAI, asyncio.Semaphore]:
+        if self._pid != os.getpid():
+            self._clients = weakref.WeakKeyDictionary()
+            self._pid = os.getpid()
+        loop = asyncio.get_running_loop()
+        bound = self._clients.get(loop)
+        if bound is None:
+            http_client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=self.pool_size,
+                    max_keepalive_connections=self.pool_size,
+                    keepalive_expiry=self.keepalive_expiry,
+                ),
+                timeout=httpx.Timeout(self.default_timeout, connect=self.connect_timeout),
+            )
+            client = openai.AsyncOpenAI(
+                api_key=GROQ_API_KEY or "missing",
+                base_url=GROQ_BASE_URL,
+                max_retries=self.max_retries,
+                http_client=http_client,
+            )
+            bound = self._clients[loop] = (client, asyncio.Semaphore(self.max_concurrency))
+        return bound
+
+    def _is_failure(self, error: BaseException) -> bool:
+        """Errors that say Groq is unhealthy (vs. a bad request from us)"""
+        if isinstance(error, (openai.APITimeoutError, openai.APIConnectionError, asyncio.TimeoutError)):
+            return True
+        if isinstance(error, openai.APIStatusError):
+            return error.status_code == 429 or error.status_code >= 500
+        return False
+
+    def _admit(self, purpose: str) -> None:
+        if not self.breaker.allow():
+            get_metrics_store().inc(f"llm.rejected|{purpose}")
+            raise CircuitOpenError(f"LLM circuit open - skipping {purpose} call", retry_in=self.breaker.retry_in())
+
+    def _settle(self, error: Optional[BaseException], elapsed_ms: float) -> None:
+        """Report one admitted call's outcome to the breaker"""
+        if error is None:
+            self.breaker.record_success(elapsed_ms)
+        elif isinstance(error, (asyncio.CancelledError, GeneratorExit)):
+            deadline = current_deadline()
+            deadline_hit = deadline is not None and time.monotonic() >= deadline - DEADLINE_SLACK_S
+            self.breaker.record_abandoned(elapsed_ms, deadline_hit=deadline_hit)
+        elif self._is_failure(error):
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success(elapsed_ms)  # Groq answered; the request was bad
+
+    def _prune_hedges(self, now: float) -> None:
+        """Forget calls and hedges older than the window (caller holds the lock)"""
+        cutoff = now - self.hedge_window
+        for times in (self._hedgeable_calls, self._hedges):
+            while times and times[0] < cutoff:
+                times.popleft()
+
+    def _hedge_budget_left(self) -> bool:
+        """Caller holds the lock"""
+        return len(self._hedges) < self.hedge_max_ratio * max(1, len(self._hedgeable_calls))
+
+    def _record_latency(self, purpose: str, elapsed_ms: float) -> None:
+        with self._hedge_lock:
+            self._latencies.setdefault(purpose, deque(maxlen=200)).append(elapsed_ms)
+
+    def _hedge_delay(self, purpose: str) -> Optional[float]:
+        """Count a call and return seconds to wait before a duplicate request, or None to not hedge"""
+        now = time.monotonic()
+        with self._hedge_lock:
+            self._prune_hedges(now)
+            self._hedgeable_calls.append(now)
+            if not self.hedge_enabled or not self._hedge_budget_left():
+                return None
+            samples = list(self._latencies.get(purpose, ()))
+        if self.breaker.state != CLOSED:
+            return None
+        if len(samples) < 20:
+            return self.hedge_default_ms / 1000
+        ordered = sorted(samples)
+        return max(self.hedge_min_ms, ordered[int(len(ordered) * 0.95) - 1]) / 1000
+
+    def _claim_hedge(self) -> bool:
+        """Take a hedge from the ratio budget, which may have run out while we waited"""
+        now = time.monotonic()
+        with self._hedge_lock:
+            self._prune_hedges(now)
+            if not self._hedge_budget_left():
+                return False
+            self._hedges.append(now)
+            return True
+
+    async def _create(self, client: openai.AsyncOpenAI, semaphore: asyncio.Semaphore,
+                      purpose: str, timeout: float, kwargs: Dict[str, Any]) -> Any:
+        store = get_metrics_store()
+        if semaphore.locked():
+            store.inc("llm_pool.throttled")
+
+        async def attempt():
+            async with semaphore:
+                return await client.chat.completions.create(timeout=timeout, **kwargs)
+
+        delay = self._hedge_delay(purpose)
+        primary = asyncio.ensure_future(attempt())
+        if delay is None:
+            return await primary
+
+        tasks = {primary}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if not done and not semaphore.locked() and self._claim_hedge():
+                # Slower than p95 and there's a free slot: race a duplicate
+                hedge = asyncio.ensure_future(attempt())
+                tasks.add(hedge)
+                store.inc(f"llm.hedged|{purpose}")
+            error: Optional[BaseException] = None
+            pending = tasks
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is not primary:
+                            store.inc(f"llm.hedge_wins|{purpose}")
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    async def chat_completion(self, purpose: str, timeout: Optional[float] = None, **kwargs) -> Any:
+        store = get_metrics_store()
+        store.inc(f"llm.calls|{purpose}")
+
+        kwargs.setdefault("model", DEFAULT_MODEL)
+        if timeout is None:
+            timeout = PURPOSE_TIMEOUTS.get(purpose, self.default_timeout)
+
+        self._admit(purpose)
+        client, semaphore = self._bind()
+        start = time.perf_counter()
+        error: Optional[BaseException] = None
+        try:
+            response = await self._create(client, semaphore, purpose, timeout, kwargs)
+            self._record_latency(purpose, (time.perf_counter() - start) * 1000)
+            return response
+        except BaseException as e:
+            error = e
+            if isinstance(e, Exception):
+                store.inc(f"llm.failures|{purpose}")
+            raise
+        finally:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            self._settle(error, elapsed_ms)
+            get_logger().record_latency("llm", purpose, elapsed_ms)
+
+    async def stream_chat_completion(self, purpose: str, timeout: Optional[float] = None,
+                                     **kwargs) -> AsyncIterator[str]:
+        """
+        Yield content deltas as Groq produces them. The concurrency slot is
+        held until the stream is exhausted or closed; closing the generator
+        early (client went away) closes the upstream response too.
+        Streams are never hedged.
+        """
+        store = get_metrics_store()
+        store.inc(f"llm.calls|{purpose}")
+
+        kwargs.setdefault("model", DEFAULT_MODEL)
+        if timeout is None:
+            timeout = PURPOSE_TIMEOUTS.get(purpose, self.default_timeout)
+
+        self._admit(purpose)
+        client, semaphore = self._bind()
+        start = time.perf_counter()
+        first_token_ms: Optional[float] = None
+        error: Optional[BaseException] = None
+        try:
+            if semaphore.locked():
+                store.inc("llm_pool.throttled")
+            async with semaphore:
+                stream = await client.chat.completions.create(stream=True, timeout=timeout, **kwargs)
+                try:
+                    async for chunk in stream:
+                        if not chunk.choices:
+                            continue
+                        delta = chunk.choices[0].delta.content
+                        if delta:
+                            if first_token_ms is None:
+                                first_token_ms = (time.perf_counter() - start) * 1000
+                                get_logger().record_latency("llm", f"{purpose}_first_token", first_token_ms)
+                            yield delta
+                finally:
+                    await stream.close()
+        except (asyncio.CancelledError, GeneratorExit) as e:
+            error = e
+            store.inc(f"llm_pool.cancelled|{purpose}")
+            raise
+        except Exception as e:
+            error = e
+            store.inc(f"llm.failures|{purpose}")
+            raise
+        finally:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            # Groq's health shows in time to first token, not in how long the reply is
+            self._settle(error, first_token_ms if error is None and first_token_ms is not None else elapsed_ms)
+            get_logger().record_latency("llm", purpose, elapsed_ms)
+
+    async def warm(self, connections: int = 1) -> int:
+        """
+        Open `connections` pooled connections ahead of the first real call by
+        listing models (cheap, authenticated). Returns how many succeeded.
+        """
+        client, _ = self._bind()
+        results = await asyncio.gather(
+            *(client.models.list(timeout=self.connect_timeout + 5) for _ in range(connections)),
+            return_exceptions=True,
+        )
+        return sum(1 for r in results if not isinstance(r, Exception))
+
+    async def close(self) -> None:
+        """Close the calling loop's client"""
+        bound = self._clients.pop(asyncio.get_running_loop(), None)
+        if bound is not None:
+            await bound[0].close()
+
+
+# Global instance
+_pool = LLMClientPool()
+
+def get_llm_pool() -> LLMClientPool:
+    return _pool
+
+
+async def chat_completion(purpose: str, timeout: Optional[float] = None, **kwargs) -> Any:
+    """
+    Run a chat completion against Groq through the shared pooled client and
+    record call count, failures and latency under the given purpose
+    (e.g. "chat", "triage_summary").
+    """
+    return await _pool.chat_completion(purpose, timeout=timeout, **kwargs)
+
+
+def stream_chat_completion(purpose: str, timeout: Optional[float] = None, **kwargs) -> AsyncIterator[str]:
+    """Streaming variant of chat_completion - an async iterator of content deltas"""
+    return _pool.stream_chat_completion(purpose, timeout=timeout, **kwargs)
+
+
+async def warm_llm_client() -> None:
+    """Startup hook: pre-open pooled connections so the first request skips the TLS handshake"""
+    if not GROQ_API_KEY or os.getenv("PLUTO_LLM_PREWARM", "1") == "0":
+        return
+    try:
+        connections = int(os.getenv("PLUTO_LLM_PREWARM_CONNECTIONS", "2"))
+        warmed = await _pool.warm(connections)
+        print(f"LLM client warm: {warmed}/{connections} connections")
+    except Exception as e:
+        print(f"LLM Prewarm Error: {e}")
+
+
+def get_llm_stats(snapshot: Optional[Dict[str, float]] = None) -> Dict[str, Dict[str, int]]:
+    """Get LLM call/failure/rejected/hedge counters by purpose"""
+    snapshot = snapshot if snapshot is not None else get_metrics_store().snapshot()
+    stats: Dict[str, Dict[str, int]] = {}
+    for key, value in snapshot.items():
+        if key.startswith("llm."):
+            field, purpose = key[len("llm."):].split("|", 1)
+            stats.setdefault(purpose, {"calls": 0, "failures": 0, "rejected": 0,
+                                       "hedged": 0, "hedge_wins": 0})[field] = int(value)
+    return stats
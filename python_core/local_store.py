@@ -0,0 +1,19 @@
+"""
+Host-local SQLite files shared by every worker (job queue, LLM cache, deferred results)
+"""
+import sqlite3
+from pathlib import Path
+
+
+def connect_local_db(path: Path, schema: str, timeout: float = 5.0) -> sqlite3.Connection:
+    """
+    Autocommit connection usable from any thread (callers serialize access),
+    in WAL mode so readers in other workers don't block the writer.
+    Raises OSError / sqlite3.Error if the file can't be opened.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(path), timeout=timeout, check_same_thread=False, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(schema)
+    return conn
@@ -0,0 +1,80 @@
+"""
+Reverse-seeking JSONL reader for Pluto Health logs
+Reads only the tail of a log file so dashboards don't load whole files
+"""
+import json
+import os
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Any, Iterator, List, Optional
+
+BLOCK_SIZE = 64 * 1024
+
+
+def iter_lines_reverse(path: Path, block_size: int = BLOCK_SIZE) -> Iterator[bytes]:
+    """
+    Yield the lines of a file from last to first, reading fixed-size blocks
+    backwards from the end. Memory use is bounded by block_size plus the
+    longest line.
+    """
+    with open(path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        position = f.tell()
+        remainder = b''
+
+        while position > 0:
+            read_size = min(block_size, position)
+            position -= read_size
+            f.seek(position)
+            chunk = f.read(read_size) + remainder
+
+            lines = chunk.split(b'\n')
+            # First piece may be a partial line - keep it for the next block
+            remainder = lines[0]
+            for line in reversed(lines[1:]):
+                if line.strip():
+                    yield line
+
+        if remainder.strip():
+            yield remainder
+
+
+def _entry_time(entry: Dict[str, Any]) -> Optional[float]:
+    try:
+        return datetime.fromisoformat(entry["timestamp"]).replace(tzinfo=timezone.utc).timestamp()
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def iter_records_reverse(path: Path, since: Optional[float] = None,
+                         block_size: int = BLOCK_SIZE) -> Iterator[Dict[str, Any]]:
+    """
+    Yield parsed JSONL records newest first. If since (epoch seconds) is
+    given, stop at the first record older than it - log files are
+    append-only, so everything before that point is older too.
+    """
+    for line in iter_lines_reverse(path, block_size):
+        try:
+            entry = json.loads(line)
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            continue
+
+        if since is not None:
+            ts = _entry_time(entry)
+            if ts is not None and ts < since:
+                return
+        yield entry
+
+
+def tail_records(path: Path, limit: int = 10, since: Optional[float] = None) -> List[Dict[str, Any]]:
+    """Return up to limit most recent records (newest first), optionally time-bounded"""
+    path = Path(path)
+    if not path.exists() or limit <= 0:
+        return []
+
+    records = []
+    for entry in iter_records_reverse(path, since=since):
+        records.append(entry)
+        if len(records) >= limit:
+            break
+    return records
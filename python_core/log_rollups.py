@@ -0,0 +1,230 @@
+"""
+Per-minute triage rollups for Pluto Health monitoring
+Keeps stats queries O(buckets) instead of re-scanning triage.jsonl
+"""
+import json
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+
+BUCKET_SECONDS = 60
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True  # Exists, owned by someone else
+    return True
+
+
+def _merge(into: Dict[int, list], buckets: Iterable[Tuple[int, list]]) -> None:
+    for key, (count, llm, dur, levels) in buckets:
+        bucket = into.setdefault(key, [0, 0, 0.0, {}])
+        bucket[0] += count
+        bucket[1] += llm
+        bucket[2] += dur
+        for level, n in levels.items():
+            bucket[3][level] = bucket[3].get(level, 0) + n
+
+
+class TriageRollup:
+    """
+    Aggregates triage log entries into one-minute buckets
+
+    Each bucket holds [count, llm_called, duration_sum_ms, {level: count}].
+    Buckets are kept in memory, pruned past the retention window, and
+    persisted by each worker to its own compact JSON side file next to the
+    triage log (`triage_rollup.<pid>.json` for path `triage_rollup.json`).
+    query() adds the other workers' files to this worker's buckets, so
+    their latest minute may lag by one flush. On load a worker adopts the
+    files of dead workers (claimed by an atomic rename, so two workers
+    starting together can't both count one) and deletes them.
+    """
+
+    def __init__(self, path: Optional[Path], retention_hours: int = 168):
+        self.path = Path(path) if path is not None else None  # None = memory only
+        self.retention_seconds = retention_hours * 3600
+        self._buckets: Dict[int, list] = {}
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._pid = os.getpid()
+
+    @staticmethod
+    def _bucket_for(ts: float) -> int:
+        return int(ts // BUCKET_SECONDS) * BUCKET_SECONDS
+
+    def record(self, triage_level: Optional[str], llm_called: bool, duration_ms: float,
+               ts: Optional[float] = None) -> None:
+        """Add one triage to its minute bucket"""
+        key = self._bucket_for(ts if ts is not None else time.time())
+        level = triage_level or "unknown"
+
+        with self._lock:
+            self._check_fork()
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                self._prune()  # At most once a minute
+                bucket = [0, 0, 0.0, {}]
+                self._buckets[key] = bucket
+            bucket[0] += 1
+            bucket[1] += 1 if llm_called else 0
+            bucket[2] += duration_ms
+            bucket[3][level] = bucket[3].get(level, 0) + 1
+            self._dirty = True
+
+    def _check_fork(self) -> None:
+        """A forked worker starts empty - its parent's buckets are in the parent's file (caller holds the lock)"""
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._buckets = {}
+            self._dirty = False
+
+    def _prune(self) -> None:
+        """Drop buckets older than the retention window (caller holds the lock)"""
+        cutoff = self._bucket_for(time.time() - self.retention_seconds)
+        for key in [k for k in self._buckets if k < cutoff]:
+            del self._buckets[key]
+
+    def query(self, hours: float) -> Dict[str, Any]:
+        """Aggregate all buckets inside the last N hours, across workers"""
+        cutoff = self._bucket_for(time.time() - hours * 3600)
+        total = 0
+        llm_called = 0
+        duration_sum = 0.0
+        levels: Dict[str, int] = {}
+
+        with self._lock:
+            self._check_fork()
+            merged: Dict[int, list] = {}
+            _merge(merged, ((k, v) for k, v in self._buckets.items() if k >= cutoff))
+        for path, _ in self._worker_files():
+            try:
+                _merge(merged, ((k, v) for k, v in self._read(path).items() if k >= cutoff))
+            except (OSError, ValueError):
+                continue  # Being adopted or half-written by an old version: skip it
+
+        for count, llm, dur, bucket_levels in merged.values():
+            total += count
+            llm_called += llm
+            duration_sum += dur
+            for level, n in bucket_levels.items():
+                levels[level] = levels.get(level, 0) + n
+
+        return {
+            "total": total,
+            "levels": levels,
+            "llm_called": llm_called,
+            "avg_duration_ms": duration_sum / total if total else 0,
+        }
+
+    # =========================================================================
+    # PERSISTENCE
+    # =========================================================================
+
+    def _own_path(self) -> Path:
+        return self.path.with_name(f"{self.path.stem}.{os.getpid()}{self.path.suffix}")
+
+    def _worker_files(self, include_self: bool = False) -> List[Tuple[Path, int]]:
+        """(path, pid) of every worker's side file, without this worker's unless asked"""
+        if self.path is None:
+            return []
+        files = []
+        for path in self.path.parent.glob(f"{self.path.stem}.*{self.path.suffix}"):
+            pid = path.name[len(self.path.stem) + 1:-len(self.path.suffix)]
+            if pid.isdigit() and (include_self or int(pid) != os.getpid()):
+                files.append((path, int(pid)))
+        return files
+
+    @staticmethod
+    def _read(path: Path) -> Dict[int, list]:
+        with open(path, 'r') as f:
+            raw = json.load(f)
+        return {int(k): v for k, v in raw.get("buckets", {}).items()}
+
+    def load(self, source_log: Optional[Path] = None) -> None:
+        """
+        Adopt the side files of dead workers (and a pre-per-worker
+        triage_rollup.json) into this worker's buckets. If no worker has
+        ever written one but a triage log exists, backfill once from the log
+        so history isn't lost; an O_EXCL marker lets only one worker do it.
+        """
+        if self.path is None:
+            return
+        candidates = [(path, pid) for path, pid in self._worker_files(include_self=True)
+                      if pid == os.getpid() or not _pid_alive(pid)]
+        if self.path.exists():
+            candidates.append((self.path, None))
+
+        adopted = []
+        for path, _ in candidates:
+            claimed = path.with_name(f"{path.name}.adopted-{os.getpid()}")
+            try:
+                os.rename(path, claimed)  # Exactly one worker wins each file
+                buckets = self._read(claimed)
+            except FileNotFoundError:
+                continue  # Another worker adopted it first
+            except (OSError, ValueError) as e:
+                print(f"Rollup Load Error ({path}): {e}")
+                continue
+            with self._lock:
+                _merge(self._buckets, buckets.items())
+                self._dirty = True
+            adopted.append(claimed)
+
+        if adopted:
+            self.save()  # Our own file holds them now
+            for claimed in adopted:
+                claimed.unlink(missing_ok=True)
+            return
+
+        if source_log is None or not Path(source_log).exists() or self._worker_files():
+            return
+        try:
+            fd = os.open(self.path.with_name(f"{self.path.stem}.backfilled"), os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            return
+        os.close(fd)
+        self._backfill(Path(source_log))
+
+    def _backfill(self, source_log: Path) -> None:
+        cutoff = time.time() - self.retention_seconds
+        with open(source_log, 'r') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                    ts = datetime.fromisoformat(entry["timestamp"]).replace(tzinfo=timezone.utc).timestamp()
+                except (json.JSONDecodeError, KeyError, ValueError):
+                    continue
+                if ts >= cutoff:
+                    self.record(entry.get("triage_level"), bool(entry.get("ai_called")),
+                                entry.get("duration_ms") or 0, ts=ts)
+
+    def save(self) -> None:
+        """Prune expired buckets and atomically rewrite this worker's side file if changed"""
+        if not self._dirty or self.path is None:
+            return
+
+        with self._lock:
+            self._check_fork()
+            self._prune()
+            payload = json.dumps(
+                {"version": 1, "bucket_seconds": BUCKET_SECONDS, "buckets": self._buckets},
+                separators=(',', ':')
+            )
+            self._dirty = False
+
+        path = self._own_path()
+        tmp_path = path.with_suffix(path.suffix + ".tmp")
+        try:
+            with open(tmp_path, 'w') as f:
+                f.write(payload)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            self._dirty = True
+            print(f"Rollup Save Error ({path}): {e}")
@@ -0,0 +1,185 @@
+"""
+Pluggable outputs for PlutoLogger
+File and stdout (both batched), null and in-memory ring buffer sinks
+"""
+import os
+import random
+import sys
+import time
+from collections import deque
+from pathlib import Path
+from typing import Deque, Dict, Any, List, Optional
+
+from .log_writer import BatchedLogWriter
+from .log_reader import tail_records
+from .shared_metrics import get_metrics_store
+
+LOG_TYPES = ("errors", "triage", "performance", "access")
+
+
+class LogSink:
+    """
+    Base sink. sample_rates maps log type -> fraction of entries to keep
+    (missing types keep everything), so noisy logs can be thinned per sink.
+    """
+
+    name = "base"
+
+    def __init__(self, sample_rates: Optional[Dict[str, float]] = None):
+        self.sample_rates = sample_rates or {}
+        self._store = get_metrics_store()
+
+    def accepts(self, log_type: str) -> bool:
+        rate = self.sample_rates.get(log_type, 1.0)
+        if rate >= 1.0 or random.random() < rate:
+            return True
+        self._store.inc(f"log_sink.sampled_out|{self.name}")
+        return False
+
+    def emit(self, log_type: str, data: Dict[str, Any]) -> None:
+        raise NotImplementedError
+
+    def recent(self, log_type: str, limit: int, since: Optional[float]) -> Optional[List[Dict[str, Any]]]:
+        """Newest-first entries, or None if this sink can't be read back"""
+        return None
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        return True
+
+    def close(self) -> None:
+        pass
+
+
+class NullSink(LogSink):
+    """Discards everything (metrics still work)"""
+
+    name = "null"
+
+    def emit(self, log_type: str, data: Dict[str, Any]) -> None:
+        pass
+
+
+class StdoutSink(LogSink):
+    """One JSON object per line on stdout - for serverless log collectors"""
+
+    name = "stdout"
+
+    def __init__(self, writer: BatchedLogWriter, sample_rates: Optional[Dict[str, float]] = None):
+        super().__init__(sample_rates)
+        self.writer = writer
+
+    def emit(self, log_type: str, data: Dict[str, Any]) -> None:
+        # Written by the background writer, like the files - pipe writes can block
+        self.writer.submit(sys.stdout, {"log_type": log_type, **data})
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        return self.writer.flush(timeout)
+
+
+class FileSink(LogSink):
+    """JSONL files in log_dir, written by the background BatchedLogWriter"""
+
+    name = "file"
+
+    def __init__(self, log_dir: Path, writer: BatchedLogWriter,
+                 sample_rates: Optional[Dict[str, float]] = None):
+        super().__init__(sample_rates)
+        self.log_dir = Path(log_dir)
+        self.writer = writer
+        self.paths = {log_type: self.log_dir / f"{log_type}.jsonl" for log_type in LOG_TYPES}
+
+        # Read-only filesystems (e.g. serverless) shouldn't break logging
+        try:
+            self.log_dir.mkdir(parents=True, exist_ok=True)
+            self.available = True
+        except OSError as e:
+            print(f"Log Sink Error: cannot create {self.log_dir} ({e}) - file logging disabled")
+            self.available = False
+
+    def emit(self, log_type: str, data: Dict[str, Any]) -> None:
+        if self.available:
+            self.writer.submit(self.paths[log_type], data)
+
+    def recent(self, log_type: str, limit: int, since: Optional[float]) -> Optional[List[Dict[str, Any]]]:
+        """What is on disk already - entries still queued show up within one flush interval"""
+        if not self.available:
+            return None
+        return tail_records(self.paths[log_type], limit=limit, since=since)
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        return self.writer.flush(timeout)
+
+    def close(self) -> None:
+        self.writer.close()
+
+
+class RingBufferSink(LogSink):
+    """Fixed-size in-memory buffer per log type - dashboards read it with zero disk I/O"""
+
+    name = "ring"
+
+    def __init__(self, capacity: int = 1000, sample_rates: Optional[Dict[str, float]] = None):
+        super().__init__(sample_rates)
+        self.capacity = capacity
+        self.buffers: Dict[str, Deque] = {
+            log_type: deque(maxlen=capacity) for log_type in LOG_TYPES
+        }
+
+    def emit(self, log_type: str, data: Dict[str, Any]) -> None:
+        # Store receive time alongside the entry so window filtering needs no parsing
+        self.buffers[log_type].append((time.time(), data))
+
+    def recent(self, log_type: str, limit: int, since: Optional[float]) -> Optional[List[Dict[str, Any]]]:
+        entries = []
+        for ts, data in reversed(list(self.buffers[log_type])):
+            if since is not None and ts < since:
+                break
+            entries.append(data)
+            if len(entries) >= limit:
+                break
+        return entries
+
+
+def parse_sink_spec(spec: str) -> List[tuple]:
+    """
+    Parse PLUTO_LOG_SINKS, e.g. "file:access=0.1,ring,stdout:access=0.01;performance=0.1"
+
+    Returns:
+        [(sink_name, {log_type: sample_rate}), ...]
+    """
+    sinks = []
+    for part in spec.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        name, _, rates_spec = part.partition(':')
+        rates = {}
+        for rate in rates_spec.split(';'):
+            if '=' in rate:
+                log_type, value = rate.split('=', 1)
+                rates[log_type.strip()] = float(value)
+        sinks.append((name.strip().lower(), rates))
+    return sinks
+
+
+def build_sinks_from_env(log_dir: Path, writer: BatchedLogWriter) -> List[LogSink]:
+    """
+    Build sinks from PLUTO_LOG_SINKS. Defaults to "file,ring" locally and
+    "stdout,ring" on Vercel, where the filesystem is read-only.
+    """
+    default = "stdout,ring" if os.getenv("VERCEL") else "file,ring"
+    spec = os.getenv("PLUTO_LOG_SINKS", default)
+
+    sinks: List[LogSink] = []
+    for name, rates in parse_sink_spec(spec):
+        if name == "file":
+            sinks.append(FileSink(log_dir, writer, rates))
+        elif name == "stdout":
+            sinks.append(StdoutSink(writer, rates))
+        elif name == "ring":
+            sinks.append(RingBufferSink(int(os.getenv("PLUTO_LOG_RING_SIZE", "1000")), rates))
+        elif name == "null":
+            sinks.append(NullSink(rates))
+        else:
+            print(f"Log Sink Error: unknown sink '{name}' in PLUTO_LOG_SINKS - ignored")
+    return sinks
@@ -0,0 +1,305 @@
+"""
+Background batched writer for Pluto Health JSONL logs
+Moves log file I/O off the request path without external services
+"""
+import atexit
+import json
+import os
+import queue
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, Any, List, Optional, TextIO, Union
+
+from .shared_metrics import get_metrics_store
+
+# Wake-up marker used to nudge the worker thread (safe to drop)
+_WAKE = object()
+
+
+class DropPolicy:
+    """What to do with a new entry when the queue is full"""
+    DROP_NEWEST = "drop_newest"  # Discard the incoming entry (default, never blocks)
+    DROP_OLDEST = "drop_oldest"  # Evict the oldest queued entry to make room
+    BLOCK = "block"              # Wait up to block_timeout, then discard
+
+    ALL = (DROP_NEWEST, DROP_OLDEST, BLOCK)
+
+
+class BatchedLogWriter:
+    """
+    Queue-backed JSONL writer with a single background thread
+
+    Entries are serialized on the caller thread, queued, and appended by the
+    worker in per-file batches. A batch is flushed when it reaches batch_size
+    entries or flush_interval seconds have passed. File handles stay open for
+    the lifetime of the writer and everything pending is flushed on close().
+    A target may also be an open stream such as sys.stdout, which is written
+    to but never opened or closed by the writer.
+    """
+
+    def __init__(self, max_queue: int = 10000, batch_size: int = 256,
+                 flush_interval: float = 1.0, drop_policy: str = DropPolicy.DROP_NEWEST,
+                 block_timeout: float = 0.05, enabled: bool = True):
+        if drop_policy not in DropPolicy.ALL:
+            raise ValueError(f"Unknown drop policy: {drop_policy}")
+
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.drop_policy = drop_policy
+        self.block_timeout = block_timeout
+        self.enabled = enabled
+
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_queue)
+        self._handles: Dict[Path, TextIO] = {}
+        self._handles_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._flush_waiters: List[threading.Event] = []
+        self._flush_hooks: List[Callable[[], None]] = []
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self._closed = False
+        self._atexit_registered = False
+
+        # Counters (exposed through PlutoLogger.get_metrics)
+        self._store = get_metrics_store()
+
+    @classmethod
+    def from_env(cls) -> "BatchedLogWriter":
+        """Build a writer from PLUTO_LOG_* environment variables"""
+        return cls(
+            max_queue=int(os.getenv("PLUTO_LOG_QUEUE_SIZE", "10000")),
+            batch_size=int(os.getenv("PLUTO_LOG_BATCH_SIZE", "256")),
+            flush_interval=float(os.getenv("PLUTO_LOG_FLUSH_INTERVAL", "1.0")),
+            drop_policy=os.getenv("PLUTO_LOG_DROP_POLICY", DropPolicy.DROP_NEWEST),
+            enabled=os.getenv("PLUTO_LOG_ASYNC", "1") != "0",
+        )
+
+    # =========================================================================
+    # PRODUCER SIDE (request path)
+    # =========================================================================
+
+    def submit(self, filepath: Union[Path, TextIO], data: Dict[str, Any]) -> bool:
+        """
+        Queue a log entry for writing. Never touches the disk when async.
+
+        Returns:
+            False if the entry was dropped because the queue was full
+        """
+        line = json.dumps(data) + '\n'
+        target = Path(filepath) if isinstance(filepath, (str, os.PathLike)) else filepath
+
+        if not self.enabled or self._closed or not self._ensure_started():
+            # Synchronous fallback (disabled, shut down, or no thread available)
+            self._write_batch(target, [line])
+            return True
+
+        item = (target, line)
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            if not self._handle_full(item):
+                self._store.inc("log_writer.dropped")
+                return False
+
+        self._store.inc("log_writer.enqueued")
+        return True
+
+    def _handle_full(self, item) -> bool:
+        """Apply the drop policy to an entry that didn't fit in the queue"""
+        if self.drop_policy == DropPolicy.DROP_OLDEST:
+            try:
+                evicted = self._queue.get_nowait()
+                if evicted is not _WAKE:
+                    self._store.inc("log_writer.dropped")
+                    self._store.inc("log_writer.enqueued", -1)
+            except queue.Empty:
+                pass
+            try:
+                self._queue.put_nowait(item)
+                return True
+            except queue.Full:
+                return False
+
+        if self.drop_policy == DropPolicy.BLOCK:
+            try:
+                self._queue.put(item, timeout=self.block_timeout)
+                return True
+            except queue.Full:
+                return False
+
+        return False
+
+    def _ensure_started(self) -> bool:
+        """Start (or restart after fork) the background worker thread"""
+        pid = os.getpid()
+        if self._thread is not None and self._pid == pid and self._thread.is_alive():
+            return True
+
+        with self._start_lock:
+            if self._thread is not None and self._pid == pid and self._thread.is_alive():
+                return True
+
+            if self._pid != pid:
+                # Forked child: inherited queue/handles belong to the parent
+                self._queue = queue.Queue(maxsize=self.max_queue)
+                self._handles = {}
+                self._flush_waiters = []
+
+            try:
+                self._thread = threading.Thread(
+                    target=self._run, name="pluto-log-writer", daemon=True
+                )
+                self._thread.start()
+            except RuntimeError:
+                # Interpreter shutting down - caller falls back to sync writes
+                return False
+
+            self._pid = pid
+            if not self._atexit_registered:
+                atexit.register(self.close)
+                self._atexit_registered = True
+        return True
+
+    # =========================================================================
+    # CONTROL
+    # =========================================================================
+
+    def _wake(self) -> None:
+        try:
+            self._queue.put_nowait(_WAKE)
+        except queue.Full:
+            pass  # Worker is busy draining and will see the request anyway
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Block until everything queued so far has been written"""
+        if self._thread is None or not self._thread.is_alive() or self._pid != os.getpid():
+            self._run_hooks()
+            return True
+
+        done = threading.Event()
+        with self._start_lock:
+            self._flush_waiters.append(done)
+        self._wake()
+        return done.wait(timeout)
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Flush all pending entries and close file handles (idempotent)"""
+        if self._closed:
+            return
+        self._closed = True
+
+        thread = self._thread
+        if thread is not None and thread.is_alive() and self._pid == os.getpid():
+            self._wake()
+            thread.join(timeout)
+
+        self._run_hooks()
+        self._close_handles()
+
+    def add_flush_hook(self, hook: Callable[[], None]) -> None:
+        """Run hook on the worker thread after every flush cycle and on close"""
+        self._flush_hooks.append(hook)
+
+    def _run_hooks(self) -> None:
+        for hook in self._flush_hooks:
+            try:
+                hook()
+            except Exception as e:
+                print(f"Log Writer Hook Error: {e}")
+
+    def get_stats(self, snapshot: Optional[Dict[str, float]] = None) -> Dict[str, Any]:
+        """Counters plus current queue depth (queue fields are per-process)"""
+        snapshot = snapshot if snapshot is not None else self._store.snapshot()
+        return {
+            **{name: int(snapshot.get(f"log_writer.{name}", 0))
+               for name in ("enqueued", "written", "dropped", "batches", "write_errors")},
+            "queue_depth": self._queue.qsize(),
+            "queue_capacity": self.max_queue,
+            "drop_policy": self.drop_policy,
+            "async": self.enabled and not self._closed,
+        }
+
+    # =========================================================================
+    # WORKER SIDE
+    # =========================================================================
+
+    def _run(self) -> None:
+        pending: Dict[Path, List[str]] = {}
+        pending_count = 0
+        deadline = time.monotonic() + self.flush_interval
+
+        while True:
+            try:
+                item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                item = None
+
+            if item is not None and item is not _WAKE:
+                path, line = item
+                pending.setdefault(path, []).append(line)
+                pending_count += 1
+
+            waiters = None
+            if self._flush_waiters or self._closed:
+                with self._start_lock:
+                    waiters, self._flush_waiters = self._flush_waiters, []
+                pending_count += self._drain_into(pending)
+
+            if waiters is not None or pending_count >= self.batch_size or time.monotonic() >= deadline:
+                self._flush_pending(pending)
+                self._run_hooks()
+                pending = {}
+                pending_count = 0
+                deadline = time.monotonic() + self.flush_interval
+
+            for waiter in waiters or ():
+                waiter.set()
+
+            if self._closed and self._queue.empty():
+                return
+
+    def _drain_into(self, pending: Dict[Path, List[str]]) -> int:
+        """Move everything currently queued into the pending batches"""
+        drained = 0
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                return drained
+            if item is _WAKE:
+                continue
+            path, line = item
+            pending.setdefault(path, []).append(line)
+            drained += 1
+
+    def _flush_pending(self, pending: Dict[Path, List[str]]) -> None:
+        for path, lines in pending.items():
+            if lines:
+                self._write_batch(path, lines)
+
+    def _write_batch(self, path: Union[Path, TextIO], lines: List[str]) -> None:
+        """Append a batch of serialized lines using a keep-open handle"""
+        try:
+            with self._handles_lock:
+                handle = path if not isinstance(path, Path) else self._handles.get(path)
+                if handle is None or handle.closed:
+                    handle = open(path, 'a')
+                    self._handles[path] = handle
+                handle.write(''.join(lines))
+                handle.flush()
+            self._store.inc("log_writer.written", len(lines))
+            self._store.inc("log_writer.batches")
+        except OSError as e:
+            self._store.inc("log_writer.write_errors")
+            print(f"Log Writer Error ({path}): {e}")
+
+    def _close_handles(self) -> None:
+        with self._handles_lock:
+            for handle in self._handles.values():
+                try:
+                    handle.close()
+                except OSError:
+                    pass
+            self._handles = {}
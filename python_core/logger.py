@@ -2,13 +2,19 @@
 In-house logging and monitoring system for Pluto Health
 Tracks errors, performance, and usage patterns without external services
 """
-import json
+import os
 import time
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 from enum import Enum
 
+from .log_writer import BatchedLogWriter
+from .log_rollups import TriageRollup
+from .log_sinks import LogSink, FileSink, RingBufferSink, LOG_TYPES, build_sinks_from_env
+from .latency import LatencyRegistry
+from .shared_metrics import get_metrics_store
+
 class LogLevel(str, Enum):
     DEBUG = "DEBUG"
     INFO = "INFO"
@@ -18,35 +24,65 @@ class LogLevel(str, Enum):
 
 class PlutoLogger:
     """
-    Simple file-based logger with structured JSON output
+    Structured JSON logger with pluggable sinks
     Provides error tracking and performance monitoring without external services
+    
+    Entries fan out to the configured sinks (see log_sinks.py): batched files,
+    stdout JSON, null, and in-memory ring buffers. Call close() on shutdown.
     """
     
-    def __init__(self, log_dir: str = "logs"):
+    def __init__(self, log_dir: str = "logs", writer: Optional[BatchedLogWriter] = None,
+                 sinks: Optional[List[LogSink]] = None):
         self.log_dir = Path(log_dir)
-        self.log_dir.mkdir(exist_ok=True)
         
-        # Separate log files for different types
+        # Separate log files for different types (used by the file sink)
         self.error_log = self.log_dir / "errors.jsonl"
         self.triage_log = self.log_dir / "triage.jsonl"
         self.performance_log = self.log_dir / "performance.jsonl"
         self.access_log = self.log_dir / "access.jsonl"
         
-        # In-memory metrics for dashboard
+        # Background writer (batches entries per file, keeps handles open)
+        self._writer = writer or BatchedLogWriter.from_env()
+        
+        # Outputs (PLUTO_LOG_SINKS); the directory is only created by a file sink
+        self.sinks = sinks if sinks is not None else build_sinks_from_env(self.log_dir, self._writer)
+        has_files = any(isinstance(s, FileSink) and s.available for s in self.sinks)
+        
+        # Per-minute triage aggregates so stats queries never scan the log
+        # (persisted next to the log files only when file logging is on)
+        self.triage_rollup = TriageRollup(
+            self.log_dir / "triage_rollup.json" if has_files else None,
+            retention_hours=int(os.getenv("PLUTO_ROLLUP_RETENTION_HOURS", "168"))
+        )
+        if has_files:
+            self.triage_rollup.load(source_log=self.triage_log)
+            self._writer.add_flush_hook(self.triage_rollup.save)
+        
+        # Fixed-memory latency histograms (per endpoint, urgency level, engine stage)
+        self.latency = LatencyRegistry.from_env()
+        
+        # Counters live in the metrics store (merged across workers when shared);
+        # only per-process details are kept here
+        self._store = get_metrics_store()
         self.metrics = {
-            "total_requests": 0,
-            "successful_triages": 0,
-            "failed_triages": 0,
-            "total_errors": 0,
-            "avg_response_time": 0,
             "last_error": None,
             "start_time": time.time()
         }
     
-    def _write_log(self, filepath: Path, data: Dict[str, Any]) -> None:
-        """Write structured log entry"""
-        with open(filepath, 'a') as f:
-            f.write(json.dumps(data) + '\n')
+    def _write_log(self, log_type: str, data: Dict[str, Any]) -> None:
+        """Send structured log entry to every sink that samples it in"""
+        for sink in self.sinks:
+            if sink.accepts(log_type):
+                sink.emit(log_type, data)
+    
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Wait until all buffered log entries are written out"""
+        return all([sink.flush(timeout) for sink in self.sinks])
+    
+    def close(self) -> None:
+        """Flush pending entries and release file handles (call on shutdown)"""
+        for sink in self.sinks:
+            sink.close()
     
     def log_triage(self, user_id: Optional[str], input_text: str, 
                    result: Dict[str, Any], duration_ms: float) -> None:
@@ -62,17 +98,15 @@ class PlutoLogger:
             "version": result.get("version")
         }
         
-        self._write_log(self.triage_log, log_entry)
+        self._write_log("triage", log_entry)
+        self.triage_rollup.record(
+            log_entry["triage_level"], bool(log_entry["ai_called"]), duration_ms
+        )
         
         # Update metrics
-        self.metrics["total_requests"] += 1
-        self.metrics["successful_triages"] += 1
-        
-        # Update rolling average response time
-        total = self.metrics["total_requests"]
-        self.metrics["avg_response_time"] = (
-            (self.metrics["avg_response_time"] * (total - 1) + duration_ms) / total
-        )
+        self._store.inc("logger.total_requests")
+        self._store.inc("logger.successful_triages")
+        self._store.inc("logger.response_time_ms_sum", duration_ms)
     
     def log_error(self, error_type: str, message: str, context: Dict[str, Any] = None,
                   level: LogLevel = LogLevel.ERROR) -> None:
@@ -85,10 +119,10 @@ class PlutoLogger:
             "context": context or {}
         }
         
-        self._write_log(self.error_log, log_entry)
+        self._write_log("errors", log_entry)
         
         # Update metrics
-        self.metrics["total_errors"] += 1
+        self._store.inc("logger.total_errors")
         self.metrics["last_error"] = {
             "type": error_type,
             "message": message,
@@ -96,11 +130,14 @@ class PlutoLogger:
         }
         
         if level in [LogLevel.ERROR, LogLevel.CRITICAL]:
-            self.metrics["failed_triages"] += 1
+            # A failed request is still a request: keeps error_rate <= 1
+            self._store.inc("logger.total_requests")
+            self._store.inc("logger.failed_triages")
     
     def log_performance(self, endpoint: str, duration_ms: float, 
-                       status_code: int, user_id: Optional[str] = None) -> None:
-        """Log API performance"""
+                       status_code: int, user_id: Optional[str] = None,
+                       extra: Optional[Dict[str, Any]] = None) -> None:
+        """Log API performance (extra: endpoint-specific fields, e.g. prompt token counts)"""
         log_entry = {
             "timestamp": datetime.utcnow().isoformat(),
             "endpoint": endpoint,
@@ -108,8 +145,20 @@ class PlutoLogger:
             "status_code": status_code,
             "user_id": user_id or "anonymous"
         }
+        if extra:
+            log_entry.update(extra)
         
-        self._write_log(self.performance_log, log_entry)
+        self._write_log("performance", log_entry)
+        self.latency.record("endpoint", endpoint, duration_ms)
+    
+    def record_latency(self, family: str, name: str, duration_ms: float) -> None:
+        """Record a latency sample without writing a log line"""
+        self.latency.record(family, name, duration_ms)
+    
+    def record_stage_timings(self, timings: Dict[str, float]) -> None:
+        """Record per-stage timings from the reasoning engine"""
+        for stage, duration_ms in timings.items():
+            self.latency.record("stage", stage, duration_ms)
     
     def log_access(self, endpoint: str, method: str, user_id: Optional[str],
                    ip_address: str, user_agent: Optional[str] = None) -> None:
@@ -123,67 +172,69 @@ class PlutoLogger:
             "user_agent": user_agent
         }
         
-        self._write_log(self.access_log, log_entry)
+        self._write_log("access", log_entry)
     
-    def get_metrics(self) -> Dict[str, Any]:
-        """Get current metrics for dashboard"""
+    def get_metrics(self, snapshot: Optional[Dict[str, float]] = None) -> Dict[str, Any]:
+        """
+        Get current metrics for dashboard. Counters cover every worker on the
+        host when PLUTO_METRICS_DIR is set; uptime and last_error are per-process.
+        """
+        snapshot = snapshot if snapshot is not None else self._store.snapshot()
+        total = int(snapshot.get("logger.total_requests", 0))
+        successful = int(snapshot.get("logger.successful_triages", 0))
+        failed = int(snapshot.get("logger.failed_triages", 0))
         uptime = time.time() - self.metrics["start_time"]
         return {
+            "total_requests": total,
+            "successful_triages": successful,
+            "failed_triages": failed,
+            "total_errors": int(snapshot.get("logger.total_errors", 0)),
+            "avg_response_time": (
+                snapshot.get("logger.response_time_ms_sum", 0) / total if total > 0 else 0
+            ),
             **self.metrics,
             "uptime_seconds": uptime,
             "uptime_hours": uptime / 3600,
-            "success_rate": (
-                self.metrics["successful_triages"] / self.metrics["total_requests"]
-                if self.metrics["total_requests"] > 0 else 0
-            ),
-            "error_rate": (
-                self.metrics["failed_triages"] / self.metrics["total_requests"]
-                if self.metrics["total_requests"] > 0 else 0
-            )
+            "success_rate": successful / total if total > 0 else 0,
+            "error_rate": failed / total if total > 0 else 0,
+            "shared_metrics": self._store.shared,
+            "log_writer": self._writer.get_stats(snapshot)
         }
     
-    def get_recent_errors(self, limit: int = 10) -> list:
-        """Get recent errors for debugging"""
-        if not self.error_log.exists():
-            return []
+    def get_latency_stats(self, snapshot: Optional[Dict[str, float]] = None) -> Dict[str, Any]:
+        """Get p50/p95/p99/max per endpoint, urgency level and engine stage"""
+        return self.latency.snapshot(snapshot)
+    
+    def get_recent_errors(self, limit: int = 10, hours: Optional[float] = None) -> list:
+        """Get recent errors for debugging (most recent first)"""
+        return self.get_recent_entries("errors", limit=limit, hours=hours)
+    
+    def get_recent_entries(self, log_type: str, limit: int = 50,
+                           hours: Optional[float] = None) -> list:
+        """
+        Get the newest entries of a log without reading whole files.
+        Served from the in-memory ring buffer when that sink is enabled,
+        otherwise by tail-reading the log file.
         
-        errors = []
-        with open(self.error_log, 'r') as f:
-            # Read last N lines
-            lines = f.readlines()
-            for line in lines[-limit:]:
-                try:
-                    errors.append(json.loads(line))
-                except json.JSONDecodeError:
-                    continue
+        Args:
+            log_type: One of "errors", "triage", "performance", "access"
+            limit: Maximum number of entries to return
+            hours: Only return entries from the last N hours
+        """
+        if log_type not in LOG_TYPES:
+            raise ValueError(f"Unknown log type: {log_type}")
         
-        return errors[::-1]  # Reverse to show most recent first
+        since = time.time() - hours * 3600 if hours is not None else None
+        for sink in sorted(self.sinks, key=lambda s: not isinstance(s, RingBufferSink)):
+            entries = sink.recent(log_type, limit, since)
+            if entries is not None:
+                return entries
+        return []
     
     def get_triage_stats(self, hours: int = 24) -> Dict[str, Any]:
-        """Get triage statistics for the last N hours"""
-        if not self.triage_log.exists():
-            return {"total": 0, "levels": {}}
-        
-        cutoff_time = datetime.utcnow().timestamp() - (hours * 3600)
-        levels = {}
-        total = 0
-        
-        with open(self.triage_log, 'r') as f:
-            for line in f:
-                try:
-                    entry = json.loads(line)
-                    entry_time = datetime.fromisoformat(entry["timestamp"]).timestamp()
-                    
-                    if entry_time >= cutoff_time:
-                        total += 1
-                        level = entry.get("triage_level", "unknown")
-                        levels[level] = levels.get(level, 0) + 1
-                except (json.JSONDecodeError, KeyError):
-                    continue
-        
+        """Get triage statistics for the last N hours (from per-minute rollups)"""
         return {
-            "total": total,
-            "levels": levels,
+            **self.triage_rollup.query(hours),
             "period_hours": hours
         }
 
@@ -1,27 +1,209 @@
-from typing import Optional, List, Any
+from typing import Optional, List, Any, Callable, Dict
 from datetime import datetime
+from uuid import uuid4
 import os
+import threading
+import time
 from sqlmodel import SQLModel, Field, Relationship, create_engine
-from sqlalchemy import Column, JSON, String, Boolean, DateTime, ForeignKey
+from sqlalchemy import Column, JSON, String, Boolean, DateTime, ForeignKey, Integer, UniqueConstraint, Index
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import QueuePool, NullPool, AsyncAdaptedQueuePool
+
+# Query parameters only Prisma understands - psycopg2 rejects them
+PRISMA_URL_PARAMS = ("pgbouncer", "connection_limit", "pool_timeout", "schema",
+                     "socket_timeout", "statement_cache_size")
+
+POOL_MODES = ("queue", "null", "pgbouncer")
+
+# Receives each pool checkout's wait in ms. The apps set it at startup so
+# importing the models doesn't build the logger.
+_checkout_observer: Optional[Callable[[float], None]] = None
+
+
+def set_checkout_observer(observer: Optional[Callable[[float], None]]) -> None:
+    global _checkout_observer
+    _checkout_observer = observer
+
+
+def _observe_checkout(start: float) -> None:
+    if _checkout_observer is not None:
+        _checkout_observer((time.perf_counter() - start) * 1000)
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waited for a connection"""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            _observe_checkout(start)
+
+
+class TimedAsyncQueuePool(AsyncAdaptedQueuePool):
+    """Asyncio-compatible TimedQueuePool"""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            _observe_checkout(start)
+
+
+class TimedNullPool(NullPool):
+    """NullPool that records connect time (every checkout opens a connection)"""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            _observe_checkout(start)
+
+
+def resolve_pool_mode(db_url: str) -> str:
+    """
+    PLUTO_DB_POOL if set, otherwise pgbouncer when the URL asks for it (as
+    Prisma's ?pgbouncer=true does), null on Vercel, queue everywhere else.
+    """
+    mode = os.getenv("PLUTO_DB_POOL", "").strip().lower()
+    if mode in POOL_MODES:
+        return mode
+    if mode:
+        print(f"DB Pool Error: unknown PLUTO_DB_POOL '{mode}' - using auto")
+    if make_url(db_url).query.get("pgbouncer") == "true":
+        return "pgbouncer"
+    return "null" if os.getenv("VERCEL") else "queue"
+
+def get_database_url(async_driver: bool = False):
+    """
+    DATABASE_URL as a SQLAlchemy URL (None if unset), with the driver pinned
+    and Prisma-only flags removed. async_driver=True selects asyncpg/aiosqlite.
+    """
+    db_url = os.getenv("DATABASE_URL")
+    if not db_url: return None
+
+    # 1. SQLAlchemy requires postgresql://, and pin the driver we ship
+    # (SQLAlchemy 2.1 defaults plain postgresql:// to psycopg 3)
+    if db_url.startswith("postgres://"):
+        db_url = db_url.replace("postgres://", "postgresql://", 1)
+    if db_url.startswith("postgresql://"):
+        db_url = db_url.replace("postgresql://", "postgresql+psycopg2://", 1)
+
+    # 2. Drop Prisma-only flags (psycopg2 throws on them) but keep libpq
+    # options such as sslmode
+    url = make_url(db_url).difference_update_query(PRISMA_URL_PARAMS)
+
+    if async_driver:
+        if url.drivername == "postgresql+psycopg2":
+            url = url.set(drivername="postgresql+asyncpg")
+            # asyncpg takes ssl=<mode> instead of libpq's sslmode
+            if "sslmode" in url.query:
+                url = url.update_query_dict({"ssl": url.query["sslmode"]}).difference_update_query(["sslmode"])
+        elif url.drivername == "sqlite":
+            url = url.set(drivername="sqlite+aiosqlite")
+    return url
+
+def _engine_kwargs(mode: str, async_driver: bool) -> Dict[str, Any]:
+    if mode == "queue":
+        # Long-running workers: a small warm pool, recycled before the
+        # server or a proxy closes idle connections
+        return {
+            "poolclass": TimedAsyncQueuePool if async_driver else TimedQueuePool,
+            "pool_size": int(os.getenv("PLUTO_DB_POOL_SIZE", "5")),
+            "max_overflow": int(os.getenv("PLUTO_DB_MAX_OVERFLOW", "10")),
+            "pool_timeout": float(os.getenv("PLUTO_DB_POOL_TIMEOUT", "30")),
+            "pool_recycle": int(os.getenv("PLUTO_DB_POOL_RECYCLE", "1800")),
+            "pool_pre_ping": True,
+        }
+
+    # Serverless / pgbouncer: hold no idle connections in the instance, the
+    # external pooler does the pooling. psycopg2 never uses named prepared
+    # statements; asyncpg does, which transaction-mode pgbouncer can't route.
+    # Disabling the caches isn't enough: asyncpg still names the statements it
+    # prepares per query, and two clients' names collide on a shared server
+    # connection, so every name is made unique.
+    kwargs: Dict[str, Any] = {"poolclass": TimedNullPool}
+    if mode == "pgbouncer" and async_driver:
+        kwargs["connect_args"] = {
+            "statement_cache_size": 0,
+            "prepared_statement_cache_size": 0,
+            "prepared_statement_name_func": lambda: f"__asyncpg_{uuid4()}__",
+        }
+    return kwargs
 
 def get_engine():
+    """Blocking engine, for scripts and tooling (the API uses get_async_engine)"""
+    try:
+        url = get_database_url()
+        if url is None: return None
+        mode = resolve_pool_mode(os.environ["DATABASE_URL"])
+        kwargs = _engine_kwargs(mode, async_driver=False)
+        if url.get_backend_name() != "postgresql":
+            kwargs.pop("connect_args", None)
+        return create_engine(url, **kwargs)
+    except Exception as e:
+        print(f"DB Engine Error: {e}")
+        return None
+
+def get_async_engine():
+    """asyncio engine (asyncpg for Postgres, aiosqlite for local SQLite)"""
     try:
-        db_url = os.getenv("DATABASE_URL")
-        if not db_url: return None
-        
-        # 1. SQLAlchemy requires postgresql://
-        if db_url.startswith("postgres://"):
-            db_url = db_url.replace("postgres://", "postgresql://", 1)
-        
-        # 2. PGBouncer Flag Cleanup: Psycopg2 throws on unknown options like pgbouncer=true
-        if "?" in db_url:
-            # We strip everything after the '?' to ensure a clean DSN
-            db_url = db_url.split("?")[0]
-            
-        return create_engine(db_url, pool_pre_ping=True)
-    except Exception: return None
-
-engine = get_engine()
+        url = get_database_url(async_driver=True)
+        if url is None: return None
+        mode = resolve_pool_mode(os.environ["DATABASE_URL"])
+        kwargs = _engine_kwargs(mode, async_driver=True)
+        if url.get_backend_name() != "postgresql":
+            kwargs.pop("connect_args", None)
+        return create_async_engine(url, **kwargs)
+    except Exception as e:
+        print(f"DB Engine Error: {e}")
+        return None
+
+# Process-wide engines, created on first use (not at import time)
+_engines: Dict[str, Any] = {}
+_engine_lock = threading.Lock()
+
+def _shared(kind: str, factory):
+    if kind not in _engines:
+        with _engine_lock:
+            if kind not in _engines:
+                _engines[kind] = factory()
+    return _engines[kind]
+
+def get_shared_engine():
+    """Process-wide blocking engine"""
+    return _shared("sync", get_engine)
+
+def get_shared_async_engine():
+    """Process-wide asyncio engine used by the API routers"""
+    return _shared("async", get_async_engine)
+
+def get_pool_stats() -> Dict[str, Any]:
+    """Pool mode and occupancy of the API's engine (never creates it)"""
+    engine = _engines.get("async") or _engines.get("sync")
+    if engine is None:
+        return {"mode": None, "created": False}
+
+    pool = engine.pool
+    stats: Dict[str, Any] = {"mode": resolve_pool_mode(os.getenv("DATABASE_URL", "")), "created": True}
+    if isinstance(pool, QueuePool):
+        stats.update({
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "checked_in": pool.checkedin(),
+            "overflow": pool.overflow(),
+        })
+    return stats
+
+def __getattr__(name):
+    # Backwards compatible `models.engine`, resolved lazily
+    if name == "engine":
+        return get_shared_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 class Session(SQLModel, table=True):
     __tablename__ = "Session"
@@ -54,9 +236,19 @@ class MedicalFact(SQLModel, table=True):
     confidence: str = Field(default="Reported")
     source: str
     createdAt: datetime = Field(default_factory=datetime.utcnow, sa_column=Column("createdAt", DateTime, default=datetime.utcnow))
+    # Dedup key over (userId, type, normalized value) - see fact_store.py
+    factHash: Optional[str] = Field(default=None, sa_column=Column("factHash", String))
+    lastSeen: Optional[datetime] = Field(default=None, sa_column=Column("lastSeen", DateTime))
+    seenCount: int = Field(default=1, sa_column=Column("seenCount", Integer, default=1, server_default="1"))
 
     user: "User" = Relationship(back_populates="medicalFacts")
 
+    __table_args__ = (
+        UniqueConstraint("userId", "factHash", name="MedicalFact_userId_factHash_key"),
+        # Keyset pagination for /api/memory
+        Index("MedicalFact_userId_createdAt_id_idx", "userId", "createdAt", "id"),
+    )
+
 class TriageEvent(SQLModel, table=True):
     __tablename__ = "TriageEvent"
     id: str = Field(default=None, primary_key=True)
@@ -0,0 +1,219 @@
+"""
+Prometheus text exposition for Pluto Health metrics
+Renders existing in-memory counters on demand - nothing extra on the hot path
+"""
+from typing import Dict, List, Tuple
+
+from .latency import LatencyHistogram, NUM_BUCKETS, bucket_upper_bound
+from .logger import get_logger
+from .rate_limiter import get_rate_limiter
+from .clinical_reasoning_engine import get_reasoning_engine
+from .llm_client import get_llm_stats, get_llm_pool
+from .circuit_breaker import STATE_VALUES
+from .response_cache import get_response_cache
+from .shared_metrics import get_metrics_store
+from .models import get_pool_stats
+from .event_writer import get_event_writer
+from .job_queue import get_job_queue
+from .fanout import get_fanout_stats
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Exported histogram boundaries (seconds). Each maps onto the highest internal
+# log bucket that fits under it, so counts are exact to within one log bucket.
+EXPORT_BUCKETS_SECONDS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+    1.0, 2.5, 5.0, 10.0, 30.0, 60.0,
+)
+_EXPORT_INDEX = [
+    max(i for i in range(NUM_BUCKETS) if bucket_upper_bound(i) <= le * 1000 * 1.0001)
+    for le in EXPORT_BUCKETS_SECONDS
+]
+
+# Latency families exported as histograms: family -> (metric name, label, help)
+LATENCY_FAMILIES = {
+    "endpoint": ("pluto_request_duration_seconds", "endpoint", "API request latency"),
+    "urgency": ("pluto_triage_duration_seconds", "urgency", "Triage latency by urgency level"),
+    "stage": ("pluto_engine_stage_duration_seconds", "stage", "Reasoning engine stage latency"),
+    "llm": ("pluto_llm_duration_seconds", "purpose", "LLM call latency"),
+    "db": ("pluto_db_pool_wait_seconds", "operation", "Time spent waiting for a pooled DB connection"),
+    "triage_step": ("pluto_triage_step_duration_seconds", "step", "Post-reasoning triage step latency"),
+}
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+
+def _header(lines: List[str], name: str, kind: str, help_text: str) -> None:
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} {kind}")
+
+
+def _scalar(lines: List[str], name: str, kind: str, help_text: str, value) -> None:
+    _header(lines, name, kind, help_text)
+    lines.append(f"{name} {value}")
+
+
+def _histogram(lines: List[str], name: str, label: str,
+               series: List[Tuple[str, LatencyHistogram]]) -> None:
+    for label_value, hist in series:
+        counts = list(hist.counts)
+        cumulative = 0
+        position = 0
+        for le, index in zip(EXPORT_BUCKETS_SECONDS, _EXPORT_INDEX):
+            while position <= index:
+                cumulative += counts[position]
+                position += 1
+            lines.append(f"{name}_bucket{_labels({label: label_value, 'le': repr(le)})} {cumulative}")
+        lines.append(f"{name}_bucket{_labels({label: label_value, 'le': '+Inf'})} {hist.count}")
+        lines.append(f"{name}_sum{_labels({label: label_value})} {hist.total_ms / 1000}")
+        lines.append(f"{name}_count{_labels({label: label_value})} {hist.count}")
+
+
+def render_metrics() -> str:
+    """Render all Pluto metrics in Prometheus text format (O(number of series))"""
+    lines: List[str] = []
+    logger = get_logger()
+    # One merged read of the metrics store (all workers when shared)
+    snapshot = get_metrics_store().snapshot()
+    metrics = logger.get_metrics(snapshot)
+
+    # Logger counters
+    _scalar(lines, "pluto_uptime_seconds", "gauge", "Seconds since process start", metrics["uptime_seconds"])
+    _scalar(lines, "pluto_triage_requests_total", "counter", "Triage requests logged", metrics["total_requests"])
+    _scalar(lines, "pluto_triage_success_total", "counter", "Successful triages", metrics["successful_triages"])
+    _scalar(lines, "pluto_triage_failed_total", "counter", "Failed triages", metrics["failed_triages"])
+    _scalar(lines, "pluto_errors_total", "counter", "Errors logged", metrics["total_errors"])
+
+    writer = metrics["log_writer"]
+    _scalar(lines, "pluto_log_entries_written_total", "counter", "Log entries written to disk", writer["written"])
+    _scalar(lines, "pluto_log_entries_dropped_total", "counter", "Log entries dropped (queue full)", writer["dropped"])
+    _scalar(lines, "pluto_log_write_errors_total", "counter", "Log batch write failures", writer["write_errors"])
+    _scalar(lines, "pluto_log_queue_depth", "gauge", "Log entries waiting to be written", writer["queue_depth"])
+
+    _header(lines, "pluto_log_entries_sampled_out_total", "counter", "Log entries skipped by sink sampling")
+    for key, value in sorted(snapshot.items()):
+        if key.startswith("log_sink.sampled_out|"):
+            lines.append(f"pluto_log_entries_sampled_out_total{_labels({'sink': key.split('|', 1)[1]})} {int(value)}")
+
+    # Rate limiter
+    limiter = get_rate_limiter().get_stats(snapshot)
+    _scalar(lines, "pluto_rate_limit_tracked_identifiers", "gauge", "Identifiers with requests in the window", limiter["tracked_identifiers"])
+    _scalar(lines, "pluto_rate_limit_checks_total", "counter", "Rate limit checks", limiter["checks"])
+    _header(lines, "pluto_rate_limit_rejections_total", "counter", "Requests rejected by the rate limiter")
+    lines.append(f'pluto_rate_limit_rejections_total{{user="authenticated"}} {limiter["rejections_authenticated"]}')
+    lines.append(f'pluto_rate_limit_rejections_total{{user="anonymous"}} {limiter["rejections_anonymous"]}')
+
+    # Auth
+    _scalar(lines, "pluto_auth_jwt_cache_hits_total", "counter", "Session tokens served from the verified-JWT cache", int(snapshot.get("auth.jwt_cache_hits", 0)))
+    _scalar(lines, "pluto_auth_jwt_cache_misses_total", "counter", "Session tokens that needed full JWT verification", int(snapshot.get("auth.jwt_cache_misses", 0)))
+
+    _scalar(lines, "pluto_auth_user_cache_hits_total", "counter", "Authenticated requests served without a User SELECT", int(snapshot.get("auth.user_cache_hits", 0)))
+    _scalar(lines, "pluto_auth_user_cache_misses_total", "counter", "Authenticated requests that loaded the User row", int(snapshot.get("auth.user_cache_misses", 0)))
+
+    _scalar(lines, "pluto_db_sessions_requested_total", "counter", "Requests that were handed a lazy DB session", int(snapshot.get("db.sessions_requested", 0)))
+    _scalar(lines, "pluto_db_sessions_opened_total", "counter", "Lazy DB sessions that were actually opened", int(snapshot.get("db.sessions_opened", 0)))
+
+    pool = get_pool_stats()
+    if "size" in pool:
+        _scalar(lines, "pluto_db_pool_size", "gauge", "Configured DB pool size", pool["size"])
+        _scalar(lines, "pluto_db_pool_checked_out", "gauge", "DB connections currently in use", pool["checked_out"])
+        _scalar(lines, "pluto_db_pool_checked_in", "gauge", "Idle DB connections in the pool", pool["checked_in"])
+        _scalar(lines, "pluto_db_pool_overflow", "gauge", "DB connections open beyond pool size", pool["overflow"])
+
+    events = get_event_writer().get_stats(snapshot)
+    _scalar(lines, "pluto_triage_events_enqueued_total", "counter", "TriageEvents handed to the write-behind queue", events["enqueued"])
+    _scalar(lines, "pluto_triage_events_inserted_total", "counter", "TriageEvents inserted by the write-behind worker", events["inserted"])
+    _scalar(lines, "pluto_triage_event_batches_total", "counter", "Write-behind INSERT transactions", events["batches"])
+    _scalar(lines, "pluto_triage_event_retries_total", "counter", "Write-behind batches deferred by transient DB errors", events["retries"])
+    _scalar(lines, "pluto_triage_events_rejected_total", "counter", "TriageEvents the database refused", events["rejected"])
+    _scalar(lines, "pluto_triage_events_written_inline_total", "counter", "TriageEvents written inline because they could not be journaled", events["fallbacks"])
+    _scalar(lines, "pluto_triage_event_queue_depth", "gauge", "TriageEvents waiting for the write-behind worker", events["queue_depth"])
+
+    jobs = get_job_queue().get_stats(snapshot)
+    for field, help_text in (("enqueued", "Background jobs enqueued by kind"),
+                             ("succeeded", "Background jobs completed by kind"),
+                             ("retried", "Background job attempts that failed and were rescheduled"),
+                             ("dead", "Background jobs dead-lettered after their last attempt")):
+        metric = f"pluto_jobs_{field}_total"
+        _header(lines, metric, "counter", help_text)
+        for kind, counts in sorted(jobs["kinds"].items()):
+            lines.append(f"{metric}{_labels({'kind': kind})} {counts[field]}")
+    _header(lines, "pluto_jobs", "gauge", "Background jobs in the local store by status")
+    for status, count in sorted(jobs["depth"].items()):
+        lines.append(f"pluto_jobs{_labels({'status': status})} {count}")
+
+    _header(lines, "pluto_triage_steps_total", "counter",
+            "Post-reasoning triage steps by outcome (ok, failed, timeout, detached, skipped)")
+    for step, outcomes in sorted(get_fanout_stats(snapshot).items()):
+        for outcome, count in outcomes.items():
+            lines.append(f"pluto_triage_steps_total{_labels({'step': step, 'outcome': outcome})} {count}")
+
+    # Reasoning engine
+    engine_stats = get_reasoning_engine().get_stats(snapshot)
+    _scalar(lines, "pluto_engine_calls_total", "counter", "Reasoning engine calls", engine_stats["calls"])
+    _scalar(lines, "pluto_engine_unknown_complaints_total", "counter", "Inputs not matched to any protocol", engine_stats["unknown_complaints"])
+    _scalar(lines, "pluto_engine_safety_overrides_total", "counter", "Urgency set by a safety override rule", engine_stats["safety_overrides"])
+
+    # LLM client
+    llm_stats = get_llm_stats(snapshot)
+    _header(lines, "pluto_llm_calls_total", "counter", "LLM calls by purpose")
+    for purpose, counts in sorted(llm_stats.items()):
+        lines.append(f"pluto_llm_calls_total{_labels({'purpose': purpose})} {counts['calls']}")
+    _header(lines, "pluto_llm_failures_total", "counter", "Failed LLM calls by purpose")
+    for purpose, counts in sorted(llm_stats.items()):
+        lines.append(f"pluto_llm_failures_total{_labels({'purpose': purpose})} {counts['failures']}")
+    for field, metric, help_text in (
+        ("rejected", "pluto_llm_rejected_total", "LLM calls refused by the open circuit breaker"),
+        ("hedged", "pluto_llm_hedged_total", "Duplicate (hedged) LLM requests sent"),
+        ("hedge_wins", "pluto_llm_hedge_wins_total", "Hedged requests that answered first"),
+    ):
+        _header(lines, metric, "counter", help_text)
+        for purpose, counts in sorted(llm_stats.items()):
+            lines.append(f"{metric}{_labels({'purpose': purpose})} {counts[field]}")
+    breaker = get_llm_pool().breaker.get_stats()
+    _scalar(lines, "pluto_llm_circuit_state", "gauge",
+            "LLM circuit breaker state in this worker (0 closed, 1 half-open, 2 open)", STATE_VALUES[breaker["state"]])
+    _scalar(lines, "pluto_llm_circuit_opened_total", "counter", "Times the LLM circuit breaker opened",
+            int(snapshot.get("breaker.opened|llm", 0)))
+    _scalar(lines, "pluto_llm_throttled_total", "counter",
+            "LLM calls that waited for a concurrency slot", int(snapshot.get("llm_pool.throttled", 0)))
+    _header(lines, "pluto_llm_streams_cancelled_total", "counter", "Streaming LLM calls closed early because the client went away")
+    for key, value in sorted(snapshot.items()):
+        if key.startswith("llm_pool.cancelled|"):
+            lines.append(f"pluto_llm_streams_cancelled_total{_labels({'purpose': key.split('|', 1)[1]})} {int(value)}")
+    cache_stats = get_response_cache().get_stats(snapshot)
+    for field, metric, kind, help_text in (
+        ("hits", "pluto_llm_cache_hits_total", "counter", "LLM calls answered from the response cache"),
+        ("misses", "pluto_llm_cache_misses_total", "counter", "Response cache lookups that went to the LLM"),
+        ("saved_ms", "pluto_llm_cache_saved_seconds_total", "counter", "LLM latency avoided by cache hits"),
+    ):
+        _header(lines, metric, kind, help_text)
+        for purpose, counts in sorted(cache_stats.items()):
+            value = counts[field] / 1000 if field == "saved_ms" else counts[field]
+            lines.append(f"{metric}{_labels({'purpose': purpose})} {value}")
+
+    for key, metric, help_text in (
+        ("chat.prompts", "pluto_chat_prompts_total", "Chat prompts built for the LLM"),
+        ("chat.prompt_tokens", "pluto_chat_prompt_tokens_total", "Estimated prompt tokens sent by /api/chat"),
+        ("chat.prompt_tokens_saved", "pluto_chat_prompt_tokens_saved_total", "Estimated prompt tokens removed by context compaction"),
+        ("chat.turns_summarized", "pluto_chat_turns_summarized_total", "Chat turns replaced by the engine's findings instead of being sent"),
+    ):
+        _scalar(lines, metric, "counter", help_text, int(snapshot.get(key, 0)))
+
+    # Latency histograms
+    by_family: Dict[str, List[Tuple[str, LatencyHistogram]]] = {}
+    for (family, name), hist in logger.latency.series(snapshot).items():
+        by_family.setdefault(family, []).append((name, hist))
+    for family, (metric, label, help_text) in LATENCY_FAMILIES.items():
+        _header(lines, metric, "histogram", help_text)
+        _histogram(lines, metric, label, sorted(by_family.get(family, []), key=lambda s: s[0]))
+
+    return "\n".join(lines) + "\n"
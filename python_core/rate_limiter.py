@@ -3,10 +3,12 @@ Simple in-memory rate limiter for Pluto Health API endpoints
 Protects against abuse and cost overruns
 """
 import time
-from typing import Dict, List
+from typing import Dict, List, Optional
 from collections import defaultdict
 from fastapi import HTTPException
 
+from .shared_metrics import get_metrics_store
+
 class RateLimiter:
     """
     In-memory rate limiter with per-user and per-IP tracking
@@ -25,6 +27,9 @@ class RateLimiter:
         # Cleanup interval (remove old data)
         self.last_cleanup = time.time()
         self.CLEANUP_INTERVAL = 600  # 10 minutes
+        
+        # Counters for metrics export (shared across workers when configured)
+        self._store = get_metrics_store()
     
     def check_limit(self, identifier: str, is_authenticated: bool = False) -> None:
         """
@@ -38,6 +43,7 @@ class RateLimiter:
             HTTPException(429): If rate limit exceeded
         """
         now = time.time()
+        self._store.inc("rate_limiter.checks")
         
         # Periodic cleanup of old data
         if now - self.last_cleanup > self.CLEANUP_INTERVAL:
@@ -55,6 +61,10 @@ class RateLimiter:
         
         # Check if limit exceeded
         if len(request_times) >= limit:
+            self._store.inc(
+                "rate_limiter.rejections_authenticated" if is_authenticated
+                else "rate_limiter.rejections_anonymous"
+            )
             wait_time = int(self.WINDOW - (now - request_times[0]))
             raise HTTPException(
                 status_code=429,
@@ -69,6 +79,7 @@ class RateLimiter:
         
         # Add this request to history
         request_times.append(now)
+        self._store.set("rate_limiter.tracked_identifiers", len(self.requests))
     
     def _cleanup_old_requests(self, now: float) -> None:
         """Remove expired request records to prevent memory bloat"""
@@ -82,6 +93,7 @@ class RateLimiter:
                 del self.requests[identifier]
         
         self.last_cleanup = now
+        self._store.set("rate_limiter.tracked_identifiers", len(self.requests))
     
     def get_remaining(self, identifier: str, is_authenticated: bool = False) -> int:
         """Get remaining requests for this identifier"""
@@ -90,6 +102,15 @@ class RateLimiter:
         request_times = [t for t in self.requests.get(identifier, []) if now - t < self.WINDOW]
         return max(0, limit - len(request_times))
     
+    def get_stats(self, snapshot: Optional[Dict[str, float]] = None) -> Dict[str, int]:
+        """Get counters and the number of currently tracked identifiers (all workers)"""
+        snapshot = snapshot if snapshot is not None else self._store.snapshot()
+        return {
+            name: int(snapshot.get(f"rate_limiter.{name}", 0))
+            for name in ("checks", "rejections_authenticated", "rejections_anonymous",
+                         "tracked_identifiers")
+        }
+    
     def reset(self, identifier: str) -> None:
         """Reset rate limit for a specific identifier (admin use)"""
         if identifier in self.requests:
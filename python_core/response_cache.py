@@ -0,0 +1,191 @@
+"""
+Shared cache for LLM responses that depend only on structured clinical context
+Backed by a local SQLite file so every worker on the host shares hits
+"""
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from pathlib import Path
+from typing import Dict, Any, Optional
+
+from .local_store import connect_local_db
+from .shared_metrics import get_metrics_store
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS llm_cache (
+    key TEXT PRIMARY KEY,
+    purpose TEXT NOT NULL,
+    value TEXT NOT NULL,
+    latency_ms REAL NOT NULL,
+    created_at REAL NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS llm_cache_created_at_idx ON llm_cache (created_at);
+"""
+
+
+def _canonical(value: Any) -> Any:
+    """Normalize text and list order so equivalent contexts hash the same"""
+    if isinstance(value, str):
+        return " ".join(unicodedata.normalize("NFKC", value).split())
+    if isinstance(value, (list, tuple, set)):
+        return sorted((_canonical(v) for v in value), key=lambda v: json.dumps(v, sort_keys=True))
+    if isinstance(value, dict):
+        return {str(k): _canonical(v) for k, v in value.items()}
+    return value
+
+
+def cache_key(purpose: str, model: str, prompt_version: str, context: Dict[str, Any]) -> str:
+    """Hash of the structured prompt input plus everything that changes the output"""
+    raw = json.dumps([purpose, model, prompt_version, _canonical(context)],
+                     sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    TTL- and size-bounded response cache in a local SQLite file
+
+    Lookups are a read-only primary-key SELECT (hits are counted in the
+    metrics store, never written back), run in a thread so a busy SQLite
+    file can't stall the event loop. A stored entry remembers how long the
+    LLM call that produced it took, so each hit adds that to the saved
+    latency counter. Expired rows and rows beyond max_entries (oldest
+    first) are pruned every `prune_every` writes.
+    """
+
+    def __init__(self, path: Optional[Path] = Path("logs/llm_cache.db"), ttl: float = 86400.0,
+                 max_entries: int = 5000, prune_every: int = 100, enabled: bool = True):
+        self.path = Path(path) if path is not None else None
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.prune_every = prune_every
+        self.enabled = enabled and self.path is not None
+
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+        self._writes = 0
+        self._store = get_metrics_store()
+
+    @classmethod
+    def from_env(cls) -> "ResponseCache":
+        """Build from PLUTO_LLM_CACHE_* variables (TTL in seconds, 0 disables)"""
+        default_path = "/tmp/pluto-llm-cache.db" if os.getenv("VERCEL") else "logs/llm_cache.db"
+        ttl = float(os.getenv("PLUTO_LLM_CACHE_TTL", "86400"))
+        return cls(
+            path=Path(os.getenv("PLUTO_LLM_CACHE_DB", default_path)),
+            ttl=ttl,
+            max_entries=int(os.getenv("PLUTO_LLM_CACHE_SIZE", "5000")),
+            enabled=ttl > 0,
+        )
+
+    def _connect(self) -> Optional[sqlite3.Connection]:
+        if self._conn is not None and self._pid == os.getpid():
+            return self._conn
+        try:
+            conn = connect_local_db(self.path, _SCHEMA, timeout=1.0)
+        except (OSError, sqlite3.Error) as e:
+            print(f"LLM Cache Error: store unavailable at {self.path} ({e}) - caching disabled")
+            self.enabled = False
+            return None
+        self._conn = conn
+        self._pid = os.getpid()
+        return conn
+
+    async def get(self, key: str, purpose: str) -> Optional[str]:
+        """Cached response or None; counts the hit/miss under `purpose`"""
+        if not self.enabled:
+            return None
+        return await asyncio.to_thread(self._get, key, purpose)
+
+    async def put(self, key: str, purpose: str, value: str, latency_ms: float) -> None:
+        if not self.enabled or not value:
+            return
+        await asyncio.to_thread(self._put, key, purpose, value, latency_ms)
+
+    def _get(self, key: str, purpose: str) -> Optional[str]:
+        row = None
+        try:
+            with self._lock:
+                conn = self._connect()
+                if conn is not None:
+                    row = conn.execute(
+                        "SELECT value, latency_ms FROM llm_cache WHERE key = ? AND expires_at > ?",
+                        (key, time.time()),
+                    ).fetchone()
+        except sqlite3.Error as e:
+            print(f"LLM Cache Error: {e}")
+            row = None
+
+        if row is None:
+            self._store.inc(f"llm_cache.misses|{purpose}")
+            return None
+        self._store.inc(f"llm_cache.hits|{purpose}")
+        self._store.inc(f"llm_cache.saved_ms|{purpose}", row[1])
+        return row[0]
+
+    def _put(self, key: str, purpose: str, value: str, latency_ms: float) -> None:
+        now = time.time()
+        try:
+            with self._lock:
+                conn = self._connect()
+                if conn is None:
+                    return
+                conn.execute(
+                    "INSERT OR REPLACE INTO llm_cache (key, purpose, value, latency_ms, created_at, expires_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, purpose, value, latency_ms, now, now + self.ttl),
+                )
+                self._writes += 1
+                if self._writes % self.prune_every == 0:
+                    self._prune(conn, now)
+        except sqlite3.Error as e:
+            print(f"LLM Cache Error: {e}")
+
+    def _prune(self, conn: sqlite3.Connection, now: float) -> None:
+        conn.execute("DELETE FROM llm_cache WHERE expires_at <= ?", (now,))
+        conn.execute(
+            "DELETE FROM llm_cache WHERE key IN "
+            "(SELECT key FROM llm_cache ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+
+    def clear(self) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            conn = self._connect()
+            if conn is not None:
+                conn.execute("DELETE FROM llm_cache")
+
+    def get_stats(self, snapshot: Optional[Dict[str, float]] = None) -> Dict[str, Dict[str, float]]:
+        """Hits, misses, hit rate and saved LLM latency by purpose"""
+        snapshot = snapshot if snapshot is not None else self._store.snapshot()
+        stats: Dict[str, Dict[str, float]] = {}
+        for key, value in snapshot.items():
+            if key.startswith("llm_cache."):
+                field, purpose = key[len("llm_cache."):].split("|", 1)
+                stats.setdefault(purpose, {"hits": 0, "misses": 0, "saved_ms": 0.0})[field] = value
+        for counts in stats.values():
+            counts["hits"], counts["misses"] = int(counts["hits"]), int(counts["misses"])
+            lookups = counts["hits"] + counts["misses"]
+            counts["hit_rate"] = round(counts["hits"] / lookups, 4) if lookups else 0.0
+            counts["saved_ms"] = round(counts["saved_ms"], 1)
+        return stats
+
+
+# Global instance
+_response_cache: Optional[ResponseCache] = None
+
+def get_response_cache() -> ResponseCache:
+    """Get global LLM response cache"""
+    global _response_cache
+    if _response_cache is None:
+        _response_cache = ResponseCache.from_env()
+    return _response_cache
@@ -0,0 +1,318 @@
+"""
+Multi-process metrics store for Pluto Health
+Each worker writes its own mmap'd file; readers merge all files on demand
+"""
+import mmap
+import os
+import struct
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows dev machines: dead worker files are just never pruned
+    fcntl = None
+
+# Merge semantics across workers
+KIND_COUNTER = 0  # Summed over every worker file (including exited workers, via the archive)
+KIND_GAUGE = 1    # Summed over live workers only
+KIND_MAX = 2      # Maximum over every worker file
+
+# File layout: 8-byte header holding the number of used bytes, followed by
+# entries of [key_len:u32][kind:u8][pad:3][key bytes, padded to 8][value:f64].
+# New entries are fully written before the header is bumped, so readers never
+# see a partial entry; values are 8-byte aligned doubles updated in place.
+_HEADER = struct.Struct("<Q")
+_ENTRY = struct.Struct("<IB3x")
+_VALUE = struct.Struct("<d")
+_INITIAL_SIZE = 64 * 1024
+
+
+def _padded(n: int) -> int:
+    return (n + 7) & ~7
+
+
+class LocalMetricsStore:
+    """Plain in-process store (single worker, serverless, tests)"""
+
+    shared = False
+
+    def __init__(self):
+        self._values: Dict[str, float] = {}
+        self._kinds: Dict[str, int] = {}
+        self._lock = threading.Lock()  # Writers run on several threads
+
+    def inc(self, name: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[name] = self._values.get(name, 0.0) + amount
+
+    def set(self, name: str, value: float) -> None:
+        self._values[name] = value
+        self._kinds[name] = KIND_GAUGE
+
+    def max(self, name: str, value: float) -> None:
+        with self._lock:
+            if value > self._values.get(name, float("-inf")):
+                self._values[name] = value
+            self._kinds[name] = KIND_MAX
+
+    def snapshot(self) -> Dict[str, float]:
+        return dict(self._values)
+
+    def counter(self, name: str) -> float:
+        return self._values.get(name, 0.0)
+
+
+class MmapMetricsStore:
+    """
+    Per-process mmap'd metric files in a shared directory
+
+    Writers never take a cross-process lock: a process only ever writes its
+    own file. inc() and max() are read-modify-writes, so they hold a
+    per-process lock (the log, event and job threads all count); it is held
+    for one unpack/pack and is almost always uncontended.
+
+    Files of exited workers are pruned by readers: their counters and maxima
+    are folded into archive.metrics and the file is deleted, so totals stay
+    monotonic while the directory doesn't grow with every restart. Readers
+    hold a shared flock on .lock while reading and the fold holds it
+    exclusively, so no reader sees a value in both places or in neither.
+    """
+
+    ARCHIVE = "archive.metrics"
+
+    shared = True
+
+    def __init__(self, directory: str):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()  # Appending new keys and (re)opening
+        self._write_lock = threading.Lock()  # Read-modify-write of values
+        self._pid: Optional[int] = None
+        self._offsets: Dict[str, int] = {}
+        self._mm: Optional[mmap.mmap] = None
+        self._file = None
+        self._used = _HEADER.size
+
+    def _path_for(self, pid: int) -> Path:
+        return self.directory / f"worker_{pid}.metrics"
+
+    def _open(self) -> None:
+        """(Re)initialize this process's file - also runs after a fork"""
+        pid = os.getpid()
+        if self._file is not None:
+            try:
+                self._mm.close()
+                self._file.close()
+            except (OSError, ValueError):
+                pass
+
+        # A recycled pid (common in containers) may find a file left by an
+        # exited worker that no reader has folded yet: keep its counters
+        path = self._path_for(pid)
+        if fcntl is not None and path.exists():
+            self._fold([path], skip_live=False, blocking=True)
+        self._file = open(path, "w+b")
+        self._file.truncate(_INITIAL_SIZE)
+        self._mm = mmap.mmap(self._file.fileno(), _INITIAL_SIZE)
+        self._used = _HEADER.size
+        _HEADER.pack_into(self._mm, 0, self._used)
+        self._offsets = {}
+        self._pid = pid
+
+    def _value_offset(self, name: str, kind: int) -> int:
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._open()
+
+        offset = self._offsets.get(name)
+        if offset is not None:
+            return offset
+
+        with self._lock:
+            offset = self._offsets.get(name)
+            if offset is not None:
+                return offset
+
+            key = name.encode("utf-8")
+            entry_size = _ENTRY.size + _padded(len(key)) + _VALUE.size
+            if self._used + entry_size > len(self._mm):
+                new_size = max(len(self._mm) * 2, self._used + entry_size)
+                with self._write_lock:  # No value update mid-resize
+                    self._file.truncate(new_size)
+                    self._mm.resize(new_size)
+
+            start = self._used
+            _ENTRY.pack_into(self._mm, start, len(key), kind)
+            self._mm[start + _ENTRY.size:start + _ENTRY.size + len(key)] = key
+            offset = start + _ENTRY.size + _padded(len(key))
+            _VALUE.pack_into(self._mm, offset, float("-inf") if kind == KIND_MAX else 0.0)
+
+            self._used = start + entry_size
+            _HEADER.pack_into(self._mm, 0, self._used)
+            self._offsets[name] = offset
+            return offset
+
+    def inc(self, name: str, amount: float = 1.0) -> None:
+        offset = self._value_offset(name, KIND_COUNTER)
+        with self._write_lock:
+            _VALUE.pack_into(self._mm, offset, _VALUE.unpack_from(self._mm, offset)[0] + amount)
+
+    def set(self, name: str, value: float) -> None:
+        offset = self._value_offset(name, KIND_GAUGE)
+        _VALUE.pack_into(self._mm, offset, value)
+
+    def max(self, name: str, value: float) -> None:
+        offset = self._value_offset(name, KIND_MAX)
+        with self._write_lock:
+            if value > _VALUE.unpack_from(self._mm, offset)[0]:
+                _VALUE.pack_into(self._mm, offset, value)
+
+    @staticmethod
+    def _read_file(path: Path) -> Dict[str, Tuple[int, float]]:
+        with open(path, "rb") as f:
+            data = f.read()
+        if len(data) < _HEADER.size:
+            return {}
+
+        used = min(_HEADER.unpack_from(data, 0)[0], len(data))
+        entries = {}
+        pos = _HEADER.size
+        while pos + _ENTRY.size <= used:
+            key_len, kind = _ENTRY.unpack_from(data, pos)
+            key_start = pos + _ENTRY.size
+            offset = key_start + _padded(key_len)
+            if offset + _VALUE.size > used:
+                break
+            key = data[key_start:key_start + key_len].decode("utf-8")
+            entries[key] = (kind, _VALUE.unpack_from(data, offset)[0])
+            pos = offset + _VALUE.size
+        return entries
+
+    @staticmethod
+    def _write_file(path: Path, entries: Dict[str, Tuple[int, float]]) -> None:
+        """Write entries in the worker file layout, atomically"""
+        body = bytearray()
+        for key, (kind, value) in entries.items():
+            raw = key.encode("utf-8")
+            body += _ENTRY.pack(len(raw), kind) + raw.ljust(_padded(len(raw)), b"\0") + _VALUE.pack(value)
+        tmp_path = path.with_name(path.name + ".tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(_HEADER.pack(_HEADER.size + len(body)) + body)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def _is_alive(pid: int) -> bool:
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            return True
+        return True
+
+    @staticmethod
+    def _merge_into(merged: Dict[str, float], entries: Dict[str, Tuple[int, float]], alive: bool) -> None:
+        for key, (kind, value) in entries.items():
+            if kind == KIND_MAX:
+                if value > merged.get(key, float("-inf")):
+                    merged[key] = value
+            elif kind == KIND_COUNTER or alive:
+                merged[key] = merged.get(key, 0.0) + value
+
+    def _flock(self, operation: int):
+        """Open and flock the directory lock file; None if it would block"""
+        lock_file = open(self.directory / ".lock", "a+b")
+        try:
+            fcntl.flock(lock_file, operation)
+        except OSError:
+            lock_file.close()
+            return None
+        return lock_file
+
+    def _read_all(self) -> Tuple[Dict[str, float], List[Path]]:
+        """Merged values plus the files of exited workers"""
+        merged: Dict[str, float] = {}
+        dead: List[Path] = []
+        archive = self.directory / self.ARCHIVE
+        try:
+            self._merge_into(merged, self._read_file(archive), alive=False)
+        except (OSError, ValueError):
+            pass  # No worker has exited yet
+        for path in self.directory.glob("worker_*.metrics"):
+            try:
+                pid = int(path.stem.split("_", 1)[1])
+                entries = self._read_file(path)
+            except (OSError, ValueError):
+                continue
+            alive = self._is_alive(pid)
+            if not alive:
+                dead.append(path)
+            self._merge_into(merged, entries, alive)
+        return merged, dead
+
+    def _fold(self, paths: List[Path], skip_live: bool = True, blocking: bool = False) -> None:
+        """Move worker files' counters and maxima into the archive and delete the files"""
+        lock_file = self._flock(fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+        if lock_file is None:
+            return  # Someone is reading or folding; a later snapshot retries
+        try:
+            archive = self.directory / self.ARCHIVE
+            entries = self._read_file(archive) if archive.exists() else {}
+            folded = []
+            for path in paths:
+                if not path.exists() or (skip_live and self._is_alive(int(path.stem.split("_", 1)[1]))):
+                    continue  # Folded by another reader, or the pid was reused
+                for key, (kind, value) in self._read_file(path).items():
+                    if kind == KIND_GAUGE:
+                        continue
+                    previous = entries.get(key, (kind, float("-inf") if kind == KIND_MAX else 0.0))[1]
+                    entries[key] = (kind, max(previous, value) if kind == KIND_MAX else previous + value)
+                folded.append(path)
+            if folded:
+                self._write_file(archive, entries)
+                for path in folded:
+                    path.unlink()
+        except (OSError, ValueError) as e:
+            print(f"Metrics Prune Error ({self.directory}): {e}")
+        finally:
+            lock_file.close()
+
+    def snapshot(self) -> Dict[str, float]:
+        """Merge every worker file in the directory, pruning those of exited workers"""
+        if fcntl is None:
+            return self._read_all()[0]
+        lock_file = self._flock(fcntl.LOCK_SH)
+        try:
+            merged, dead = self._read_all()
+        finally:
+            if lock_file is not None:
+                lock_file.close()
+        if dead:
+            self._fold(dead)
+        return merged
+
+    def counter(self, name: str) -> float:
+        """One counter summed over every worker file (reads them all - don't call per request)"""
+        return self.snapshot().get(name, 0.0)
+
+
+def _create_store():
+    directory = os.getenv("PLUTO_METRICS_DIR")
+    if not directory:
+        return LocalMetricsStore()
+    try:
+        return MmapMetricsStore(directory)
+    except OSError as e:
+        print(f"Metrics Store Error ({directory}): {e} - falling back to per-process metrics")
+        return LocalMetricsStore()
+
+
+# Global instance
+_store = _create_store()
+
+def get_metrics_store():
+    """Get global metrics store (shared across workers when PLUTO_METRICS_DIR is set)"""
+    return _store
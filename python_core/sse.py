@@ -0,0 +1,10 @@
+"""
+Server-sent event framing shared by the streaming endpoints (/api/chat, /api/triage)
+"""
+import json
+from typing import Any
+
+
+def sse_event(event: str, data: Any) -> str:
+    """One `event:` / `data:` frame with a JSON payload"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
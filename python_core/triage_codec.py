@@ -0,0 +1,151 @@
+"""
+Compact storage encoding for TriageEvent.aiResult
+Stores only what the engine decided; everything derivable is rebuilt on read
+"""
+import json
+import os
+from pathlib import Path
+from typing import Dict, Any, Optional
+
+from .clinical_reasoning_engine import (
+    ClinicalReasoningEngine, ReasoningResult, UrgencyLevel,
+    ENGINE_VERSION, PROTOCOLS, PROTOCOL_HASH, PROTOCOL_VERSION, get_reasoning_engine,
+)
+
+ENCODING = "c1"
+
+# Archived protocol sets by hash, so events stay readable after protocols change
+SNAPSHOT_DIR = Path(os.getenv(
+    "PLUTO_PROTOCOL_SNAPSHOT_DIR",
+    os.path.join(os.path.dirname(__file__), "protocol_snapshots")
+))
+
+_engines: Dict[str, ClinicalReasoningEngine] = {}
+
+
+def engine_version() -> str:
+    """Engine release plus the protocol set it ran with, e.g. 4.0.0+p4.0.0.1a2b3c4d"""
+    return f"{ENGINE_VERSION}+p{PROTOCOL_VERSION}.{PROTOCOL_HASH[:8]}"
+
+
+def logic_snapshot() -> Dict[str, str]:
+    """Value for TriageEvent.logicSnapshot - identifies how aiResult can be decoded"""
+    return {
+        "encoding": ENCODING,
+        "engine_version": ENGINE_VERSION,
+        "protocol_version": PROTOCOL_VERSION,
+        "protocol_hash": PROTOCOL_HASH,
+    }
+
+
+def encode_result(result: ReasoningResult, engine_urgency: Optional[UrgencyLevel] = None,
+                  engine_rationale: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Compact aiResult: matched protocols, present flags with their evidence
+    and the urgency decision. Pass engine_urgency/engine_rationale when the
+    caller changed the result after reason() (e.g. the crisis override).
+
+    The fields the Next.js pages read straight from the row (chief_complaint,
+    matched_protocols, urgency_level, clinical_summary) are kept under their
+    to_dict() names; only the flags and the engine decision are compacted.
+    """
+    engine_urgency = engine_urgency or result.urgency_level
+    engine_rationale = engine_rationale if engine_rationale is not None else result.urgency_rationale
+
+    compact: Dict[str, Any] = {
+        "enc": ENCODING,
+        "chief_complaint": result.chief_complaint,
+        "matched_protocols": result.matched_protocols,
+        "urgency_level": result.urgency_level.value,
+        "clinical_summary": result.clinical_summary,
+        "eu": engine_urgency.value,
+        "er": engine_rationale,
+    }
+
+    flags: Dict[str, list] = {}
+    for pid, matrix in result.criteria_matrix.items():
+        present = [["r", i, c.evidence] for i, c in enumerate(matrix.red_flags) if c.status is True]
+        present += [["g", i, c.evidence] for i, c in enumerate(matrix.green_flags) if c.status is True]
+        if present:
+            flags[pid] = present
+    if flags:
+        compact["f"] = flags
+    if result.is_safety_override:
+        compact["o"] = 1
+    if result.urgency_rationale != engine_rationale:
+        compact["ur"] = result.urgency_rationale
+    return compact
+
+
+def _engine_for(snapshot_hash: Optional[str]) -> Optional[ClinicalReasoningEngine]:
+    if not snapshot_hash or snapshot_hash == PROTOCOL_HASH:
+        return get_reasoning_engine()
+    engine = _engines.get(snapshot_hash)
+    if engine is None:
+        try:
+            with open(SNAPSHOT_DIR / f"{snapshot_hash}.json", "r") as f:
+                engine = ClinicalReasoningEngine(protocols=json.load(f))
+        except (OSError, ValueError):
+            return None
+        _engines[snapshot_hash] = engine
+    return engine
+
+
+def decode_result(ai_result: Dict[str, Any], snapshot: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Rebuild the full ReasoningResult.to_dict() view of a stored aiResult.
+    Rows written before the compact encoding are returned unchanged.
+    """
+    if not isinstance(ai_result, dict) or ai_result.get("enc") != ENCODING:
+        return ai_result
+
+    snapshot_hash = (snapshot or {}).get("protocol_hash")
+    engine = _engine_for(snapshot_hash)
+    missing_snapshot = engine is None
+    if missing_snapshot:
+        engine = get_reasoning_engine()  # Best effort with today's protocols
+
+    # "p", "cc" and "u" are the short names used by rows written before the
+    # display fields were kept readable
+    protocol_ids = ai_result.get("matched_protocols", ai_result.get("p")) or []
+    engine_urgency = UrgencyLevel(ai_result["eu"])
+
+    if not protocol_ids:
+        result = engine.unknown_result(ai_result.get("chief_complaint", ai_result.get("cc", "")))
+    else:
+        matrix = engine.build_criteria_matrix(protocol_ids)
+        for pid, present in ai_result.get("f", {}).items():
+            if pid not in matrix:
+                continue
+            for kind, index, evidence in present:
+                flags = matrix[pid].red_flags if kind == "r" else matrix[pid].green_flags
+                if index < len(flags):
+                    flags[index].status = True
+                    flags[index].evidence = evidence
+        result = engine.assemble_result(
+            protocol_ids, matrix, engine_urgency, ai_result.get("er", ""), bool(ai_result.get("o"))
+        )
+
+    # Changes the API applied on top of the engine decision
+    urgency = ai_result.get("urgency_level", ai_result.get("u"))
+    if urgency is not None:
+        result.urgency_level = UrgencyLevel(urgency)
+    if "ur" in ai_result:
+        result.urgency_rationale = ai_result["ur"]
+    if "clinical_summary" in ai_result:
+        result.clinical_summary = ai_result["clinical_summary"]
+
+    decoded = result.to_dict()
+    if missing_snapshot:
+        decoded["protocol_snapshot_missing"] = True
+    return decoded
+
+
+def archive_protocols(directory: Path = SNAPSHOT_DIR) -> Path:
+    """Write the current protocol set to the snapshot archive (idempotent)"""
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f"{PROTOCOL_HASH}.json"
+    if not path.exists():
+        with open(path, "w") as f:
+            json.dump(PROTOCOLS, f, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return path
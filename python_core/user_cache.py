@@ -0,0 +1,132 @@
+"""
+Per-process TTL cache of User rows for auth
+Removes the User SELECT from most authenticated requests
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from .models import User
+from .shared_metrics import get_metrics_store
+
+# Column fields of User (relationships are not cached)
+USER_FIELDS = tuple(User.model_fields)
+
+
+class UserCache:
+    """
+    user_id -> the User row's column values, valid for ttl seconds
+
+    Only users who have consented are cached: consent is the one field other
+    code flips (here and in the Next.js updateUserConsent action), so a user
+    who just consented is never served a stale 403. Missing users are not
+    cached either.
+
+    Hits are returned as new detached User objects with every column set, so
+    callers see the same fields as a fresh SELECT but must write with an
+    UPDATE statement and call invalidate(). invalidate() appends a byte to
+    generation_path (a file in the shared metrics dir); every worker on the
+    host stats it at most every sync_interval seconds and drops its whole
+    cache when the size moved, so a Python-side change is visible everywhere
+    within sync_interval. Changes this code never sees (user deletes and
+    edits from the Next.js admin) are visible after at most ttl seconds.
+    """
+
+    def __init__(self, ttl: float = 30, max_size: int = 10000, sync_interval: float = 1.0,
+                 generation_path: Optional[Path] = None, store=None):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.sync_interval = sync_interval
+        self.generation_path = Path(generation_path) if generation_path is not None else None
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._store = store or get_metrics_store()
+        self._generation: Optional[int] = None
+        self._synced_at = 0.0
+
+    def _sync(self) -> None:
+        """Drop everything if any worker invalidated a user since the last check (one stat call)"""
+        if self.generation_path is None:
+            return  # Single process: invalidate() already dropped the entry
+        now = time.monotonic()
+        if now - self._synced_at < self.sync_interval:
+            return
+        self._synced_at = now
+        try:
+            generation = os.stat(self.generation_path).st_size
+        except FileNotFoundError:
+            generation = 0
+        except OSError:
+            return
+        if generation != self._generation:
+            if self._generation is not None:
+                self.clear()
+            self._generation = generation
+
+    def get(self, user_id: str) -> Optional[User]:
+        self._sync()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and time.monotonic() > entry[0]:
+                del self._entries[user_id]
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(user_id)
+
+        if entry is None:
+            self._store.inc("auth.user_cache_misses")
+            return None
+
+        self._store.inc("auth.user_cache_hits")
+        return User(**entry[1])
+
+    def put(self, user: User) -> None:
+        if self.ttl <= 0 or not user.has_consented:
+            return
+        fields = {name: getattr(user, name) for name in USER_FIELDS}
+        with self._lock:
+            self._entries[user.id] = (time.monotonic() + self.ttl, fields)
+            self._entries.move_to_end(user.id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: str) -> None:
+        """Forget a user after it was updated or deleted, in every worker"""
+        with self._lock:
+            self._entries.pop(user_id, None)
+        self._store.inc("auth.user_invalidations")
+        if self.generation_path is None:
+            return
+        try:
+            fd = os.open(self.generation_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, b"\n")  # O_APPEND: concurrent bumps never overwrite each other
+            finally:
+                os.close(fd)
+        except OSError as e:
+            print(f"User Cache Error ({self.generation_path}): {e} - other workers rely on the TTL")
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+def _generation_path() -> Optional[Path]:
+    directory = os.getenv("PLUTO_METRICS_DIR")
+    return Path(directory) / "user_invalidations" if directory else None
+
+
+# Global instance
+_user_cache = UserCache(
+    ttl=float(os.getenv("PLUTO_USER_CACHE_TTL", "30")),
+    max_size=int(os.getenv("PLUTO_USER_CACHE_SIZE", "10000")),
+    sync_interval=float(os.getenv("PLUTO_USER_CACHE_SYNC_MS", "1000")) / 1000,
+    generation_path=_generation_path(),
+)
+
+def get_user_cache() -> UserCache:
+    """Get global user cache"""
+    return _user_cache
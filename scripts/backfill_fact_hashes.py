@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Pluto MedicalFact Backfill
+==========================
+Hashes MedicalFact rows written before deduplication and merges duplicates
+into the oldest row (seenCount = number of merged rows, lastSeen = newest).
+
+Run once after `npx prisma db push` adds the factHash/lastSeen/seenCount
+columns:
+    DATABASE_URL=postgresql://... python scripts/backfill_fact_hashes.py [--dry-run]
+"""
+
+import argparse
+import os
+import sys
+from typing import Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlmodel import Session, select
+from python_core.models import MedicalFact, get_engine
+from python_core.fact_store import fact_hash
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    engine = get_engine()
+    if engine is None:
+        print("DATABASE_URL is not set")
+        sys.exit(1)
+
+    with Session(engine) as db:
+        facts = db.exec(select(MedicalFact).order_by(MedicalFact.createdAt)).all()
+
+        groups: Dict[str, List[MedicalFact]] = {}
+        for fact in facts:
+            groups.setdefault(fact_hash(fact.userId, fact.type, fact.value), []).append(fact)
+
+        hashed = merged = 0
+        for digest, rows in groups.items():
+            keeper, duplicates = rows[0], rows[1:]
+            if keeper.factHash == digest and not duplicates:
+                continue
+            keeper.factHash = digest
+            keeper.seenCount = sum(row.seenCount or 1 for row in rows)
+            keeper.lastSeen = max(row.lastSeen or row.createdAt for row in rows)
+            db.add(keeper)
+            for row in duplicates:
+                db.delete(row)
+            hashed += 1
+            merged += len(duplicates)
+
+        print(f"{len(facts)} facts, {hashed} updated, {merged} duplicates merged")
+        if args.dry_run:
+            db.rollback()
+            print("Dry run - nothing written")
+        else:
+            db.commit()
+
+
+if __name__ == "__main__":
+    main()
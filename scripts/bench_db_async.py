@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Pluto Async DB Benchmark
+========================
+Compares per-worker throughput of the /api/memory query when an async
+handler uses a blocking SQLModel Session (the old routers) versus the
+AsyncSession layer the routers use now.
+
+Usage:
+    python scripts/bench_db_async.py --concurrency 50 --requests 10
+    DATABASE_URL=postgresql://... python scripts/bench_db_async.py
+
+Without DATABASE_URL a temporary SQLite file is seeded with --facts rows.
+Against a real Postgres, point it at a database that already has data.
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from typing import Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlmodel import SQLModel, Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from python_core.models import MedicalFact, User, get_engine, get_async_engine
+
+USER_ID = "bench_user"
+
+
+def seed(facts: int) -> None:
+    engine = get_engine()
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as db:
+        db.add(User(id=USER_ID, email="bench@example.com"))
+        for i in range(facts):
+            db.add(MedicalFact(id=f"fact_{i}", userId=USER_ID, type="Condition",
+                               value=f"condition {i}", source="Benchmark"))
+        db.commit()
+    engine.dispose()
+
+
+async def run_blocking(concurrency: int, requests: int) -> float:
+    engine = get_engine()
+
+    async def handler():
+        for _ in range(requests):
+            with Session(engine) as db:
+                db.exec(select(MedicalFact).where(MedicalFact.userId == USER_ID)).all()
+            await asyncio.sleep(0)  # Rest of the handler
+
+    start = time.perf_counter()
+    await asyncio.gather(*(handler() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    engine.dispose()
+    return elapsed
+
+
+async def run_async(concurrency: int, requests: int) -> float:
+    engine = get_async_engine()
+
+    async def handler():
+        for _ in range(requests):
+            async with AsyncSession(engine) as db:
+                (await db.exec(select(MedicalFact).where(MedicalFact.userId == USER_ID))).all()
+            await asyncio.sleep(0)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(handler() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    await engine.dispose()
+    return elapsed
+
+
+async def probe_loop_lag(runner, concurrency: int, requests: int) -> Tuple[float, float]:
+    """Worst event loop stall while the load runs (what other requests feel)"""
+    worst = 0.0
+    done = False
+
+    async def ticker():
+        nonlocal worst
+        while not done:
+            start = time.perf_counter()
+            await asyncio.sleep(0.001)
+            worst = max(worst, (time.perf_counter() - start) * 1000 - 1)
+
+    tick = asyncio.create_task(ticker())
+    elapsed = await runner(concurrency, requests)
+    done = True
+    await tick
+    return elapsed, worst
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=10, help="queries per concurrent client")
+    parser.add_argument("--facts", type=int, default=200, help="rows to seed (SQLite only)")
+    args = parser.parse_args()
+
+    if not os.getenv("DATABASE_URL"):
+        path = os.path.join(tempfile.mkdtemp(), "bench.db")
+        os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+        seed(args.facts)
+
+    total = args.concurrency * args.requests
+    print(f"{args.concurrency} concurrent clients x {args.requests} queries\n")
+    for name, runner in (("blocking", run_blocking), ("async", run_async)):
+        elapsed, lag = asyncio.run(probe_loop_lag(runner, args.concurrency, args.requests))
+        print(f"{name:10} {total / elapsed:8.1f} req/s   worst loop stall {lag:8.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Pluto DB Pool Benchmark
+=======================
+Measures connection checkout wait under concurrency for each pool mode.
+
+Usage:
+    DATABASE_URL=postgresql://... python scripts/bench_db_pool.py
+    python scripts/bench_db_pool.py --threads 32 --requests 20 --hold-ms 20
+
+Without DATABASE_URL a temporary SQLite file is used, which is only good for
+comparing pool overhead (connects are nearly free).
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from typing import List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+from python_core.latency import LatencyHistogram
+from python_core.models import get_engine
+
+
+def run(mode: str, threads: int, requests: int, hold_ms: float) -> None:
+    os.environ["PLUTO_DB_POOL"] = mode
+    engine = get_engine()
+    if engine is None:
+        print(f"{mode:10} could not create engine (check DATABASE_URL)")
+        return
+
+    waits = LatencyHistogram()
+    lock = threading.Lock()
+    errors: List[Exception] = []
+
+    def worker():
+        for _ in range(requests):
+            start = time.perf_counter()
+            try:
+                with engine.connect() as conn:
+                    waited = (time.perf_counter() - start) * 1000
+                    conn.execute(text("SELECT 1"))
+                    time.sleep(hold_ms / 1000)  # Simulate query + handler time
+            except Exception as e:
+                errors.append(e)
+                continue
+            with lock:
+                waits.record(waited)
+
+    started = time.perf_counter()
+    pool = [threading.Thread(target=worker) for _ in range(threads)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    elapsed = time.perf_counter() - started
+    engine.dispose()
+
+    stats = waits.snapshot()
+    print(f"{mode:10} {stats['count']:6} ok {len(errors):4} err  "
+          f"wait p50 {stats['p50_ms']:8.2f}ms  p95 {stats['p95_ms']:8.2f}ms  "
+          f"max {stats['max_ms']:8.2f}ms  {stats['count'] / elapsed:8.1f} req/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=20, help="checkouts per thread")
+    parser.add_argument("--hold-ms", type=float, default=20)
+    parser.add_argument("--modes", default="queue,null")
+    args = parser.parse_args()
+
+    if not os.getenv("DATABASE_URL"):
+        path = os.path.join(tempfile.mkdtemp(), "bench.db")
+        os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+
+    print(f"{args.threads} threads x {args.requests} checkouts, holding each {args.hold_ms}ms")
+    print(f"pool size {os.getenv('PLUTO_DB_POOL_SIZE', '5')}, max overflow {os.getenv('PLUTO_DB_MAX_OVERFLOW', '10')}\n")
+    for mode in args.modes.split(","):
+        run(mode.strip(), args.threads, args.requests, args.hold_ms)
+
+
+if __name__ == "__main__":
+    main()
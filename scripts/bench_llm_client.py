@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Pluto LLM Client Benchmark
+==========================
+Runs a fake OpenAI-compatible server on localhost with injected latency and
+compares three ways of calling it from an async handler:
+
+  per-call sync    new openai.OpenAI per call, blocking the loop (the old client)
+  per-call async   new AsyncOpenAI per call (no connection reuse)
+  pooled async     the shared keep-alive client in python_core.llm_client
+
+--handshake-ms adds a one-off delay to the first request on every new
+connection, standing in for the TCP + TLS setup a real Groq call pays.
+
+Usage:
+    python scripts/bench_llm_client.py --concurrency 20 --requests 5 --latency-ms 150 --handshake-ms 80
+"""
+
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import sys
+import threading
+import time
+from typing import List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_fake_server(port: int, latency_ms: float, handshake_ms: float) -> None:
+    import uvicorn
+    from fastapi import FastAPI, Request
+
+    app = FastAPI()
+    seen_connections = set()
+
+    @app.post("/v1/chat/completions")
+    async def completions(request: Request):
+        body = await request.json()
+        delay = latency_ms
+        peer = request.scope.get("client")
+        if peer not in seen_connections:
+            seen_connections.add(peer)
+            delay += handshake_ms
+        await asyncio.sleep(delay / 1000)
+        return {
+            "id": "chatcmpl-bench", "object": "chat.completion", "created": int(time.time()),
+            "model": body.get("model", "fake"),
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": "ok"}}],
+            "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+        }
+
+    @app.get("/v1/models")
+    async def models():
+        return {"object": "list", "data": []}
+
+    config = uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning")
+    server = uvicorn.Server(config)
+    threading.Thread(target=server.run, daemon=True).start()
+    for _ in range(100):
+        if server.started:
+            return
+        time.sleep(0.05)
+    raise RuntimeError("fake server did not start")
+
+
+MESSAGES = [{"role": "user", "content": "ping"}]
+
+
+async def run(mode: str, concurrency: int, requests: int) -> Tuple[float, List[float]]:
+    import openai
+    from python_core import llm_client
+
+    latencies: List[float] = []
+
+    async def call():
+        start = time.perf_counter()
+        if mode == "per-call sync":
+            client = openai.OpenAI(api_key="bench", base_url=llm_client.GROQ_BASE_URL)
+            client.chat.completions.create(model="fake", messages=MESSAGES)
+            client.close()
+        elif mode == "per-call async":
+            async with openai.AsyncOpenAI(api_key="bench", base_url=llm_client.GROQ_BASE_URL) as client:
+                await client.chat.completions.create(model="fake", messages=MESSAGES)
+        else:
+            await llm_client.chat_completion("bench", model="fake", messages=MESSAGES)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    async def handler():
+        for _ in range(requests):
+            await call()
+
+    if mode == "pooled async":
+        await llm_client.get_llm_pool().warm(min(concurrency, llm_client.get_llm_pool().pool_size))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(handler() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    if mode == "pooled async":
+        await llm_client.get_llm_pool().close()
+    return elapsed, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=5, help="calls per concurrent client")
+    parser.add_argument("--latency-ms", type=float, default=150)
+    parser.add_argument("--handshake-ms", type=float, default=80)
+    args = parser.parse_args()
+
+    port = free_port()
+    os.environ["GROQ_BASE_URL"] = f"http://127.0.0.1:{port}/v1"
+    os.environ["GROQ_API_KEY"] = "bench"
+    os.environ.setdefault("PLUTO_LOG_SINKS", "null")
+    start_fake_server(port, args.latency_ms, args.handshake_ms)
+
+    total = args.concurrency * args.requests
+    print(f"{args.concurrency} concurrent clients x {args.requests} calls, "
+          f"{args.latency_ms:.0f}ms model latency, {args.handshake_ms:.0f}ms per new connection\n")
+    for mode in ("per-call sync", "per-call async", "pooled async"):
+        elapsed, latencies = asyncio.run(run(mode, args.concurrency, args.requests))
+        latencies.sort()
+        p95 = latencies[int(len(latencies) * 0.95) - 1]
+        print(f"{mode:15} {total / elapsed:8.1f} calls/s   "
+              f"p50 {statistics.median(latencies):7.1f}ms   p95 {p95:7.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,21 @@
+#!/usr/bin/env python3
+"""
+Pluto Protocol Snapshot
+=======================
+Archives python_core/clinical_protocols.json under its content hash so that
+triage events stored with the compact encoding can still be decoded after the
+protocols change. Run (and commit the new file) whenever the protocols change.
+
+    python scripts/snapshot_protocols.py
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from python_core.triage_codec import archive_protocols
+
+
+if __name__ == "__main__":
+    print(f"Protocol snapshot: {archive_protocols()}")
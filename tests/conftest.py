@@ -0,0 +1,11 @@
+"""
+Shared test setup: python_core singletons (logger, metrics store, local
+SQLite stores) write relative to the working directory, so run every test
+session from a throwaway directory with no shared metrics dir configured.
+"""
+import os
+import tempfile
+
+os.environ.pop("PLUTO_METRICS_DIR", None)
+os.environ.pop("VERCEL", None)
+os.chdir(tempfile.mkdtemp(prefix="pluto-tests-"))
@@ -0,0 +1,75 @@
+from python_core.chat_context import ChatContextBuilder, count_message_tokens, count_tokens, truncate_tokens
+from python_core.clinical_reasoning_engine import get_reasoning_engine
+
+COMPLAINT = "I have crushing chest pain spreading to my left arm and I'm sweating"
+
+
+def conversation(turns: int, words: int = 10) -> list:
+    messages = []
+    for n in range(turns):
+        role = "user" if n % 2 == 0 else "assistant"
+        messages.append({"role": role, "content": f"turn {n} " + " ".join(["symptom"] * words)})
+    messages.append({"role": "user", "content": COMPLAINT})
+    return messages
+
+
+def build(builder: ChatContextBuilder, messages: list):
+    result = get_reasoning_engine().reason(" ".join(m["content"] for m in messages if m["role"] == "user"))
+    return builder.build(result, messages)
+
+
+def test_short_conversation_is_sent_verbatim():
+    messages = conversation(2)
+    llm_messages, stats = build(ChatContextBuilder(), messages)
+
+    assert llm_messages[1:] == messages
+    assert stats["turns_summarized"] == 0 and stats["turns_truncated"] == 0
+    assert "Earlier in this conversation" not in llm_messages[0]["content"]
+
+
+def test_long_history_is_trimmed_to_the_budget_newest_first():
+    builder = ChatContextBuilder(budget=600, max_turns=20, message_tokens=100)
+    messages = conversation(30, words=60)
+    llm_messages, stats = build(builder, messages)
+
+    assert stats["prompt_tokens"] == count_message_tokens(llm_messages) <= builder.budget
+    assert llm_messages[-1]["content"] == COMPLAINT
+    sent = llm_messages[1:-1]
+    assert sent and all(m["content"].startswith(f"turn {n}") for m, n in zip(sent, range(30 - len(sent), 30)))
+    assert stats["turns_summarized"] == 30 - len(sent)
+    assert stats["turns_truncated"] == len(sent)  # Each one longer than message_tokens
+    assert "Earlier in this conversation" in llm_messages[0]["content"]
+
+
+def test_max_turns_caps_the_history():
+    llm_messages, stats = build(ChatContextBuilder(max_turns=3), conversation(8))
+    assert stats["turns_sent"] == len(llm_messages) - 1 == 3
+    assert stats["turns_summarized"] == 6
+
+
+def test_oversized_latest_message_is_cut_to_fit():
+    builder = ChatContextBuilder(budget=400)
+    messages = [{"role": "user", "content": COMPLAINT + " " + "pain " * 2000}]
+    llm_messages, stats = build(builder, messages)
+
+    assert llm_messages[-1]["content"].startswith(COMPLAINT)
+    assert llm_messages[-1]["content"].endswith("…")
+    assert stats["turns_truncated"] == 1
+    assert stats["prompt_tokens"] <= builder.budget
+
+
+def test_system_prompt_shrinks_to_half_a_small_budget():
+    builder = ChatContextBuilder(budget=260, context_items=10)
+    llm_messages, _ = build(builder, conversation(0))
+    roomy, _ = build(ChatContextBuilder(budget=10_000, context_items=10), conversation(0))
+
+    assert count_message_tokens(llm_messages[:1]) < count_message_tokens(roomy[:1])
+
+
+def test_token_estimates():
+    assert count_tokens("") == 0
+    assert count_tokens("chest pain") == 2
+    assert count_tokens("pneumonoultramicroscopic") > 1
+    text, cut = truncate_tokens("one two three four five six", 4)
+    assert cut and text == "one two …"
+    assert truncate_tokens("short", 10) == ("short", False)
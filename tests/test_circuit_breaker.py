@@ -0,0 +1,89 @@
+import asyncio
+import time
+
+from python_core.circuit_breaker import CircuitBreaker, CircuitOpenError, CLOSED, OPEN
+from python_core.fanout import fan_out, TIMEOUT
+from python_core.llm_client import LLMClientPool
+
+
+def make_breaker(**kwargs) -> CircuitBreaker:
+    options = dict(window=60, min_calls=3, failure_rate=0.5, slow_call_ms=1000,
+                   slow_rate=0.8, cooldown=30, probes=1)
+    options.update(kwargs)
+    return CircuitBreaker(**options)
+
+
+def test_opens_on_slow_successes():
+    breaker = make_breaker()
+    for _ in range(3):
+        assert breaker.allow()
+        breaker.record_success(latency_ms=1500)
+    assert breaker.state == OPEN
+    assert not breaker.allow()
+
+
+def test_fast_calls_keep_it_closed():
+    breaker = make_breaker()
+    for _ in range(10):
+        assert breaker.allow()
+        breaker.record_success(latency_ms=50)
+    assert breaker.state == CLOSED
+
+
+def test_calls_cut_off_at_deadline_count_as_slow():
+    breaker = make_breaker(slow_call_ms=8000)
+    for _ in range(3):
+        assert breaker.allow()
+        breaker.record_abandoned(elapsed_ms=3000, deadline_hit=True)
+    assert breaker.state == OPEN
+
+
+def test_disconnects_before_slow_threshold_are_ignored():
+    breaker = make_breaker(slow_call_ms=8000)
+    for _ in range(5):
+        assert breaker.allow()
+        breaker.record_abandoned(elapsed_ms=3000)
+    assert breaker.state == CLOSED
+    assert breaker.get_stats()["window_calls"] == 0
+
+
+def test_half_open_probe_success_closes():
+    breaker = make_breaker(cooldown=0.05)
+    for _ in range(3):
+        breaker.allow()
+        breaker.record_failure()
+    assert breaker.state == OPEN
+    time.sleep(0.06)
+    assert breaker.allow()
+    assert not breaker.allow()  # Only one probe at a time
+    breaker.record_success(latency_ms=10)
+    assert breaker.state == CLOSED
+
+
+def test_sustained_latency_under_a_request_budget_opens_the_breaker():
+    """The triage case: Groq slower than the budget, every call cancelled by fan_out"""
+    pool = LLMClientPool()
+    pool.breaker = make_breaker(slow_call_ms=8000)
+    pool.hedge_enabled = False
+
+    async def slow_create(client, semaphore, purpose, timeout, kwargs):
+        await asyncio.sleep(5)
+
+    pool._create = slow_create
+
+    async def triage_request():
+        outcomes = await fan_out({"summary": pool.chat_completion("triage_summary", messages=[])}, 0.05)
+        return outcomes["summary"].outcome
+
+    async def scenario():
+        for _ in range(3):
+            assert await triage_request() == TIMEOUT
+        assert pool.breaker.state == OPEN
+        start = time.perf_counter()
+        try:
+            await pool.chat_completion("triage_summary", messages=[])
+        except CircuitOpenError:
+            return time.perf_counter() - start
+        raise AssertionError("breaker let the call through")
+
+    assert asyncio.run(scenario()) < 0.05
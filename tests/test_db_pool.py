@@ -0,0 +1,37 @@
+import subprocess
+import sys
+from pathlib import Path
+
+from sqlalchemy import create_engine, text
+
+from python_core import models
+from python_core.models import TimedQueuePool, _engine_kwargs, set_checkout_observer
+
+
+def test_importing_models_does_not_build_the_logger():
+    code = "import sys, python_core.models; assert 'python_core.logger' not in sys.modules"
+    subprocess.run([sys.executable, "-c", code], check=True, cwd=Path(__file__).parent.parent)
+
+
+def test_checkouts_are_reported_to_the_observer(tmp_path):
+    waits = []
+    set_checkout_observer(waits.append)
+    try:
+        engine = create_engine(f"sqlite:///{tmp_path / 'pool.db'}", poolclass=TimedQueuePool)
+        with engine.connect() as conn:
+            conn.execute(text("select 1"))
+    finally:
+        set_checkout_observer(None)
+    assert len(waits) == 1 and waits[0] >= 0
+    assert models._checkout_observer is None
+
+
+def test_pgbouncer_asyncpg_statement_names_are_unique():
+    connect_args = _engine_kwargs("pgbouncer", async_driver=True)["connect_args"]
+    assert connect_args["statement_cache_size"] == 0
+    name_func = connect_args["prepared_statement_name_func"]
+    assert name_func() != name_func()
+
+
+def test_psycopg2_gets_no_asyncpg_connect_args():
+    assert "connect_args" not in _engine_kwargs("pgbouncer", async_driver=False)
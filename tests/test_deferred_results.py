@@ -0,0 +1,55 @@
+import asyncio
+import time
+
+from python_core.deferred_results import DeferredResults, PENDING, READY, FAILED
+
+
+def test_waiter_is_woken_by_complete_in_this_process(tmp_path):
+    results = DeferredResults(path=tmp_path / "deferred.db", poll_interval=10)
+
+    async def scenario():
+        result_id = await results.create("u1", "fallback")
+
+        async def finish():
+            await asyncio.sleep(0.05)
+            await results.complete(result_id, "summary")
+
+        asyncio.ensure_future(finish())
+        start = time.perf_counter()
+        entry = await results.wait(result_id, "u1", timeout=5)
+        return entry, time.perf_counter() - start
+
+    entry, elapsed = asyncio.run(scenario())
+    assert entry == {"status": READY, "value": "summary"}
+    assert elapsed < 1  # Not the 10s poll interval
+    assert results._waiters == {}
+
+
+def test_completion_by_another_worker_is_seen_by_polling(tmp_path):
+    results = DeferredResults(path=tmp_path / "deferred.db", poll_interval=0.05)
+    other_worker = DeferredResults(path=tmp_path / "deferred.db")
+
+    async def scenario():
+        result_id = await results.create(None, "fallback")
+
+        async def finish():
+            await asyncio.sleep(0.1)
+            await other_worker.complete(result_id, None)  # Wakes nobody in `results`
+
+        asyncio.ensure_future(finish())
+        return await results.wait(result_id, None, timeout=5)
+
+    assert asyncio.run(scenario()) == {"status": FAILED, "value": "fallback"}
+
+
+def test_slots_are_private_to_their_owner_and_time_out_pending(tmp_path):
+    results = DeferredResults(path=tmp_path / "deferred.db", poll_interval=0.02)
+
+    async def scenario():
+        result_id = await results.create("u1", "fallback")
+        return (await results.get(result_id, "u2"),
+                await results.wait(result_id, "u1", timeout=0.1))
+
+    other_user, pending = asyncio.run(scenario())
+    assert other_user is None
+    assert pending == {"status": PENDING, "value": "fallback"}
@@ -0,0 +1,112 @@
+import asyncio
+import multiprocessing
+import os
+
+import pytest
+from sqlmodel import SQLModel, Session, create_engine, select
+
+from python_core import event_writer as event_writer_module
+from python_core.event_writer import TriageEventWriter
+from python_core.models import TriageEvent
+
+
+@pytest.fixture
+def engine(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'events.db'}")
+    SQLModel.metadata.create_all(engine)
+    monkeypatch.setattr(event_writer_module, "get_shared_engine", lambda: engine)
+    return engine
+
+
+def make_event(event_id: str) -> TriageEvent:
+    return TriageEvent(id=event_id, userId="u1", symptoms="headache", aiResult={"enc": 1},
+                       logicSnapshot={}, actionRecommended="home_care", urgency="Low")
+
+
+def stored_ids(engine) -> set:
+    with Session(engine) as session:
+        return {event.id for event in session.exec(select(TriageEvent))}
+
+
+def make_writer(spill_dir, **kwargs) -> TriageEventWriter:
+    return TriageEventWriter(spill_dir=spill_dir, flush_interval=kwargs.pop("flush_interval", 0.05), **kwargs)
+
+
+def _submit_and_crash(spill_dir: str) -> None:
+    # Worker never gets a tick: the process dies right after submit() returns
+    writer = make_writer(spill_dir, flush_interval=60)
+    assert asyncio.run(writer.submit(make_event("evt_crash")))
+    os._exit(0)
+
+
+def test_row_submitted_before_a_crash_is_replayed(engine, tmp_path):
+    child = multiprocessing.get_context("fork").Process(target=_submit_and_crash, args=(str(tmp_path),))
+    child.start()
+    child.join(10)
+    assert child.exitcode == 0
+    assert stored_ids(engine) == set()
+
+    writer = make_writer(tmp_path)
+    assert asyncio.run(writer.submit(make_event("evt_after")))
+    assert writer.flush()
+    writer.close()
+
+    assert stored_ids(engine) == {"evt_crash", "evt_after"}
+    assert list(tmp_path.glob(f"triage_events.{child.pid}.*")) == []
+
+
+def test_acknowledged_rows_are_not_rewritten(engine, tmp_path):
+    writer = make_writer(tmp_path, batch_size=2)
+    for i in range(5):
+        assert asyncio.run(writer.submit(make_event(f"evt_{i}")))
+    assert writer.flush()
+
+    assert stored_ids(engine) == {f"evt_{i}" for i in range(5)}
+    assert writer.get_stats()["spill_backlog_bytes"] == 0
+    assert writer._spill_path.stat().st_size == 0  # Truncated once fully written
+    writer.close()
+
+
+def test_orphan_is_replayed_from_its_read_offset(engine, tmp_path):
+    dead = multiprocessing.get_context("fork").Process(target=os._exit, args=(0,))
+    dead.start()
+    dead.join(10)
+    orphan = tmp_path / f"triage_events.{dead.pid}.spill"
+    done = event_writer_module._encode(make_event("evt_done"))
+    pending = event_writer_module._encode(make_event("evt_pending"))
+    orphan.write_text(done + "\n" + pending + "\n" + '{"torn')
+    (tmp_path / f"triage_events.{dead.pid}.offset").write_text(str(len(done) + 1))
+
+    writer = make_writer(tmp_path)
+    assert asyncio.run(writer.submit(make_event("evt_new")))
+    assert writer.flush()
+    writer.close()
+
+    assert stored_ids(engine) == {"evt_pending", "evt_new"}
+    assert not orphan.exists()
+
+
+def test_losing_an_adoption_race_keeps_the_spill_file(engine, tmp_path, monkeypatch):
+    dead = multiprocessing.get_context("fork").Process(target=os._exit, args=(0,))
+    dead.start()
+    dead.join(10)
+    (tmp_path / f"triage_events.{dead.pid}.spill").write_text("")
+
+    def adopted_elsewhere(orphan, path):
+        raise FileNotFoundError(orphan)
+
+    monkeypatch.setattr(TriageEventWriter, "_adopt", staticmethod(adopted_elsewhere))
+    writer = make_writer(tmp_path)
+    assert writer._open_spill(os.getpid()) == tmp_path / f"triage_events.{os.getpid()}.spill"
+
+
+def test_appends_after_compaction_go_to_the_new_file(engine, tmp_path, monkeypatch):
+    monkeypatch.setattr(event_writer_module, "COMPACT_BYTES", 1)
+    writer = make_writer(tmp_path, flush_interval=60)
+    assert writer.start()
+    assert writer._append_spill(["first", "second"])
+    writer._ack_spill(len("first\n"))  # Compacts: the kept handle must follow the new file
+    assert writer._append_spill(["third"])
+
+    assert writer._read_spill(10)[0] == ["second", "third"]
+    writer.close()
@@ -0,0 +1,72 @@
+import pytest
+from sqlmodel import SQLModel, Session, create_engine, select
+
+from python_core.fact_store import build_fact_rows, fact_hash, normalize_fact, write_facts
+from python_core.models import MedicalFact, User
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'facts.db'}")
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add(User(id="u1", email="u1@example.com"))
+        session.commit()
+    return engine
+
+
+def stored_facts(engine) -> list:
+    with Session(engine) as session:
+        return session.exec(select(MedicalFact).order_by(MedicalFact.value)).all()
+
+
+@pytest.mark.parametrize("fact_type, value, expected", [
+    ("Meds", "Ibuprofen 200mg.", ("Medication", "ibuprofen 200mg")),
+    ("  allergies ", "  Penicillin  ", ("Allergy", "penicillin")),
+    ("diagnosis", "Type  2\tDiabetes;", ("Condition", "type 2 diabetes")),
+    ("family history", "ＡＳＴＨＭＡ", ("Family History", "asthma")),
+])
+def test_normalize_fact(fact_type, value, expected):
+    assert normalize_fact(fact_type, value) == expected
+
+
+def test_hash_ignores_presentation_but_not_user_or_meaning():
+    digest = fact_hash("u1", "Medications", "Ibuprofen 200mg")
+    assert fact_hash("u1", "med", " ibuprofen  200MG. ") == digest
+    assert fact_hash("u2", "Medications", "Ibuprofen 200mg") != digest
+    assert fact_hash("u1", "Allergy", "Ibuprofen 200mg") != digest
+    assert fact_hash("u1", "Medications", "Ibuprofen 400mg") != digest
+
+
+def test_rows_are_deduplicated_within_one_batch():
+    rows = build_fact_rows("u1", [
+        {"type": "Meds", "value": "Ibuprofen"},
+        {"type": "medication", "value": "ibuprofen."},
+        {"type": "Allergy", "value": ""},
+        "not a fact",
+    ], source="chat")
+    assert len(rows) == 1
+    assert rows[0]["type"] == "Medication" and rows[0]["value"] == "Ibuprofen"
+
+
+def test_upsert_is_idempotent_on_sqlite(engine):
+    facts = [{"type": "Meds", "value": "Ibuprofen"}, {"type": "Allergy", "value": "Penicillin"}]
+    assert write_facts(engine, "u1", facts, source="chat") == 2
+    first = {fact.factHash: fact for fact in stored_facts(engine)}
+
+    assert write_facts(engine, "u1", [{"type": "medications", "value": " ibuprofen. "}], source="chat") == 1
+    assert write_facts(engine, "u1", facts, source="triage") == 2
+
+    stored = stored_facts(engine)
+    assert len(stored) == 2
+    seen = {fact.value: fact.seenCount for fact in stored}
+    assert seen == {"Ibuprofen": 3, "Penicillin": 2}
+    for fact in stored:
+        original = first[fact.factHash]
+        assert (fact.id, fact.source, fact.createdAt) == (original.id, "chat", original.createdAt)
+        assert fact.lastSeen >= original.lastSeen
+
+
+def test_empty_batch_writes_nothing(engine):
+    assert write_facts(engine, "u1", [{"type": "", "value": "x"}], source="chat") == 0
+    assert stored_facts(engine) == []
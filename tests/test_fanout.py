@@ -0,0 +1,91 @@
+import asyncio
+import time
+
+import pytest
+
+from python_core import fanout as fanout_module
+from python_core.fanout import fan_out, current_deadline, OK, FAILED, TIMEOUT, SKIPPED
+
+
+async def sleep_then(seconds: float, value=None):
+    await asyncio.sleep(seconds)
+    return value
+
+
+async def fail_after(seconds: float):
+    await asyncio.sleep(seconds)
+    raise RuntimeError("insert failed")
+
+
+def test_slow_steps_are_cut_at_the_budget():
+    async def scenario():
+        start = time.perf_counter()
+        outcomes = await fan_out({"fast": sleep_then(0.01, "a"), "slow": sleep_then(5), "none": None},
+                                 budget_s=0.1, family="test_step")
+        return outcomes, time.perf_counter() - start
+
+    outcomes, elapsed = asyncio.run(scenario())
+    assert elapsed < 0.5
+    assert (outcomes["fast"].outcome, outcomes["fast"].value) == (OK, "a")
+    assert outcomes["slow"].outcome == TIMEOUT
+    assert outcomes["none"].outcome == SKIPPED
+
+
+def test_steps_run_concurrently():
+    async def scenario():
+        start = time.perf_counter()
+        await fan_out({f"s{i}": sleep_then(0.1) for i in range(5)}, budget_s=2, family="test_step")
+        return time.perf_counter() - start
+
+    assert asyncio.run(scenario()) < 0.3
+
+
+def test_required_steps_outlive_the_budget():
+    async def scenario():
+        return await fan_out({"save": sleep_then(0.2, "saved"), "slow": sleep_then(5)},
+                             budget_s=0.05, required=("save",), family="test_step")
+
+    outcomes = asyncio.run(scenario())
+    assert (outcomes["save"].outcome, outcomes["save"].value) == (OK, "saved")
+    assert outcomes["slow"].outcome == TIMEOUT
+
+
+def test_required_step_failure_is_raised():
+    async def scenario():
+        await fan_out({"save": fail_after(0.1), "summary": sleep_then(0.01)},
+                      budget_s=0.05, required=("save",), family="test_step")
+
+    with pytest.raises(RuntimeError, match="insert failed"):
+        asyncio.run(scenario())
+
+
+def test_optional_step_failure_is_contained():
+    outcomes = asyncio.run(fan_out({"facts": fail_after(0)}, budget_s=1, family="test_step"))
+    assert outcomes["facts"].outcome == FAILED
+
+
+def test_steps_see_their_deadline():
+    async def read_deadline():
+        return current_deadline()
+
+    async def scenario():
+        before = time.monotonic()
+        outcomes = await fan_out({"step": read_deadline()}, budget_s=1, family="test_step")
+        return before, outcomes["step"].value
+
+    before, deadline = asyncio.run(scenario())
+    assert before + 0.9 < deadline < before + 1.1
+    assert current_deadline() is None
+
+
+def test_only_completed_steps_record_latency(monkeypatch):
+    recorded = []
+
+    class StubLogger:
+        def record_latency(self, family, name, duration_ms):
+            recorded.append(name)
+
+    monkeypatch.setattr(fanout_module, "get_logger", StubLogger)
+    asyncio.run(fan_out({"fast": sleep_then(0), "broken": fail_after(0), "slow": sleep_then(5)},
+                        budget_s=0.05, family="test_step"))
+    assert recorded == ["fast"]
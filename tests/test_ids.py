@@ -0,0 +1,61 @@
+import threading
+
+from python_core import ids as ids_module
+from python_core.ids import MonotonicIdGenerator, new_id, ulid_timestamp_ms
+
+
+def freeze_clock(monkeypatch, seconds: list) -> None:
+    monkeypatch.setattr(ids_module.time, "time", lambda: seconds[0])
+
+
+def test_ids_in_one_millisecond_are_strictly_increasing(monkeypatch):
+    freeze_clock(monkeypatch, [1_700_000_000.0])
+    generator = MonotonicIdGenerator()
+    ids = [generator.new_ulid() for _ in range(1000)]
+    assert ids == sorted(ids) and len(set(ids)) == 1000
+    assert {ulid_timestamp_ms(i) for i in ids} == {1_700_000_000_000}
+
+
+def test_clock_stepping_back_does_not_reorder(monkeypatch):
+    clock = [1_700_000_000.5]
+    freeze_clock(monkeypatch, clock)
+    generator = MonotonicIdGenerator()
+    before = generator.new_ulid()
+    clock[0] -= 10
+    after = generator.new_ulid()
+    assert after > before
+    assert ulid_timestamp_ms(after) == ulid_timestamp_ms(before)
+
+
+def test_random_overflow_borrows_the_next_millisecond(monkeypatch):
+    freeze_clock(monkeypatch, [1_700_000_000.0])
+    generator = MonotonicIdGenerator()
+    first = generator.new_ulid()
+    generator._last_random = ids_module._RANDOM_MAX
+    second = generator.new_ulid()
+    assert second > first
+    assert ulid_timestamp_ms(second) == ulid_timestamp_ms(first) + 1
+
+
+def test_increasing_across_threads():
+    generator = MonotonicIdGenerator()
+    per_thread = [[] for _ in range(8)]
+
+    def worker(out):
+        for _ in range(2000):
+            out.append(generator.new_ulid())
+
+    threads = [threading.Thread(target=worker, args=(out,)) for out in per_thread]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert all(out == sorted(out) for out in per_thread)
+    assert len({i for out in per_thread for i in out}) == 16000
+
+
+def test_new_id_format():
+    value = new_id("evt")
+    prefix, ulid = value.split("_")
+    assert prefix == "evt" and len(ulid) == 26
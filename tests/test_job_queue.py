@@ -0,0 +1,77 @@
+import asyncio
+import json
+import time
+
+import pytest
+
+from python_core.circuit_breaker import CircuitOpenError
+from python_core.job_queue import JobQueue, register_job
+
+calls = {"ok": 0, "broken": 0, "circuit": 0}
+
+
+@register_job("test_ok", max_attempts=3)
+async def ok_job(payload):
+    calls["ok"] += 1
+
+
+@register_job("test_broken", max_attempts=2)
+async def broken_job(payload):
+    calls["broken"] += 1
+    raise ValueError("always fails")
+
+
+@register_job("test_circuit", max_attempts=2)
+async def circuit_job(payload):
+    calls["circuit"] += 1
+    if calls["circuit"] <= 3:
+        raise CircuitOpenError("LLM circuit open", retry_in=0.01)
+
+
+@pytest.fixture
+def job_queue(tmp_path):
+    jobs = JobQueue(path=tmp_path / "jobs.db", concurrency=2, poll_interval=0.02, base_backoff=0.01)
+    yield jobs
+    jobs.close()
+
+
+def rows(jobs: JobQueue) -> list:
+    return jobs._execute("SELECT kind, status, attempts, payload FROM jobs")
+
+
+def wait_for(condition, timeout: float = 5.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.02)
+
+
+def test_successful_job_is_deleted(job_queue):
+    assert asyncio.run(job_queue.enqueue("test_ok", {"text": "chest pain"}))
+    wait_for(lambda: calls["ok"] == 1 and not rows(job_queue))
+
+
+def test_dead_lettered_job_drops_its_payload(job_queue):
+    asyncio.run(job_queue.enqueue("test_broken", {"text": "chest pain"}))
+    wait_for(lambda: [r[1] for r in rows(job_queue)] == ["dead"])
+    [(_, _, attempts, payload)] = rows(job_queue)
+    assert attempts == 2
+    assert json.loads(payload) is None
+
+
+def test_open_circuit_defers_without_using_attempts(job_queue):
+    asyncio.run(job_queue.enqueue("test_circuit", {"text": "chest pain"}))
+    wait_for(lambda: not rows(job_queue))
+    assert calls["circuit"] == 4  # Three deferrals, then success within max_attempts=2
+    assert job_queue.get_stats()["kinds"]["test_circuit"]["deferred"] == 3
+
+
+def test_old_jobs_are_purged(job_queue):
+    job_queue.retention = 60
+    job_queue._ensure_started()
+    job_queue._execute(
+        "INSERT INTO jobs (id, kind, payload, status, run_at, created_at) VALUES (?, ?, ?, 'dead', ?, ?)",
+        ("job_old", "test_broken", "null", 0, time.time() - 120),
+    )
+    job_queue._purge()
+    assert rows(job_queue) == []
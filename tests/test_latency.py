@@ -0,0 +1,44 @@
+import pytest
+
+from python_core.latency import LatencyHistogram, LatencyRegistry, bucket_index, bucket_upper_bound
+from python_core.shared_metrics import LocalMetricsStore
+
+
+def test_percentiles_are_within_the_bucket_error():
+    hist = LatencyHistogram()
+    for ms in range(1, 1001):
+        hist.record(float(ms))
+    for q, exact in ((0.5, 500), (0.95, 950), (0.99, 990)):
+        assert hist.percentile(q) == pytest.approx(exact, rel=0.1)
+        assert hist.percentile(q) >= exact  # Upper bound of the bucket
+    assert hist.percentile(1.0) == 1000
+
+
+def test_bucket_bounds_contain_their_values():
+    for ms in (0.05, 0.1, 1.0, 37.5, 999.0, 119_999.0):
+        index = bucket_index(ms)
+        assert ms <= bucket_upper_bound(index) * 1.0000001
+        assert index == 0 or ms > bucket_upper_bound(index - 1)
+
+
+def test_empty_histogram():
+    assert LatencyHistogram().snapshot()["p99_ms"] == 0
+
+
+def test_reset_window_keeps_the_previous_window_and_lifetime():
+    registry = LatencyRegistry(window_seconds=300, store=LocalMetricsStore())
+    registry.record("endpoint", "/api/triage", 10)
+    registry.reset_window()
+    registry.record("endpoint", "/api/triage", 20)
+
+    snapshot = registry.snapshot()
+    assert snapshot["window"]["endpoint"]["/api/triage"]["count"] == 1
+    assert snapshot["previous_window"]["endpoint"]["/api/triage"]["max_ms"] == 10
+    assert snapshot["lifetime"]["endpoint"]["/api/triage"]["count"] == 2
+
+
+def test_window_rotates_on_its_own():
+    registry = LatencyRegistry(window_seconds=0.0, store=LocalMetricsStore())
+    registry.record("endpoint", "/x", 10)
+    registry.record("endpoint", "/x", 20)
+    assert registry.snapshot()["window"]["endpoint"]["/x"]["count"] == 1
@@ -0,0 +1,54 @@
+import threading
+import time
+
+from python_core.llm_client import LLMClientPool
+
+
+def make_pool(window: float = 60.0, ratio: float = 0.1) -> LLMClientPool:
+    pool = LLMClientPool()
+    pool.hedge_enabled = True
+    pool.hedge_window = window
+    pool.hedge_max_ratio = ratio
+    return pool
+
+
+def hedge_once(pool: LLMClientPool) -> bool:
+    return pool._hedge_delay("chat") is not None and pool._claim_hedge()
+
+
+def test_hedges_are_capped_by_the_ratio():
+    pool = make_pool(ratio=0.1)
+    hedged = sum(hedge_once(pool) for _ in range(100))
+    assert hedged == 10
+
+
+def test_budget_recovers_once_old_calls_leave_the_window(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr("python_core.llm_client.time.monotonic", lambda: clock[0])
+    pool = make_pool(window=60, ratio=0.5)
+
+    # A burst of slow calls spends the budget...
+    assert sum(hedge_once(pool) for _ in range(10)) == 5
+    assert not pool._hedge_budget_left()
+
+    # ...which a lifetime count would never give back
+    clock[0] += 61
+    assert hedge_once(pool)
+    assert len(pool._hedgeable_calls) == 1 and len(pool._hedges) == 1
+
+
+def test_ratio_holds_across_threads():
+    pool = make_pool(ratio=0.25)
+
+    def worker():
+        for _ in range(2000):
+            hedge_once(pool)
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(pool._hedgeable_calls) == 16000
+    assert len(pool._hedges) <= 0.25 * 16000
@@ -0,0 +1,58 @@
+import json
+from datetime import datetime, timedelta, timezone
+
+from python_core.log_reader import iter_lines_reverse, tail_records
+
+NOW = datetime(2026, 1, 1, 12, 0, 0)
+
+
+def write_log(path, count: int) -> None:
+    """One record a minute, oldest first, as the writer appends them"""
+    with open(path, 'w') as f:
+        for n in range(count):
+            f.write(json.dumps({"n": n, "timestamp": (NOW + timedelta(minutes=n)).isoformat()}) + "\n")
+
+
+def epoch(minutes: int) -> float:
+    return (NOW + timedelta(minutes=minutes)).replace(tzinfo=timezone.utc).timestamp()
+
+
+def test_lines_come_back_newest_first_across_blocks(tmp_path):
+    path = tmp_path / "app.jsonl"
+    path.write_bytes(b"first\n\nsecond line is longer than a block\nthird")
+    assert list(iter_lines_reverse(path, block_size=4)) == [
+        b"third", b"second line is longer than a block", b"first"]
+
+
+def test_limit_returns_the_most_recent_records(tmp_path):
+    path = tmp_path / "app.jsonl"
+    write_log(path, 50)
+    assert [r["n"] for r in tail_records(path, limit=3)] == [49, 48, 47]
+
+
+def test_since_stops_at_the_first_older_record(tmp_path):
+    path = tmp_path / "app.jsonl"
+    write_log(path, 50)
+    assert [r["n"] for r in tail_records(path, limit=100, since=epoch(45))] == [49, 48, 47, 46, 45]
+
+
+def test_limit_and_since_together(tmp_path):
+    path = tmp_path / "app.jsonl"
+    write_log(path, 50)
+    assert [r["n"] for r in tail_records(path, limit=2, since=epoch(45))] == [49, 48]
+    assert tail_records(path, limit=10, since=epoch(60)) == []
+
+
+def test_bad_lines_are_skipped(tmp_path):
+    path = tmp_path / "app.jsonl"
+    write_log(path, 2)
+    with open(path, 'a') as f:
+        f.write('{"n": 2, "timest')  # Torn write at the tail
+    assert [r["n"] for r in tail_records(path, limit=10)] == [1, 0]
+
+
+def test_missing_file_or_zero_limit(tmp_path):
+    assert tail_records(tmp_path / "missing.jsonl") == []
+    path = tmp_path / "app.jsonl"
+    write_log(path, 3)
+    assert tail_records(path, limit=0) == []
@@ -0,0 +1,61 @@
+import json
+import multiprocessing
+import os
+from datetime import datetime
+
+from python_core.log_rollups import TriageRollup
+
+
+def _record_and_save(path: str, levels: list) -> None:
+    rollup = TriageRollup(path)
+    for level in levels:
+        rollup.record(level, llm_called=True, duration_ms=10)
+    rollup.save()
+    os._exit(0)
+
+
+def run_worker(path, levels) -> int:
+    child = multiprocessing.get_context("fork").Process(target=_record_and_save, args=(str(path), levels))
+    child.start()
+    child.join(10)
+    assert child.exitcode == 0
+    return child.pid
+
+
+def test_workers_do_not_overwrite_each_other(tmp_path):
+    path = tmp_path / "triage_rollup.json"
+    run_worker(path, ["Low", "Low"])
+    run_worker(path, ["Emergency"])
+
+    rollup = TriageRollup(path)
+    rollup.record("Low", llm_called=False, duration_ms=40)
+    stats = rollup.query(hours=1)
+    assert stats["total"] == 4
+    assert stats["levels"] == {"Low": 3, "Emergency": 1}
+    assert stats["llm_called"] == 3
+
+
+def test_dead_workers_files_are_adopted_once(tmp_path):
+    path = tmp_path / "triage_rollup.json"
+    dead_pid = run_worker(path, ["Low"])
+
+    rollup = TriageRollup(path)
+    rollup.load()
+
+    assert not (tmp_path / f"triage_rollup.{dead_pid}.json").exists()
+    assert (tmp_path / f"triage_rollup.{os.getpid()}.json").exists()
+    assert rollup.query(hours=1)["total"] == 1  # Not counted again from the file
+
+
+def test_backfills_from_the_log_only_once(tmp_path):
+    source_log = tmp_path / "triage.jsonl"
+    entry = {"timestamp": datetime.utcnow().isoformat(), "triage_level": "Low", "ai_called": True, "duration_ms": 5}
+    source_log.write_text(json.dumps(entry) + "\n")
+
+    first = TriageRollup(tmp_path / "triage_rollup.json")
+    first.load(source_log=source_log)
+    other = TriageRollup(tmp_path / "triage_rollup.json")
+    other.load(source_log=source_log)
+
+    assert first.query(hours=1)["total"] == 1
+    assert other._buckets == {}
@@ -0,0 +1,31 @@
+import json
+import sys
+
+from python_core.log_sinks import FileSink, StdoutSink
+from python_core.log_writer import BatchedLogWriter
+
+
+def test_stdout_entries_are_written_by_the_background_writer(capsys):
+    writer = BatchedLogWriter(flush_interval=60)
+    sink = StdoutSink(writer)
+    sink.emit("access", {"path": "/api/health"})
+    assert capsys.readouterr().out == ""  # Nothing written on the caller's thread
+
+    assert sink.flush()
+    line = capsys.readouterr().out
+    assert json.loads(line) == {"log_type": "access", "path": "/api/health"}
+    writer.close()
+    assert not sys.stdout.closed
+
+
+def test_file_recent_reads_only_what_is_already_flushed(tmp_path):
+    writer = BatchedLogWriter(flush_interval=60)
+    sink = FileSink(tmp_path, writer)
+    sink.emit("errors", {"message": "first", "timestamp": "2026-01-01T00:00:00"})
+    assert writer.flush()
+    sink.emit("errors", {"message": "second", "timestamp": "2026-01-01T00:00:01"})
+
+    assert [e["message"] for e in sink.recent("errors", limit=10, since=None)] == ["first"]
+    assert writer.flush()
+    assert [e["message"] for e in sink.recent("errors", limit=10, since=None)] == ["second", "first"]
+    writer.close()
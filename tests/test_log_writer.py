@@ -0,0 +1,144 @@
+import json
+import threading
+import time
+
+import pytest
+
+from python_core.log_writer import BatchedLogWriter, DropPolicy
+
+
+class StalledWriter:
+    """A writer whose worker thread is parked in a flush hook, so its queue fills up"""
+
+    def __init__(self, path, **kwargs):
+        self.writer = BatchedLogWriter(flush_interval=60, **kwargs)
+        self.path = path
+        self._entered = threading.Event()
+        self._release = threading.Event()
+        self.writer.add_flush_hook(self._park)
+        self.writer.submit(path, {"n": 0})
+        self.writer.flush(timeout=0)
+        assert self._entered.wait(5)
+
+    def _park(self) -> None:
+        if not self._release.is_set():
+            self._entered.set()
+            self._release.wait(5)
+
+    def release(self) -> None:
+        self._release.set()
+        assert self.writer.flush()
+
+
+def written(path) -> list:
+    return [json.loads(line)["n"] for line in path.read_text().splitlines()]
+
+
+def test_unknown_drop_policy_is_rejected():
+    with pytest.raises(ValueError):
+        BatchedLogWriter(drop_policy="drop_everything")
+
+
+def test_drop_newest_keeps_what_is_queued(tmp_path):
+    path = tmp_path / "app.jsonl"
+    stalled = StalledWriter(path, max_queue=2, drop_policy=DropPolicy.DROP_NEWEST)
+    dropped = stalled.writer.get_stats()["dropped"]
+
+    assert [stalled.writer.submit(path, {"n": n}) for n in (1, 2, 3)] == [True, True, False]
+    assert stalled.writer.get_stats()["dropped"] == dropped + 1
+
+    stalled.release()
+    assert written(path) == [0, 1, 2]
+    stalled.writer.close()
+
+
+def test_drop_oldest_evicts_the_head_of_the_queue(tmp_path):
+    path = tmp_path / "app.jsonl"
+    stalled = StalledWriter(path, max_queue=2, drop_policy=DropPolicy.DROP_OLDEST)
+    dropped = stalled.writer.get_stats()["dropped"]
+
+    assert all(stalled.writer.submit(path, {"n": n}) for n in (1, 2, 3))
+    assert stalled.writer.get_stats()["dropped"] == dropped + 1
+
+    stalled.release()
+    assert written(path) == [0, 2, 3]
+    stalled.writer.close()
+
+
+def test_block_waits_then_gives_up(tmp_path):
+    path = tmp_path / "app.jsonl"
+    stalled = StalledWriter(path, max_queue=1, drop_policy=DropPolicy.BLOCK, block_timeout=0.05)
+
+    assert stalled.writer.submit(path, {"n": 1})
+    start = time.monotonic()
+    assert not stalled.writer.submit(path, {"n": 2})
+    assert time.monotonic() - start >= 0.05
+
+    stalled.release()
+    assert written(path) == [0, 1]
+    stalled.writer.close()
+
+
+def test_block_succeeds_once_the_worker_makes_room(tmp_path):
+    path = tmp_path / "app.jsonl"
+    stalled = StalledWriter(path, max_queue=1, drop_policy=DropPolicy.BLOCK, block_timeout=5)
+    assert stalled.writer.submit(path, {"n": 1})
+
+    threading.Timer(0.05, stalled._release.set).start()
+    assert stalled.writer.submit(path, {"n": 2})
+
+    assert stalled.writer.flush()
+    assert written(path) == [0, 1, 2]
+    stalled.writer.close()
+
+
+def test_nothing_is_written_until_a_flush(tmp_path):
+    path = tmp_path / "app.jsonl"
+    writer = BatchedLogWriter(flush_interval=60)
+    for n in range(3):
+        writer.submit(path, {"n": n})
+    assert not path.exists() or path.read_text() == ""
+
+    assert writer.flush()
+    assert written(path) == [0, 1, 2]
+    writer.close()
+
+
+def test_batch_size_triggers_a_write(tmp_path):
+    path = tmp_path / "app.jsonl"
+    writer = BatchedLogWriter(flush_interval=60, batch_size=2)
+    writer.submit(path, {"n": 0})
+    writer.submit(path, {"n": 1})
+
+    deadline = time.monotonic() + 5
+    while not path.exists() or len(path.read_text().splitlines()) < 2:
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+    assert written(path) == [0, 1]
+    writer.close()
+
+
+def test_close_writes_everything_pending_and_closes_handles(tmp_path):
+    path = tmp_path / "app.jsonl"
+    writer = BatchedLogWriter(flush_interval=60)
+    for n in range(100):
+        writer.submit(path, {"n": n})
+    handles = writer._handles
+
+    writer.close()
+    assert written(path) == list(range(100))
+    assert handles and all(handle.closed for handle in handles.values())
+    assert writer._handles == {}
+
+    writer.close()  # Idempotent
+    assert not writer.get_stats()["async"]
+
+
+def test_submit_after_close_writes_synchronously(tmp_path):
+    path = tmp_path / "app.jsonl"
+    writer = BatchedLogWriter(flush_interval=60)
+    writer.close()
+
+    assert writer.submit(path, {"n": 7})
+    assert written(path) == [7]
+    writer._close_handles()
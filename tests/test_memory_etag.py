@@ -0,0 +1,21 @@
+from py_api.memory import etag_matches
+
+ETAG = 'W/"abc123"'
+
+
+def test_matches_one_of_several_tags():
+    assert etag_matches('"zzz", W/"abc123"', ETAG)
+
+
+def test_weak_and_strong_forms_compare_equal():
+    assert etag_matches('"abc123"', ETAG)
+
+
+def test_a_tag_that_merely_contains_ours_does_not_match():
+    assert not etag_matches('W/"abc123-old"', ETAG)
+    assert not etag_matches('W/"abc12"', ETAG)
+
+
+def test_star_and_empty_header():
+    assert etag_matches("*", ETAG)
+    assert not etag_matches("", ETAG)
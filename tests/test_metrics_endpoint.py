@@ -0,0 +1,39 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from py_api import metrics as metrics_module
+from python_core.logger import get_logger
+
+
+def client() -> TestClient:
+    app = FastAPI()
+    app.include_router(metrics_module.router, prefix="/api/metrics")
+    return TestClient(app)
+
+
+def test_reads_are_open_without_a_token(monkeypatch):
+    monkeypatch.setattr(metrics_module, "METRICS_TOKEN", None)
+    assert client().get("/api/metrics", params={"format": "json"}).status_code == 200
+
+
+def test_get_never_resets_the_window(monkeypatch):
+    monkeypatch.setattr(metrics_module, "METRICS_TOKEN", None)
+    started = get_logger().latency.window_started
+    for fmt in ("json", "prometheus"):
+        response = client().get("/api/metrics", params={"format": fmt, "reset_window": "true"})
+        assert response.status_code == 400
+    assert get_logger().latency.window_started == started
+
+
+def test_reset_is_disabled_without_a_token(monkeypatch):
+    monkeypatch.setattr(metrics_module, "METRICS_TOKEN", None)
+    assert client().post("/api/metrics/reset-window").status_code == 403
+
+
+def test_reset_requires_the_token(monkeypatch):
+    monkeypatch.setattr(metrics_module, "METRICS_TOKEN", "t0ken")
+    assert client().post("/api/metrics/reset-window").status_code == 401
+    get_logger().latency.record("test", "step", 5)
+    response = client().post("/api/metrics/reset-window", headers={"Authorization": "Bearer t0ken"})
+    assert response.status_code == 200
+    assert get_logger().latency.snapshot()["window"] == {}
@@ -0,0 +1,55 @@
+import re
+
+from python_core.latency import LatencyRegistry
+from python_core.logger import PlutoLogger
+from python_core.log_sinks import RingBufferSink
+from python_core.prometheus import render_metrics
+from python_core.shared_metrics import LocalMetricsStore
+from python_core import logger as logger_module, prometheus as prometheus_module
+
+SAMPLE = re.compile(r'^[a-zA-Z_:][a-zA-Z0-9_:]*(\{[^}]*\})? (-?[0-9.e+-]+|NaN|[+-]Inf)$')
+
+
+def make_logger(tmp_path, monkeypatch):
+    store = LocalMetricsStore()
+    monkeypatch.setattr(logger_module, "get_metrics_store", lambda: store)
+    logger = PlutoLogger(log_dir=str(tmp_path), sinks=[RingBufferSink(10)])
+    logger.latency = LatencyRegistry(store=store)
+    monkeypatch.setattr(prometheus_module, "get_logger", lambda: logger)
+    monkeypatch.setattr(prometheus_module, "get_metrics_store", lambda: store)
+    return logger
+
+
+def value(text: str, name: str) -> float:
+    match = re.search(rf"^{name} (\S+)$", text, re.M)
+    assert match, name
+    return float(match.group(1))
+
+
+def test_every_line_is_valid_exposition_format(tmp_path, monkeypatch):
+    make_logger(tmp_path, monkeypatch).record_latency("endpoint", "/api/triage", 12)
+    for line in render_metrics().splitlines():
+        if line and not line.startswith("#"):
+            assert SAMPLE.match(line), line
+
+
+def test_triage_counters_follow_log_triage(tmp_path, monkeypatch):
+    logger = make_logger(tmp_path, monkeypatch)
+    for _ in range(3):
+        logger.log_triage("u1", "headache", {"triage_level": "home_care", "llm_called": False}, 10)
+    logger.log_error("triage", "boom")
+
+    text = render_metrics()
+    assert value(text, "pluto_triage_requests_total") == 4
+    assert value(text, "pluto_triage_success_total") == 3
+    assert value(text, "pluto_triage_failed_total") == 1
+
+
+def test_latency_histogram_is_cumulative(tmp_path, monkeypatch):
+    logger = make_logger(tmp_path, monkeypatch)
+    for ms in (1, 5, 50):
+        logger.record_latency("endpoint", "/api/chat", ms)
+
+    text = render_metrics()
+    buckets = [float(v) for v in re.findall(r'_bucket\{[^}]*endpoint="/api/chat"[^}]*\} (\S+)', text)]
+    assert buckets and buckets == sorted(buckets) and buckets[-1] == 3
@@ -0,0 +1,34 @@
+import asyncio
+
+from python_core.response_cache import ResponseCache, cache_key
+
+
+def test_equivalent_contexts_share_a_key():
+    a = cache_key("triage_summary", "m", "v1", {"what_we_know": ["b", "a"], "complaint": "Chest  pain"})
+    b = cache_key("triage_summary", "m", "v1", {"complaint": "Chest pain", "what_we_know": ["a", "b"]})
+    assert a == b
+    assert a != cache_key("triage_summary", "m", "v2", {"complaint": "Chest pain", "what_we_know": ["a", "b"]})
+
+
+def test_round_trip_and_hit_accounting(tmp_path):
+    cache = ResponseCache(path=tmp_path / "cache.db", ttl=60)
+
+    async def scenario():
+        assert await cache.get("k", "test_cache") is None
+        await cache.put("k", "test_cache", "summary", latency_ms=250)
+        return await cache.get("k", "test_cache")
+
+    assert asyncio.run(scenario()) == "summary"
+    stats = cache.get_stats()["test_cache"]
+    assert (stats["hits"], stats["misses"], stats["saved_ms"]) == (1, 1, 250.0)
+
+
+def test_expired_entries_miss(tmp_path):
+    cache = ResponseCache(path=tmp_path / "cache.db", ttl=-1)
+    cache.enabled = True  # A negative TTL writes rows that are already expired
+
+    async def scenario():
+        await cache.put("k", "test_cache_expiry", "summary", latency_ms=1)
+        return await cache.get("k", "test_cache_expiry")
+
+    assert asyncio.run(scenario()) is None
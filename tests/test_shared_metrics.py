@@ -0,0 +1,62 @@
+import multiprocessing
+import os
+import threading
+
+from python_core.shared_metrics import KIND_COUNTER, LocalMetricsStore, MmapMetricsStore
+
+
+def _exiting_worker(directory: str) -> None:
+    store = MmapMetricsStore(directory)
+    store.inc("requests", 2)
+    store.max("latency_max_ms", 80)
+    store.set("in_flight", 5)
+    os._exit(0)
+
+
+def run_worker(directory) -> None:
+    child = multiprocessing.get_context("fork").Process(target=_exiting_worker, args=(str(directory),))
+    child.start()
+    child.join(10)
+    assert child.exitcode == 0
+
+
+def test_dead_workers_are_folded_into_the_archive(tmp_path):
+    store = MmapMetricsStore(tmp_path)
+    store.inc("requests")
+    store.max("latency_max_ms", 30)
+    run_worker(tmp_path)
+
+    first = store.snapshot()
+    assert first["requests"] == 3
+    assert first["latency_max_ms"] == 80
+    assert "in_flight" not in first  # Gauges only count live workers
+    assert sorted(p.name for p in tmp_path.glob("worker_*.metrics")) == [f"worker_{os.getpid()}.metrics"]
+    assert store.snapshot() == first  # Same totals once read from the archive
+
+    run_worker(tmp_path)
+    assert store.counter("requests") == 5
+    assert len(list(tmp_path.glob("worker_*.metrics"))) == 1
+
+
+def _hammer(store, name: str, threads: int = 4, n: int = 100000) -> None:
+    def work():
+        for _ in range(n):
+            store.inc(name)
+    workers = [threading.Thread(target=work) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+
+def test_concurrent_increments_are_not_lost(tmp_path):
+    for store in (LocalMetricsStore(), MmapMetricsStore(tmp_path)):
+        _hammer(store, "x")
+        assert store.counter("x") == 400000
+
+
+def test_recycled_pid_keeps_the_previous_workers_counters(tmp_path):
+    MmapMetricsStore._write_file(tmp_path / f"worker_{os.getpid()}.metrics", {"requests": (KIND_COUNTER, 7.0)})
+    store = MmapMetricsStore(tmp_path)
+    store.inc("requests")
+    assert store.counter("requests") == 8
@@ -0,0 +1,82 @@
+import asyncio
+import time
+import types
+
+import pytest
+from jose import JWTError, jwt
+
+from python_core import auth as auth_module
+from python_core.auth import JWT_CACHE_TTL_CAP, JWT_LEEWAY, VerifiedTokenCache, verify_session_token
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = types.SimpleNamespace(now=1_000_000.0)
+    fake.time = lambda: fake.now
+    monkeypatch.setattr(auth_module, "time", fake)
+    return fake
+
+
+@pytest.fixture
+def token_cache(monkeypatch):
+    cache = VerifiedTokenCache(max_size=100, max_ttl=300)
+    monkeypatch.setattr(auth_module, "_token_cache", cache)
+    monkeypatch.setattr(auth_module, "AUTH_SECRET", "s3cret")
+    return cache
+
+
+def test_entry_expires_at_exp_plus_leeway(clock):
+    cache = VerifiedTokenCache(max_ttl=300)
+    cache.put("tok", "u1", exp=clock.now + 60)
+    clock.now += 60 + JWT_LEEWAY
+    assert cache.get("tok") == "u1"
+    clock.now += 0.001
+    assert cache.get("tok") is None
+
+
+def test_entry_is_reverified_after_max_ttl(clock):
+    cache = VerifiedTokenCache(max_ttl=300)
+    cache.put("tok", "u1", exp=clock.now + 3600)
+    clock.now += 301
+    assert cache.get("tok") is None
+
+
+def test_max_ttl_is_capped():
+    assert VerifiedTokenCache(max_ttl=86400).max_ttl == JWT_CACHE_TTL_CAP
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = VerifiedTokenCache(max_size=2)
+    cache.put("a", "u1", exp=None)
+    cache.put("b", "u2", exp=None)
+    assert cache.get("a") == "u1"  # b is now the oldest
+    cache.put("c", "u3", exp=None)
+    assert (cache.get("a"), cache.get("b"), cache.get("c")) == ("u1", None, "u3")
+
+
+def test_revoked_token_is_verified_again(token_cache):
+    token = jwt.encode({"sub": "u1", "exp": int(time.time()) + 3600}, "s3cret", algorithm="HS256")
+    assert verify_session_token(token) == "u1"
+    token_cache.revoke(token)
+    assert token_cache.get(token) is None
+
+
+def test_tokens_failing_verification_are_not_cached(token_cache):
+    forged = jwt.encode({"sub": "u1", "exp": int(time.time()) + 3600}, "wrong", algorithm="HS256")
+    expired = jwt.encode({"sub": "u1", "exp": int(time.time()) - JWT_LEEWAY - 10}, "s3cret", algorithm="HS256")
+    for token in (forged, expired):
+        with pytest.raises(JWTError):
+            verify_session_token(token)
+        assert token_cache.get(token) is None
+
+
+def test_token_of_a_deleted_user_is_revoked(token_cache, monkeypatch):
+    async def no_user(db, user_id):
+        return None
+
+    monkeypatch.setattr(auth_module, "load_user", no_user)
+    token = jwt.encode({"sub": "gone", "exp": int(time.time()) + 3600}, "s3cret", algorithm="HS256")
+    request = types.SimpleNamespace(headers={"cookie": f"authjs.session-token={token}"})
+
+    assert asyncio.run(auth_module.get_current_user_optional(request, db=None)) is None
+    assert token_cache.get(token) is None
@@ -0,0 +1,50 @@
+import pytest
+
+from python_core.clinical_reasoning_engine import UrgencyLevel, get_reasoning_engine
+from python_core.triage_codec import decode_result, encode_result, logic_snapshot
+
+INPUTS = [
+    "I have crushing chest pain spreading to my left arm and I'm sweating",
+    "mild headache since this morning, no fever",
+    "my toddler has a fever of 39 and a rash that doesn't fade",
+    "I feel a bit off",
+]
+
+
+@pytest.mark.parametrize("text", INPUTS)
+def test_decode_rebuilds_the_full_result(text):
+    result = get_reasoning_engine().reason(text)
+    compact = encode_result(result)
+    assert decode_result(compact, logic_snapshot()) == result.to_dict()
+
+
+def test_round_trip_keeps_an_urgency_override():
+    result = get_reasoning_engine().reason("mild headache since this morning")
+    engine_urgency, engine_rationale = result.urgency_level, result.urgency_rationale
+    result.urgency_level = UrgencyLevel.EMERGENCY
+    result.urgency_rationale = "CRITICAL: Crisis keywords detected. " + result.urgency_rationale
+
+    compact = encode_result(result, engine_urgency, engine_rationale)
+    assert decode_result(compact, logic_snapshot()) == result.to_dict()
+
+
+def test_display_fields_are_readable_without_decoding():
+    """The Next.js pages read aiResult straight from the row"""
+    result = get_reasoning_engine().reason("I have crushing chest pain")
+    compact = encode_result(result)
+    assert compact["urgency_level"] == result.urgency_level.value
+    assert compact["clinical_summary"] == result.clinical_summary
+    assert compact["matched_protocols"] == result.matched_protocols
+
+
+def test_rows_with_short_field_names_still_decode():
+    result = get_reasoning_engine().reason("I feel a bit off")
+    compact = encode_result(result)
+    legacy = {"enc": compact["enc"], "p": compact["matched_protocols"], "cc": compact["chief_complaint"],
+              "eu": compact["eu"], "er": compact["er"], **({"f": compact["f"]} if "f" in compact else {})}
+    assert decode_result(legacy, logic_snapshot()) == result.to_dict()
+
+
+def test_uncompacted_rows_are_returned_unchanged():
+    full = {"summary": "written by the Next.js app", "severity": {"level": "Low"}}
+    assert decode_result(full) is full
@@ -0,0 +1,67 @@
+import multiprocessing
+import time
+from datetime import datetime
+from pathlib import Path
+
+from python_core.models import User
+from python_core.shared_metrics import LocalMetricsStore
+from python_core.user_cache import UserCache
+
+
+def consented(user_id: str = "u1") -> User:
+    return User(id=user_id, has_consented=True, email_verified=None)
+
+
+def test_hit_after_put():
+    cache = UserCache(ttl=30, store=LocalMetricsStore())
+    cache.put(consented())
+    user = cache.get("u1")
+    assert user is not None and user.has_consented
+
+
+def test_hit_carries_every_column():
+    """get_current_user callers read email/name - a hit must look like a SELECT"""
+    cache = UserCache(ttl=30, store=LocalMetricsStore())
+    verified = datetime(2026, 1, 1)
+    cache.put(User(id="u1", name="Ada", email="ada@example.com", email_verified=verified, has_consented=True))
+    user = cache.get("u1")
+    assert (user.name, user.email, user.email_verified) == ("Ada", "ada@example.com", verified)
+
+
+def test_unconsented_users_are_not_cached():
+    """Consent can flip outside this process (Next.js), so a False must not stick"""
+    cache = UserCache(ttl=30, store=LocalMetricsStore())
+    cache.put(User(id="u1", has_consented=False))
+    assert cache.get("u1") is None
+
+
+def test_invalidate_forgets_the_user():
+    cache = UserCache(ttl=30, store=LocalMetricsStore())
+    cache.put(consented())
+    cache.invalidate("u1")
+    assert cache.get("u1") is None
+
+
+def test_entries_expire_after_ttl():
+    cache = UserCache(ttl=0.01, store=LocalMetricsStore())
+    cache.put(consented())
+    time.sleep(0.02)
+    assert cache.get("u1") is None
+
+
+def _invalidate_in_other_worker(directory: str) -> None:
+    UserCache(ttl=30, sync_interval=0, generation_path=Path(directory) / "gen",
+              store=LocalMetricsStore()).invalidate("u1")
+
+
+def test_invalidation_in_another_worker_clears_this_one(tmp_path):
+    cache = UserCache(ttl=30, sync_interval=0, generation_path=tmp_path / "gen", store=LocalMetricsStore())
+    cache.put(consented())
+    assert cache.get("u1") is not None
+
+    worker = multiprocessing.get_context("fork").Process(target=_invalidate_in_other_worker, args=(str(tmp_path),))
+    worker.start()
+    worker.join(10)
+    assert worker.exitcode == 0
+
+    assert cache.get("u1") is None